@@ -0,0 +1,178 @@
+"""
+💬 Persistent Answer Cache
+LLM answers stored in DuckDB so repeat questions skip the LLM call. A
+question matches a cached one when its normalised text is the same, or
+when its embedding is at least ANSWER_CACHE_SIMILARITY cosine-similar
+("star wars sets?" and "Star Wars sets"; "biggest star wars ship" and
+"largest star wars ship"). Answers are only reused under the same scope
+(index snapshot, filters, models), expire after a TTL and are evicted
+least recently used first.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import duckdb
+
+from lexical_index import tokenize
+
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "answer_cache.duckdb")
+DEFAULT_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+DEFAULT_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_HOURS", "24")) * 3600
+DEFAULT_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+
+
+def normalize_query(query):
+    """Lowercase words and numbers only; case, spacing and punctuation don't matter"""
+    return " ".join(tokenize(query))
+
+
+def answer_scope(index_version=None, filter=None, **models):
+    """Key of everything besides the question that an answer depends on"""
+    scope = {"index": index_version, "filter": filter, **models}
+    payload = json.dumps(scope, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class AnswerCache:
+    """DuckDB-backed answer store with exact and semantic lookup, TTL and LRU eviction.
+
+    Like the embedding cache, a connection is opened per operation so
+    several app processes can share the file.
+    """
+
+    def __init__(
+        self,
+        path=ANSWER_CACHE_PATH,
+        similarity=DEFAULT_SIMILARITY,
+        ttl_seconds=DEFAULT_TTL_SECONDS,
+        max_entries=DEFAULT_MAX_ENTRIES,
+    ):
+        self.path = path
+        self.similarity = similarity
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS answer_cache (
+                    key VARCHAR PRIMARY KEY,
+                    scope VARCHAR,
+                    query VARCHAR,
+                    embedding FLOAT[],
+                    answer VARCHAR,
+                    index_version VARCHAR,
+                    hits INTEGER DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_used TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """
+            )
+
+    def _connect(self, retries=20, delay=0.05):
+        """Open the cache file, waiting briefly if another process holds it"""
+        for attempt in range(retries):
+            try:
+                return duckdb.connect(self.path)
+            except duckdb.IOException:
+                if attempt == retries - 1:
+                    raise
+                time.sleep(delay)
+
+    @staticmethod
+    def _key(scope, query):
+        key = f"{scope}\0{normalize_query(query)}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def get(self, query, scope, embedding=None):
+        """Cached answer for ``query`` as a dict, or None.
+
+        The dict has the answer, the cached question it was given for, how
+        it matched ("exact" or "semantic") and the cosine similarity.
+        """
+        fresh = "created_at > CURRENT_TIMESTAMP::TIMESTAMP - to_seconds(?)"
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT key, query, answer, 1.0 FROM answer_cache "
+                f"WHERE key = ? AND {fresh}",
+                [self._key(scope, query), self.ttl_seconds],
+            ).fetchone()
+            match = "exact"
+            if row is None and embedding is not None:
+                row = conn.execute(
+                    f"""
+                    SELECT key, query, answer, similarity FROM (
+                        SELECT key, query, answer,
+                            list_cosine_similarity(embedding, CAST(? AS FLOAT[]))
+                                AS similarity
+                        FROM answer_cache
+                        WHERE scope = ? AND {fresh}
+                    ) WHERE similarity >= ?
+                    ORDER BY similarity DESC LIMIT 1
+                """,
+                    [list(embedding), scope, self.ttl_seconds, self.similarity],
+                ).fetchone()
+                match = "semantic"
+            if row is None:
+                return None
+            conn.execute(
+                """
+                UPDATE answer_cache SET last_used = CURRENT_TIMESTAMP, hits = hits + 1
+                WHERE key = ?
+            """,
+                [row[0]],
+            )
+        return {
+            "answer": row[2],
+            "query": row[1],
+            "match": match,
+            "similarity": float(row[3]),
+        }
+
+    def put(self, query, scope, answer, embedding=None, index_version=None):
+        """Store an answer, replacing any for the same question, then evict"""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO answer_cache
+                    (key, scope, query, embedding, answer, index_version)
+                VALUES (?, ?, ?, CAST(? AS FLOAT[]), ?, ?)
+            """,
+                [
+                    self._key(scope, query),
+                    scope,
+                    query,
+                    None if embedding is None else list(embedding),
+                    answer,
+                    index_version,
+                ],
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        """Drop expired entries and least recently used ones beyond max_entries"""
+        conn.execute(
+            "DELETE FROM answer_cache "
+            "WHERE created_at <= CURRENT_TIMESTAMP::TIMESTAMP - to_seconds(?)",
+            [self.ttl_seconds],
+        )
+        conn.execute(
+            """
+            DELETE FROM answer_cache WHERE key IN (
+                SELECT key FROM answer_cache ORDER BY last_used DESC, key OFFSET ?
+            )
+        """,
+            [self.max_entries],
+        )
+
+    def stats(self):
+        """Return (entries, hits served) currently cached"""
+        with self._lock, self._connect() as conn:
+            count, hits = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM answer_cache"
+            ).fetchone()
+        return count, hits
@@ -0,0 +1,62 @@
+"""
+🌊 Streamed Answers
+Generates the LLM answer for a "stuff" QA chain (see
+langchain.chains.question_answering.load_qa_chain) in a background thread
+and hands out the text as it arrives, so the caller can show the sources
+first and the answer token by token instead of waiting for all of it.
+"""
+
+import queue
+import threading
+
+from langchain_core.prompts import format_document
+
+
+def stuff_prompt(qa_chain, docs, question):
+    """The prompt the chain would send the LLM for ``docs`` and ``question``"""
+    context = qa_chain.document_separator.join(
+        format_document(doc, qa_chain.document_prompt) for doc in docs
+    )
+    return qa_chain.llm_chain.prompt.format_prompt(
+        **{qa_chain.document_variable_name: context, "question": question}
+    )
+
+
+class AnswerStream:
+    """An answer being generated in the background; iterate it for text chunks.
+
+    Generation starts on construction. Iterating yields chunks as the LLM
+    produces them and re-raises any LLM error at the end; ``text`` is
+    what has been received so far.
+    """
+
+    def __init__(self, qa_chain, docs, question):
+        self.parts = []
+        self.error = None
+        self._chunks = queue.Queue()
+        prompt = stuff_prompt(qa_chain, docs, question)
+        self._thread = threading.Thread(
+            target=self._generate, args=(qa_chain.llm_chain.llm, prompt), daemon=True
+        )
+        self._thread.start()
+
+    def _generate(self, llm, prompt):
+        try:
+            for chunk in llm.stream(prompt):
+                # Chat models stream message chunks, completion models strings
+                self._chunks.put(getattr(chunk, "content", chunk))
+        except Exception as e:
+            self.error = e
+        finally:
+            self._chunks.put(None)
+
+    def __iter__(self):
+        while (text := self._chunks.get()) is not None:
+            self.parts.append(text)
+            yield text
+        if self.error is not None:
+            raise self.error
+
+    @property
+    def text(self):
+        return "".join(self.parts)
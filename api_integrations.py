@@ -6,6 +6,9 @@ import hashlib
 from dotenv import load_dotenv
 import duckdb
 
+from db_writer import upsert_lego_data
+from http_cache import mount_http_cache
+
 # Load environment variables
 # Load environment variables with Gitpod fallback
 if os.getenv("IN_GITPOD") == "true":
@@ -20,6 +23,8 @@ class LEGOAPIIntegrations:
         self.session.headers.update(
             {"User-Agent": "LEGO-RAG-Search/1.0 (Educational Project)"}
         )
+        # Reuse unchanged payloads from disk via conditional requests
+        mount_http_cache(self.session)
 
     def fetch_bricklink_data(self, limit=100):
         """Fetch data from BrickLink API"""
@@ -413,6 +418,7 @@ class LEGOAPIIntegrations:
         for source_name, data_list in all_data.items():
             print(f"  Saving {source_name} data...")
 
+            rows = []
             for item in data_list:
                 try:
                     # Generate unique ID
@@ -421,43 +427,35 @@ class LEGOAPIIntegrations:
                     ).hexdigest()
 
                     # Prepare data for database
-                    name = item.get("name", "Unknown Set")
-                    details = json.dumps(item, ensure_ascii=False)
-                    set_number = item.get("id", "")
-                    year = item.get("year", 0)
-                    theme = item.get("theme", "Unknown")
-                    pieces = item.get("pieces", 0)
-                    price = item.get("price", 0.0)
-                    rating = item.get("rating", 0.0)
-
-                    # Insert into database
-                    conn.execute(
-                        """
-                        INSERT OR REPLACE INTO lego_data 
-                        (id, source, name, details, set_number, year, theme, pieces, minifigures, price, rating) 
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                        [
-                            unique_id,
-                            source_name,
-                            name,
-                            details,
-                            set_number,
-                            year,
-                            theme,
-                            pieces,
-                            0,
-                            price,
-                            rating,
-                        ],
+                    rows.append(
+                        {
+                            "id": unique_id,
+                            "source": source_name,
+                            "name": item.get("name", "Unknown Set"),
+                            "details": json.dumps(item, ensure_ascii=False),
+                            "set_number": item.get("id", ""),
+                            "year": item.get("year", 0),
+                            "theme": item.get("theme", "Unknown"),
+                            "pieces": item.get("pieces", 0),
+                            "minifigures": 0,
+                            "price": item.get("price", 0.0),
+                            "rating": item.get("rating", 0.0),
+                        }
                     )
 
-                    total_saved += 1
-
                 except Exception as e:
                     print(f"    Error saving item {item.get('id', 'unknown')}: {e}")
                     continue
 
+            # Insert into database in columnar batches
+            total_saved += upsert_lego_data(
+                conn,
+                rows,
+                on_error=lambda row, e: print(
+                    f"    Error saving item {row.get('set_number', 'unknown')}: {e}"
+                ),
+            )
+
         print(f"  Total items saved: {total_saved}")
         return total_saved
 
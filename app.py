@@ -1,14 +1,17 @@
 import os
 import json
+import subprocess
+import sys
 import plotly.express as px
 
 from dotenv import load_dotenv
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_community.vectorstores import FAISS
-from langchain.chains import RetrievalQA
 import duckdb
+import requests
 import streamlit as st
 import pandas as pd
+from langchain_core.documents import Document
+
+from search_filters import build_filter, range_condition
 
 
 # Load environment variables with Gitpod fallback
@@ -17,7 +20,9 @@ if os.getenv("IN_GITPOD") == "true":
 else:
     load_dotenv(".env")  # Your default dev secrets
 
-openai_api_key = os.getenv("OPENAI_API_KEY")
+# Search and answers are served by search_service.py
+SERVICE_URL = os.getenv("SEARCH_SERVICE_URL", "http://localhost:8000")
+DB_PATH = "lego_data.duckdb"
 
 # Page configuration
 st.set_page_config(
@@ -70,39 +75,51 @@ st.markdown(
 )
 
 
-# Initialize database and models
+# Initialize search service client
 @st.cache_resource
 def initialize_system():
-    """Initialize the system with caching"""
-    try:
-        conn = duckdb.connect("lego_data.duckdb")
-        embeddings = OpenAIEmbeddings(openai_api_key=openai_api_key)
-        
-        # Load FAISS index with security setting for pickle files
-        import pickle
-        import faiss
-        from langchain_community.vectorstores import FAISS
-        
-        # Set allow_dangerous_deserialization for trusted local files
-        vectorstore = FAISS.load_local(
-            "./faiss_index", 
-            embeddings,
-            allow_dangerous_deserialization=True
-        )
-        llm = ChatOpenAI(model_name="gpt-4", openai_api_key=openai_api_key)
-        qa_chain = RetrievalQA.from_chain_type(
-            llm=llm, chain_type="stuff", retriever=vectorstore.as_retriever()
-        )
-        return conn, vectorstore, qa_chain
-    except Exception as e:
-        st.error(f"❌ System initialization failed: {e}")
-        return None, None, None
+    """Initialize the system with caching.
+
+    Search and answers come from the search service (search_service.py);
+    the database is only read here for the sidebar and dashboards.
+    """
+    if not os.path.exists(DB_PATH):
+        st.error(f"❌ System initialization failed: {DB_PATH} not found")
+        return None
+    return requests.Session()
+
+
+def query_db(sql):
+    """Rows of a read-only query on a connection opened just for it.
+
+    The database is never held open, so load_data.py and fix_faiss.py can
+    take its write lock while the app is running.
+    """
+    with duckdb.connect(DB_PATH, read_only=True) as conn:
+        return conn.execute(sql).fetchall()
 
 
 # Initialize system
-conn, vectorstore, qa_chain = initialize_system()
+service = initialize_system()
+
 
-if conn is None:
+def service_health():
+    """The search service's /health, or None when it is not reachable"""
+    try:
+        response = service.get(f"{SERVICE_URL}/health", timeout=5)
+        response.raise_for_status()
+        return response.json()
+    except requests.RequestException:
+        return None
+
+
+def regenerate_answer(query):
+    """Run ``query`` again with a fresh LLM answer"""
+    st.session_state.current_query = query
+    st.session_state.regenerate = True
+
+
+if service is None:
     st.error("❌ Please ensure your data is loaded and API keys are configured.")
     st.stop()
 
@@ -111,11 +128,9 @@ if conn is None:
 def get_themes():
     """Get distinct themes from database"""
     try:
-        if conn is None:
-            return ["All Themes"]
-        themes = conn.execute(
+        themes = query_db(
             "SELECT DISTINCT theme FROM lego_data WHERE theme IS NOT NULL"
-        ).fetchall()
+        )
         return ["All Themes"] + [theme[0] for theme in themes]
     except Exception as e:
         st.error(f"Error fetching themes: {e}")
@@ -125,11 +140,9 @@ def get_themes():
 def get_years():
     """Get distinct years from database"""
     try:
-        if conn is None:
-            return []
-        years = conn.execute(
+        years = query_db(
             "SELECT DISTINCT year FROM lego_data WHERE year IS NOT NULL ORDER BY year"
-        ).fetchall()
+        )
         return [year[0] for year in years]
     except Exception as e:
         st.error(f"Error fetching years: {e}")
@@ -139,9 +152,7 @@ def get_years():
 def get_database_stats():
     """Get database statistics"""
     try:
-        if conn is None:
-            return [0, 0, 0, 0, 0, 0, 0]
-        stats = conn.execute(
+        stats = query_db(
             """
             SELECT 
                 COUNT(*) as total_records,
@@ -153,7 +164,7 @@ def get_database_stats():
                 AVG(price) as avg_price
             FROM lego_data
         """
-        ).fetchone()
+        )[0]
         return stats
     except Exception as e:
         st.error(f"Error fetching database stats: {e}")
@@ -163,9 +174,7 @@ def get_database_stats():
 def get_theme_distribution():
     """Get theme distribution data"""
     try:
-        if conn is None:
-            return []
-        theme_data = conn.execute(
+        theme_data = query_db(
             """
             SELECT theme, COUNT(*) as count 
             FROM lego_data 
@@ -174,7 +183,7 @@ def get_theme_distribution():
             ORDER BY count DESC 
             LIMIT 10
         """
-        ).fetchall()
+        )
         return theme_data
     except Exception as e:
         st.error(f"Error fetching theme distribution: {e}")
@@ -184,9 +193,7 @@ def get_theme_distribution():
 def get_year_distribution():
     """Get year distribution data"""
     try:
-        if conn is None:
-            return []
-        year_data = conn.execute(
+        year_data = query_db(
             """
             SELECT year, COUNT(*) as count 
             FROM lego_data 
@@ -194,7 +201,7 @@ def get_year_distribution():
             GROUP BY year 
             ORDER BY year
         """
-        ).fetchall()
+        )
         return year_data
     except Exception as e:
         st.error(f"Error fetching year distribution: {e}")
@@ -207,10 +214,7 @@ def get_performance_metrics():
     """Get system performance metrics"""
     try:
         # Database metrics
-        if conn is None:
-            db_count = 0
-        else:
-            db_count = conn.execute("SELECT COUNT(*) FROM lego_data").fetchone()[0]
+        db_count = query_db("SELECT COUNT(*) FROM lego_data")[0][0]
 
         # Cache status
         cache_dirs = [
@@ -269,6 +273,7 @@ with st.sidebar:
 
         # Year range
         year_options = get_years()
+        year_range = None
         if year_options:
             year_range = st.select_slider(
                 "Year Range",
@@ -282,6 +287,19 @@ with st.sidebar:
         # Price range
         price_range = st.slider("Price Range ($)", 0.0, 1000.0, (0.0, 1000.0))
 
+        # Applied before the vector search, so only matching sets come back;
+        # ranges left at a slider's limits are not filtered on
+        search_filter = build_filter(
+            theme=None if selected_theme == "All Themes" else selected_theme,
+            year=(
+                range_condition(year_range, (min(year_options), max(year_options)))
+                if year_options
+                else None
+            ),
+            pieces=range_condition(pieces_range, (0, 5000)),
+            price=range_condition(price_range, (0.0, 1000.0)),
+        )
+
     # Search history
     with st.expander("📚 Search History"):
         if "search_history" not in st.session_state:
@@ -309,6 +327,15 @@ with st.sidebar:
             st.write("**Environment:**")
             st.write(f"Mode: {metrics['env_info']['RAG_MODE']}")
             st.write(f"Gitpod: {metrics['env_info']['IN_GITPOD']}")
+            health = service_health()
+            if health is None:
+                st.write(f"Search service: ❌ not reachable at {SERVICE_URL}")
+            else:
+                st.write(f"Index snapshot: {health['index_version'] or 'unversioned'}")
+                cache = health["answer_cache"]
+                st.write(
+                    f"Answer cache: {cache['entries']} answers, {cache['hits']} reused"
+                )
         else:
             st.error(f"Error loading metrics: {metrics['error']}")
 
@@ -323,13 +350,17 @@ with st.sidebar:
 
     with col2:
         if st.button("🔄 Refresh Data", type="secondary"):
-            import subprocess
-
             with st.spinner("Refreshing data..."):
                 result = subprocess.run(
-                    ["python", "load_data.py"], capture_output=True, text=True
+                    [sys.executable, "load_data.py"], capture_output=True, text=True
                 )
+            if result.returncode == 0:
+                # The search service swaps the new index snapshot in by itself
+                st.cache_data.clear()
                 st.success("Data refreshed!")
+            else:
+                st.error(f"❌ Data refresh failed (exit code {result.returncode})")
+                st.code(result.stderr or result.stdout)
 
 # Main content area
 col1, col2 = st.columns([3, 1])
@@ -380,155 +411,187 @@ if (query and search_button) or "current_query" in st.session_state:
         query = st.session_state.current_query
         del st.session_state.current_query
 
+    # Regenerate asks the LLM again instead of reusing a cached answer
+    regenerate = st.session_state.pop("regenerate", False)
+
     # Add to search history
     if query not in st.session_state.search_history:
         st.session_state.search_history.append(query)
 
-    with st.spinner("🔍 Searching LEGO database..."):
-        try:
-            # Get AI response
-            response = qa_chain.run(query)
-
-            # Display results in tabs
-            tab1, tab2, tab3 = st.tabs(
-                ["🤖 AI Response", "📚 Source Documents", "📊 Analytics"]
+    try:
+        with st.spinner("🔍 Searching LEGO database..."):
+            # The service retrieves once (vector + BM25 over the filtered
+            # sets) and sends the sources first; the answer follows as
+            # tokens while the LLM generates it, or at once from its cache
+            response = service.post(
+                f"{SERVICE_URL}/qa",
+                json={
+                    "query": query,
+                    "k": search_k,
+                    "filter": search_filter or None,
+                    "threshold": similarity_threshold,
+                    "regenerate": regenerate,
+                    "stream": True,
+                },
+                stream=True,
+                timeout=120,
             )
+            response.raise_for_status()
+            events = (json.loads(line) for line in response.iter_lines() if line)
+            first = next(events)
+            cached = first["cached"]
+
+        def answer_tokens():
+            for event in events:
+                if event["type"] == "token":
+                    yield event["text"]
+                elif event["type"] == "error":
+                    raise RuntimeError(event["error"])
+
+        # Display results in tabs
+        tab1, tab2, tab3 = st.tabs(
+            ["🤖 AI Response", "📚 Source Documents", "📊 Analytics"]
+        )
+
+        with tab1:
+            st.subheader("AI-Generated Answer")
+            if cached is not None and cached["match"] == "semantic":
+                st.caption(
+                    f"⚡ Cached answer to a similar question: \"{cached['query']}\" "
+                    f"(similarity {cached['similarity']:.2f})"
+                )
+            elif cached is not None:
+                st.caption("⚡ Cached answer")
+            answer_box = st.container()
+
+            # Add feedback buttons
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                if st.button("👍 Helpful"):
+                    st.success("Thanks for your feedback!")
+            with col2:
+                if st.button("👎 Not Helpful"):
+                    st.info("We'll improve our responses!")
+            with col3:
+                st.button("🔄 Regenerate", on_click=regenerate_answer, args=(query,))
+
+        with tab2:
+            st.subheader(f"📚 Top {search_k} Related Records")
+
+            # The top k retrieved sets whose similarity clears the threshold
+            filtered_docs = [
+                (
+                    Document(
+                        page_content=source["content"], metadata=source["metadata"]
+                    ),
+                    source["similarity"],
+                )
+                for source in first["sources"]
+            ]
 
-            with tab1:
-                st.subheader("AI-Generated Answer")
-                st.markdown(response)
+            if not filtered_docs:
+                st.warning(
+                    "No results found with the current similarity threshold. "
+                    "Try lowering it."
+                )
+            else:
+                for i, (doc, score) in enumerate(filtered_docs, 1):
+                    with st.expander(f"Record {i} (Score: {score:.3f})"):
+                        # Structured fields come with each source's metadata
+                        data = doc.metadata
+
+                        # Create a nice card layout
+                        col1, col2 = st.columns([2, 1])
+
+                        with col1:
+                            st.markdown(f"**{data.get('name') or 'Unknown Set'}**")
+                            st.markdown(
+                                f"**Set Number:** {data.get('set_number') or 'N/A'}"
+                            )
+                            st.markdown(f"**Theme:** {data.get('theme') or 'N/A'}")
+                            st.markdown(f"**Year:** {data.get('year') or 'N/A'}")
+
+                        with col2:
+                            if data.get("pieces"):
+                                st.metric("Pieces", data["pieces"])
+                            if data.get("price"):
+                                st.metric("Price", f"${data['price']}")
+                            if data.get("rating"):
+                                st.metric("Rating", f"{data['rating']}/5")
+
+                        # Full data, collapsed (expanders cannot be nested)
+                        st.markdown("**📋 Full Details**")
+                        st.json({**data, "text": doc.page_content}, expanded=False)
+
+        with tab3:
+            st.subheader("📊 Search Analytics")
+
+            # Get analytics data
+            analytics_data = [
+                {
+                    "name": doc.metadata.get("name") or "Unknown",
+                    "theme": doc.metadata.get("theme") or "Unknown",
+                    "year": doc.metadata.get("year") or 0,
+                    "pieces": doc.metadata.get("pieces") or 0,
+                    "price": doc.metadata.get("price") or 0,
+                    "score": score,
+                }
+                for doc, score in filtered_docs
+            ]
+
+            if analytics_data:
+                df = pd.DataFrame(analytics_data)
+
+                # Create visualizations
+                col1, col2 = st.columns(2)
 
-                # Add feedback buttons
-                col1, col2, col3 = st.columns(3)
                 with col1:
-                    if st.button("👍 Helpful"):
-                        st.success("Thanks for your feedback!")
-                with col2:
-                    if st.button("👎 Not Helpful"):
-                        st.info("We'll improve our responses!")
-                with col3:
-                    if st.button("🔄 Regenerate"):
-                        st.rerun()
+                    # Theme distribution
+                    theme_counts = df["theme"].value_counts()
+                    fig_theme = px.pie(
+                        values=theme_counts.values,
+                        names=theme_counts.index,
+                        title="Results by Theme",
+                    )
+                    st.plotly_chart(fig_theme, use_container_width=True)
 
-            with tab2:
-                st.subheader(f"📚 Top {search_k} Related Records")
+                with col2:
+                    # Year distribution
+                    fig_year = px.histogram(
+                        df, x="year", title="Results by Year", nbins=10
+                    )
+                    st.plotly_chart(fig_year, use_container_width=True)
+
+                # Pieces vs Price scatter plot
+                fig_scatter = px.scatter(
+                    df,
+                    x="pieces",
+                    y="price",
+                    hover_data=["name", "theme"],
+                    title="Pieces vs Price",
+                )
+                st.plotly_chart(fig_scatter, use_container_width=True)
 
-                # Get search results
-                docs = vectorstore.similarity_search_with_score(query, k=search_k)
+                # Summary statistics
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("Total Results", len(df))
+                with col2:
+                    st.metric("Avg Pieces", f"{df['pieces'].mean():.0f}")
+                with col3:
+                    st.metric("Avg Price", f"${df['price'].mean():.2f}")
+                with col4:
+                    st.metric("Avg Score", f"{df['score'].mean():.3f}")
 
-                # Filter by similarity threshold
-                filtered_docs = [
-                    (doc, score) for doc, score in docs if score > similarity_threshold
-                ]
+        with answer_box:
+            if cached is not None:
+                st.markdown(cached["answer"])
+            else:
+                st.write_stream(answer_tokens())
 
-                if not filtered_docs:
-                    st.warning(
-                        "No results found with the current similarity threshold. Try lowering it."
-                    )
-                else:
-                    for i, (doc, score) in enumerate(filtered_docs, 1):
-                        with st.expander(f"Record {i} (Score: {score:.3f})"):
-                            try:
-                                data = json.loads(doc.page_content)
-
-                                # Create a nice card layout
-                                col1, col2 = st.columns([2, 1])
-
-                                with col1:
-                                    st.markdown(
-                                        f"**{data.get('name', 'Unknown Set')}**"
-                                    )
-                                    st.markdown(
-                                        f"**Set Number:** {data.get('set_number', 'N/A')}"
-                                    )
-                                    st.markdown(
-                                        f"**Theme:** {data.get('theme', 'N/A')}"
-                                    )
-                                    st.markdown(f"**Year:** {data.get('year', 'N/A')}")
-
-                                with col2:
-                                    if data.get("pieces"):
-                                        st.metric("Pieces", data["pieces"])
-                                    if data.get("price"):
-                                        st.metric("Price", f"${data['price']}")
-                                    if data.get("rating"):
-                                        st.metric("Rating", f"{data['rating']}/5")
-
-                                # Show full data in collapsible section
-                                with st.expander("📋 Full Details"):
-                                    st.json(data)
-
-                            except Exception:
-                                st.text(doc.page_content[:500] + "...")
-
-            with tab3:
-                st.subheader("📊 Search Analytics")
-
-                # Get analytics data
-                analytics_data = []
-                for doc, score in filtered_docs:
-                    try:
-                        data = json.loads(doc.page_content)
-                        analytics_data.append(
-                            {
-                                "name": data.get("name", "Unknown"),
-                                "theme": data.get("theme", "Unknown"),
-                                "year": data.get("year", 0),
-                                "pieces": data.get("pieces", 0),
-                                "price": data.get("price", 0),
-                                "score": score,
-                            }
-                        )
-                    except Exception:
-                        continue
-
-                if analytics_data:
-                    df = pd.DataFrame(analytics_data)
-
-                    # Create visualizations
-                    col1, col2 = st.columns(2)
-
-                    with col1:
-                        # Theme distribution
-                        theme_counts = df["theme"].value_counts()
-                        fig_theme = px.pie(
-                            values=theme_counts.values,
-                            names=theme_counts.index,
-                            title="Results by Theme",
-                        )
-                        st.plotly_chart(fig_theme, use_container_width=True)
-
-                    with col2:
-                        # Year distribution
-                        fig_year = px.histogram(
-                            df, x="year", title="Results by Year", nbins=10
-                        )
-                        st.plotly_chart(fig_year, use_container_width=True)
-
-                    # Pieces vs Price scatter plot
-                    fig_scatter = px.scatter(
-                        df,
-                        x="pieces",
-                        y="price",
-                        hover_data=["name", "theme"],
-                        title="Pieces vs Price",
-                    )
-                    st.plotly_chart(fig_scatter, use_container_width=True)
-
-                    # Summary statistics
-                    col1, col2, col3, col4 = st.columns(4)
-                    with col1:
-                        st.metric("Total Results", len(df))
-                    with col2:
-                        st.metric("Avg Pieces", f"{df['pieces'].mean():.0f}")
-                    with col3:
-                        st.metric("Avg Price", f"${df['price'].mean():.2f}")
-                    with col4:
-                        st.metric("Avg Score", f"{df['score'].mean():.3f}")
-
-        except Exception as e:
-            st.error(f"❌ Search failed: {str(e)}")
-            st.exception(e)
+    except Exception as e:
+        st.error(f"❌ Search failed: {str(e)}")
+        st.exception(e)
 
 # Show analytics dashboard if requested
 if st.session_state.get("show_analytics", False):
@@ -582,5 +645,4 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-# Note: Connection is managed by Streamlit's caching system
-# Don't close it here as cached functions may still need it
+# Note: Database connections are opened per query and closed right away
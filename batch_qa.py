@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+📦 Batch QA
+Runs a file of questions through the search and QA pipeline offline and
+writes one JSON answer per line, with its sources and per-stage timings.
+Questions are embedded in batches and each batch is searched with one
+index call; answers come from the answer cache when possible, otherwise
+up to --concurrency LLM calls run at once.
+
+Input is JSONL, one question per line: {"query": ..., "id", "k",
+"filter", "threshold"}, all but "query" optional (a bare JSON string is a
+query too). Output lines are in input order.
+
+Usage: python batch_qa.py questions.jsonl -o answers.jsonl [--concurrency 4]
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from embedding_backend import EMBEDDING_BACKENDS, get_embeddings
+from search_service import SearchService, json_dumps
+
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_CONCURRENCY = 4
+
+
+def read_queries(path, k=5, threshold=None):
+    """Questions from a JSONL file (or "-" for stdin) as dicts"""
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    queries = []
+    try:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{number}: not JSON ({e})")
+            if isinstance(item, str):
+                item = {"query": item}
+            query = (
+                str(item.get("query") or "").strip() if isinstance(item, dict) else ""
+            )
+            if not query:
+                raise ValueError(f"{path}:{number}: 'query' is required")
+            queries.append(
+                {
+                    "id": item.get("id", number),
+                    "query": query,
+                    "k": int(item.get("k", k)),
+                    "filter": item.get("filter") or None,
+                    "threshold": item.get("threshold", threshold),
+                }
+            )
+    finally:
+        if f is not sys.stdin:
+            f.close()
+    return queries
+
+
+def retrieve_all(service, queries, batch_size=DEFAULT_BATCH_SIZE):
+    """One retrieval per question, batched by shared k and filter"""
+    groups = {}
+    for position, item in enumerate(queries):
+        key = (item["k"], json.dumps(item["filter"], sort_keys=True))
+        groups.setdefault(key, []).append(position)
+
+    retrievals = [None] * len(queries)
+    for positions in groups.values():
+        first = queries[positions[0]]
+        for start in range(0, len(positions), batch_size):
+            chunk = positions[start : start + batch_size]
+            batch = service.retrieve_batch(
+                [queries[i]["query"] for i in chunk], first["k"], first["filter"]
+            )
+            for position, retrieval in zip(chunk, batch):
+                retrievals[position] = retrieval
+    return retrievals
+
+
+def answer_one(service, item, retrieval, regenerate=False, search_only=False):
+    """The output record of one question; errors are recorded, not raised"""
+    record = {"id": item["id"], "query": item["query"]}
+    try:
+        if search_only:
+            record.update(
+                index_version=retrieval["version"],
+                sources=service.sources(retrieval, item["threshold"]),
+                timings=retrieval["timings"],
+            )
+        else:
+            record.update(
+                service.answer_retrieval(retrieval, item["threshold"], regenerate)
+            )
+    except Exception as e:
+        record.update(error=str(e), timings=retrieval["timings"])
+    return record
+
+
+def main():
+    """Answer a file of questions"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("input", help="JSONL questions, or - for stdin")
+    parser.add_argument(
+        "-o", "--output", default="-", help="JSONL answers (default stdout)"
+    )
+    parser.add_argument("--k", type=int, default=5, help="sources per question")
+    parser.add_argument("--threshold", type=float, help="minimum source similarity")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument(
+        "--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="LLM calls at once"
+    )
+    parser.add_argument(
+        "--regenerate", action="store_true", help="ignore cached answers"
+    )
+    parser.add_argument(
+        "--search-only", action="store_true", help="sources only, no LLM"
+    )
+    parser.add_argument(
+        "--embeddings", choices=EMBEDDING_BACKENDS, help="embedding backend"
+    )
+    args = parser.parse_args()
+
+    # Progress goes to stderr so answers can be piped from stdout
+    log = sys.stderr
+    queries = read_queries(args.input, args.k, args.threshold)
+    print(f"📦 Batch QA: {len(queries)} questions from {args.input}", file=log)
+    if not queries:
+        return
+
+    embeddings = get_embeddings(backend=args.embeddings) if args.embeddings else None
+    service = SearchService(embeddings=embeddings)
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        start = time.perf_counter()
+        retrievals = retrieve_all(service, queries, args.batch_size)
+        retrieve_seconds = time.perf_counter() - start
+        print(f"🔍 Retrieved sources in {retrieve_seconds:.2f}s", file=log)
+
+        if not args.search_only:
+            # Create the chain once, before the threads share it
+            service.qa_chain
+        start = time.perf_counter()
+        totals, cached, errors = {}, 0, 0
+        modes = (args.regenerate, args.search_only)
+        with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+            records = executor.map(
+                lambda pair: answer_one(service, *pair, *modes),
+                zip(queries, retrievals),
+            )
+            for record in records:
+                out.write(json_dumps(record) + "\n")
+                out.flush()
+                for stage, ms in record.get("timings", {}).items():
+                    totals[stage] = totals.get(stage, 0.0) + ms
+                cached += record.get("cached") is not None
+                errors += "error" in record
+        answer_seconds = time.perf_counter() - start
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        service.live_index.stop()
+
+    total_seconds = retrieve_seconds + answer_seconds
+    print(f"✅ {len(queries)} questions in {total_seconds:.2f}s", file=log)
+    print(
+        f"   {len(queries) / total_seconds:.1f} questions/s, {cached} cached answers, "
+        f"{errors} errors",
+        file=log,
+    )
+    for stage, ms in totals.items():
+        print(f"   {stage:<10} {ms / len(queries):>9.2f} ms/question", file=log)
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
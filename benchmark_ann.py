@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+⏱️ ANN Index Benchmark
+Recall@k versus per-query latency for each index type on clustered
+synthetic vectors, against exact Flat search as ground truth. IVF types
+are swept over nprobe and HNSW over efSearch.
+"""
+
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from vector_index import build_index, apply_search_params, index_params
+
+SWEEPS = {
+    "flat": [{}],
+    "ivf_flat": [{"nprobe": n} for n in (1, 4, 16, 64)],
+    "hnsw": [{"ef_search": ef} for ef in (16, 64, 256)],
+    "ivf_pq": [{"nprobe": n} for n in (4, 16, 64)],
+}
+
+
+def make_vectors(count, dimension, clusters=1000, seed=0):
+    """Gaussian clusters, closer to real embeddings than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    vectors = np.empty((count, dimension), dtype=np.float32)
+    for start in range(0, count, 100000):
+        end = min(start + 100000, count)
+        assign = rng.integers(0, clusters, end - start)
+        noise = rng.standard_normal((end - start, dimension)).astype(np.float32)
+        vectors[start:end] = centers[assign] + 0.5 * noise
+    return vectors
+
+
+def recall(found, truth, k):
+    """Share of the true top k present in the returned top k"""
+    hits = sum(len(set(f[:k]) & set(t[:k])) for f, t in zip(found, truth))
+    return hits / (len(truth) * k)
+
+
+def time_queries(index, queries, k):
+    """One query at a time, like the app; returns (labels, mean ms, p95 ms)"""
+    labels, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, row = index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        labels.append(row[0])
+    return labels, float(np.mean(latencies)), float(np.percentile(latencies, 95))
+
+
+def main():
+    """Benchmark index types across catalog sizes"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--dimension", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", default=",".join(SWEEPS))
+    args = parser.parse_args()
+
+    print("⏱️ ANN Index Benchmark")
+    print("=" * 50)
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        data = make_vectors(size + args.queries, args.dimension)
+        vectors, queries = data[:size], data[size:]
+
+        exact = faiss.IndexFlatL2(args.dimension)
+        exact.add(vectors)
+        _, truth = exact.search(queries, args.k)
+        del exact
+
+        print(
+            f"\n📊 {size:,} vectors, {args.dimension} dims, "
+            f"{args.queries} queries, recall@{args.k}"
+        )
+        columns = f"{'build s':>8} {'recall':>7} {'mean ms':>8} {'p95 ms':>8}"
+        print(f"   {'index':<24} {columns}")
+        for index_type in args.types.split(","):
+            start = time.perf_counter()
+            index, resolved = build_index(
+                vectors, index_params(type=index_type, metric="l2")
+            )
+            build_seconds = time.perf_counter() - start
+
+            for search in SWEEPS[index_type]:
+                apply_search_params(index, {**resolved, **search})
+                labels, mean_ms, p95_ms = time_queries(index, queries, args.k)
+                knob = ",".join(f"{key}={value}" for key, value in search.items())
+                label = f"{resolved['factory']} {knob}".strip()
+                found = recall(labels, truth, args.k)
+                print(
+                    f"   {label:<24} {build_seconds:>8.1f} {found:>7.3f} "
+                    f"{mean_ms:>8.3f} {p95_ms:>8.3f}"
+                )
+            del index
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+⏱️ Compressed Storage Benchmark
+In-memory index size and recall@k of each vector storage mode (float32,
+float16, 8-bit scalar quantisation, PQ) against exact float32 search, with
+and without exact re-ranking from the memory-mapped vectors.npy.
+"""
+
+import argparse
+import os
+import tempfile
+
+import faiss
+import numpy as np
+
+from benchmark_ann import make_vectors, recall, time_queries
+from vector_index import ServingIndex, build_index, index_params
+
+
+def main():
+    """Benchmark storage modes"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument(
+        "--dimension", type=int, default=1536, help="OpenAI embedding size"
+    )
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--type", default="flat", help="index type to compress")
+    parser.add_argument("--rerank", default="4,10", help="re-rank factors to try")
+    args = parser.parse_args()
+
+    print("⏱️ Compressed Storage Benchmark")
+    print("=" * 50)
+
+    data = make_vectors(args.vectors + args.queries, args.dimension)
+    vectors, queries = data[: args.vectors], data[args.vectors :]
+
+    exact = faiss.IndexFlatL2(args.dimension)
+    exact.add(vectors)
+    _, truth = exact.search(queries, args.k)
+    baseline_bytes = len(faiss.serialize_index(exact))
+    del exact
+
+    with tempfile.TemporaryDirectory() as tmp:
+        vectors_path = os.path.join(tmp, "vectors.npy")
+        np.save(vectors_path, vectors)
+        mapped = np.load(vectors_path, mmap_mode="r")
+
+        print(
+            f"\n📊 {args.vectors:,} vectors, {args.dimension} dims, "
+            f"{args.queries} queries, recall@{args.k} vs exact float32"
+        )
+        print(
+            f"   {'index':<22} {'B/vector':>9} {'memory':>8} {'rerank':>7} "
+            f"{'recall':>7} {'mean ms':>8}"
+        )
+        for storage in ("float32", "fp16", "sq8", "pq"):
+            index, resolved = build_index(
+                vectors, index_params(type=args.type, storage=storage, metric="l2")
+            )
+            size = len(faiss.serialize_index(index))
+            reduction = baseline_bytes / size
+
+            factors = [0]
+            if storage != "float32":
+                factors += [int(f) for f in args.rerank.split(",")]
+            for factor in factors:
+                searcher = ServingIndex(index, mapped, factor) if factor else index
+                labels, mean_ms, _ = time_queries(searcher, queries, args.k)
+                print(
+                    f"   {resolved['factory']:<22} {size / args.vectors:>9,.0f} "
+                    f"{reduction:>7.1f}x {factor or '-':>7} "
+                    f"{recall(labels, truth, args.k):>7.3f} {mean_ms:>8.3f}"
+                )
+            del index
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+⏱️ Cross-Source Dedup Benchmark
+Loads a synthetic catalog in which most sets arrive from several sources,
+then compares an index over the raw lego_data rows with one over the
+canonical lego_sets rows: vector count, index size and distinct-set
+recall@k for theme/subject queries.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+
+import duckdb
+import faiss
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from benchmark_upsert import SCHEMA
+from canonical import group_by_canonical_key, refresh_canonical_sets
+from db_writer import upsert_lego_data
+from index_builder import build_index_text, load_index_records
+from load_data import build_lego_data_row
+
+THEMES = [
+    "Star Wars",
+    "City",
+    "Technic",
+    "Creator",
+    "Ninjago",
+    "Friends",
+    "Ideas",
+    "Castle",
+]
+SUBJECTS = [
+    "starship",
+    "police station",
+    "fire truck",
+    "race car",
+    "castle",
+    "train",
+    "space shuttle",
+    "pirate ship",
+    "dragon",
+    "treehouse",
+    "excavator",
+    "helicopter",
+]
+ADJECTIVES = [
+    "Classic",
+    "Deluxe",
+    "Mini",
+    "Ultimate",
+    "Micro",
+    "Rescue",
+    "Turbo",
+    "Royal",
+]
+
+
+def make_catalog(set_count, seed=0):
+    """Yield (source, raw record, theme, subject) for a multi-source catalog"""
+    rng = random.Random(seed)
+    for i in range(set_count):
+        theme = rng.choice(THEMES)
+        subject = rng.choice(SUBJECTS)
+        name = f"{rng.choice(ADJECTIVES)} {subject.title()} {i}"
+        number = str(10000 + i)
+        year = 2000 + i % 25
+        pieces = 50 + (i * 37) % 4000
+
+        yield "rebrickable", {
+            "set_num": f"{number}-1",
+            "name": name,
+            "year": year,
+            "theme": theme,
+            "num_parts": pieces,
+        }, theme, subject
+        # Most sets are also listed by Brickset, some by a third catalog
+        if rng.random() < 0.8:
+            yield "brickset", {
+                "number": number,
+                "numberVariant": 1,
+                "name": name,
+                "year": year,
+                "theme": theme,
+                "pieces": pieces,
+                "rating": round(rng.uniform(3, 5), 1),
+            }, theme, subject
+        if rng.random() < 0.4:
+            yield "bricklink", {
+                "set_num": f"{number}-1",
+                "name": f"{name} Set",
+                "year": year,
+                "theme_name": theme,
+                "price": round(rng.uniform(10, 500), 2),
+            }, theme, subject
+
+
+def embed(vectorizer, texts):
+    """Sparse hashing features as dense unit vectors"""
+    return vectorizer.transform(texts).toarray().astype(np.float32)
+
+
+def build_index(vectors):
+    """Exact inner-product index over the vectors"""
+    index = faiss.IndexFlatIP(vectors.shape[1])
+    index.add(vectors)
+    return index
+
+
+def recall_at_k(index, ids, key_of, queries, vectorizer, k):
+    """Mean share of the relevant distinct sets found in the top k"""
+    _, neighbours = index.search(embed(vectorizer, [q for q, _ in queries]), k)
+    scores = []
+    for row, (_, relevant) in zip(neighbours, queries):
+        found = {key_of[ids[i]] for i in row if i >= 0} & relevant
+        scores.append(len(found) / min(k, len(relevant)))
+    return float(np.mean(scores))
+
+
+def main():
+    """Benchmark raw vs canonical indexes"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sets", type=int, default=5000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--features", type=int, default=4096)
+    args = parser.parse_args()
+
+    print("⏱️ Cross-Source Dedup Benchmark")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = duckdb.connect(os.path.join(tmp, "dedup.duckdb"))
+        conn.execute(SCHEMA)
+
+        rows, labels = [], {}
+        for source, record, theme, subject in make_catalog(args.sets):
+            row = build_lego_data_row(record, source)
+            rows.append(row)
+            labels[row["id"]] = (theme, subject)
+        upsert_lego_data(conn, rows)
+
+        raw_count, set_count = refresh_canonical_sets(conn)
+
+        # Canonical key of every raw row and every lego_sets row
+        key_of = {
+            row["id"]: key
+            for key, group in group_by_canonical_key(rows).items()
+            for row in group
+        }
+        key_of.update(
+            conn.execute("SELECT id, canonical_key FROM lego_sets").fetchall()
+        )
+
+        raw_ids, raw_texts = [], []
+        for row in rows:
+            raw_ids.append(row["id"])
+            raw_texts.append(
+                build_index_text(
+                    row["details"],
+                    row["name"],
+                    row["theme"],
+                    row["year"],
+                    row["pieces"],
+                )
+            )
+        canonical = load_index_records(conn)
+        set_ids = list(canonical)
+        set_texts = [canonical[i][0] for i in set_ids]
+        conn.close()
+
+    # Relevant sets per query: every set with the query's theme and subject
+    relevant = {}
+    for row_id, label in labels.items():
+        relevant.setdefault(label, set()).add(key_of[row_id])
+    queries = [
+        (f"{theme} {subject}", keys)
+        for (theme, subject), keys in sorted(relevant.items())
+        if len(keys) >= args.k
+    ]
+
+    vectorizer = HashingVectorizer(
+        n_features=args.features, alternate_sign=False, ngram_range=(1, 2)
+    )
+    raw_index = build_index(embed(vectorizer, raw_texts))
+    set_index = build_index(embed(vectorizer, set_texts))
+
+    raw_bytes = len(faiss.serialize_index(raw_index))
+    set_bytes = len(faiss.serialize_index(set_index))
+    raw_recall = recall_at_k(raw_index, raw_ids, key_of, queries, vectorizer, args.k)
+    set_recall = recall_at_k(set_index, set_ids, key_of, queries, vectorizer, args.k)
+
+    raw_mb, set_mb = raw_bytes / 2**20, set_bytes / 2**20
+    print(
+        f"\n📊 {raw_count:,} source records for {set_count:,} sets, "
+        f"{len(queries)} queries"
+    )
+    print(f"   Raw index:       {raw_index.ntotal:,} vectors, {raw_mb:.1f} MB")
+    print(f"   Canonical index: {set_index.ntotal:,} vectors, {set_mb:.1f} MB")
+    print(f"   Index size: {100 * (1 - set_bytes / raw_bytes):.0f}% smaller")
+    print(f"   Recall@{args.k} raw:       {raw_recall:.3f}")
+    print(f"   Recall@{args.k} canonical: {set_recall:.3f}")
+    print(f"   Recall@{args.k} gain: {set_recall - raw_recall:+.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+⏱️ Embedding Throughput Benchmark
+Measures texts/s against the local fake embeddings server: fixed-size
+batches sent one after another (the FAISS.from_texts default) versus the
+token-packed, concurrent dispatcher.
+"""
+
+import argparse
+import random
+import time
+
+from embedding_dispatcher import HTTPEmbeddings, ParallelEmbeddings
+from fake_embeddings_server import FakeEmbeddingsServer
+
+
+def make_texts(count, seed=0):
+    """Synthetic index texts of varying length, like the real catalog"""
+    rng = random.Random(seed)
+    words = "brick minifigure technic castle starship train city space ninja".split()
+    return [
+        f"LEGO Set: Set {i} | Theme: {rng.choice(words).title()} | Details: "
+        + " ".join(rng.choice(words) for _ in range(rng.randint(20, 120)))
+        for i in range(count)
+    ]
+
+
+def sequential_embed(embeddings, texts, chunk_size):
+    """Fixed-size chunks, one request at a time"""
+    vectors = []
+    for start in range(0, len(texts), chunk_size):
+        vectors.extend(embeddings.embed_documents(texts[start : start + chunk_size]))
+    return vectors
+
+
+def main():
+    """Benchmark sequential vs dispatched embedding"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--texts", type=int, default=5000)
+    parser.add_argument(
+        "--latency", type=float, default=0.2, help="per-request latency (s)"
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-batch-tokens", type=int, default=50000)
+    parser.add_argument(
+        "--dimensions",
+        type=int,
+        default=256,
+        help="vector size (small, so the stub's JSON encoding is not the bottleneck)",
+    )
+    args = parser.parse_args()
+
+    texts = make_texts(args.texts)
+
+    print("⏱️ Embedding Throughput Benchmark")
+    print("=" * 50)
+
+    with FakeEmbeddingsServer(args.dimensions, base_latency=args.latency) as server:
+        client = HTTPEmbeddings(server.base_url)
+
+        start = time.perf_counter()
+        baseline = sequential_embed(client, texts, chunk_size=1000)
+        sequential = time.perf_counter() - start
+        sequential_requests = server.request_count
+
+        dispatcher = ParallelEmbeddings(
+            client,
+            max_batch_tokens=args.max_batch_tokens,
+            concurrency=args.concurrency,
+        )
+        start = time.perf_counter()
+        dispatched = dispatcher.embed_documents(texts)
+        parallel = time.perf_counter() - start
+        parallel_requests = server.request_count - sequential_requests
+
+    assert dispatched == baseline, "dispatcher returned vectors out of order"
+
+    print(f"\n📊 {len(texts):,} texts, {args.latency * 1000:.0f} ms base latency")
+    print(
+        f"   Sequential: {sequential:.2f}s, {sequential_requests} requests "
+        f"({len(texts) / sequential:,.0f} texts/s)"
+    )
+    print(
+        f"   Dispatched: {parallel:.2f}s, {parallel_requests} requests "
+        f"({len(texts) / parallel:,.0f} texts/s)"
+    )
+    print(f"   Speedup: {sequential / parallel:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+⏱️ Embedding Quality Benchmark
+Retrieval quality and speed of the local TF-IDF + SVD embeddings against
+the remote model, over the lego_data catalog. Name queries ("Hailfire
+Droid") have the sets of that name as right answers (hit@1, hit@k, MRR);
+theme queries ("Star Wars sets") score precision@k by theme. "agree" is
+the overlap of each backend's top k with the remote model's. The remote
+model is OpenAI (needs OPENAI_API_KEY) or any OpenAI-compatible endpoint
+given with --remote-url; without either only the local model is scored.
+"""
+
+import argparse
+import os
+import random
+import time
+
+import duckdb
+import faiss
+import numpy as np
+
+from docstore import build_index_text
+from embedding_backend import get_embeddings
+from embedding_dispatcher import HTTPEmbeddings
+from local_embeddings import LocalEmbeddings
+
+
+def read_catalog(db_path):
+    """(texts, names, themes) of every lego_data record"""
+    conn = duckdb.connect(db_path, read_only=True)
+    try:
+        rows = conn.execute(
+            "SELECT details, name, theme, year, pieces FROM lego_data ORDER BY id"
+        ).fetchall()
+    finally:
+        conn.close()
+    texts = [build_index_text(*row) for row in rows]
+    return texts, [(row[1] or "").lower() for row in rows], [row[2] for row in rows]
+
+
+def make_queries(names, themes, count, k, seed=0):
+    """[(kind, query, relevant rows)] for name and theme queries"""
+    rng = random.Random(seed)
+    by_name, by_theme = {}, {}
+    for row, (name, theme) in enumerate(zip(names, themes)):
+        by_name.setdefault(name, set()).add(row)
+        if theme:
+            by_theme.setdefault(theme, set()).add(row)
+    named = [name for name in by_name if name]
+    queries = [
+        ("name", name, by_name[name])
+        for name in rng.sample(named, min(count, len(named)))
+    ]
+    queries += [
+        ("theme", f"{theme} sets", rows)
+        for theme, rows in sorted(by_theme.items())
+        if len(rows) >= k
+    ]
+    return queries
+
+
+def embed_matrix(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def score(kind, found, relevant, k):
+    """Metrics of one query's ranked rows"""
+    if kind == "theme":
+        return {"precision": len(set(found[:k]) & relevant) / k}
+    ranks = [rank for rank, row in enumerate(found[:k], start=1) if row in relevant]
+    return {
+        "hit@1": float(bool(ranks) and ranks[0] == 1),
+        f"hit@{k}": float(bool(ranks)),
+        "mrr": 1.0 / ranks[0] if ranks else 0.0,
+    }
+
+
+def evaluate(embeddings, texts, queries, k):
+    """Embed the catalog and queries; returns (top-k rows per query, timings)"""
+    start = time.perf_counter()
+    documents = embed_matrix(embeddings.embed_documents(texts))
+    docs_per_second = len(texts) / (time.perf_counter() - start)
+
+    vectors, latencies = [], []
+    for _, query, _ in queries:
+        start = time.perf_counter()
+        vectors.append(embeddings.embed_query(query))
+        latencies.append((time.perf_counter() - start) * 1000)
+    _, found = faiss.knn(
+        embed_matrix(vectors), documents, k, faiss.METRIC_INNER_PRODUCT
+    )
+    return found.tolist(), {
+        "docs/s": docs_per_second,
+        "query ms": float(np.mean(latencies)),
+        "p95 ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def main():
+    """Benchmark local against remote embeddings"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db", default="lego_data.duckdb")
+    parser.add_argument(
+        "--queries", type=int, default=200, help="name queries to sample"
+    )
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument(
+        "--dimension", type=int, default=256, help="local model dimension"
+    )
+    parser.add_argument(
+        "--remote-url", help="OpenAI-compatible endpoint instead of OpenAI"
+    )
+    args = parser.parse_args()
+
+    print("⏱️ Embedding Quality Benchmark")
+    print("=" * 50)
+
+    texts, names, themes = read_catalog(args.db)
+    queries = make_queries(names, themes, args.queries, args.k)
+    start = time.perf_counter()
+    backends = {"local": LocalEmbeddings.fit(texts, args.dimension)}
+    fit_seconds = time.perf_counter() - start
+    if args.remote_url:
+        backends["remote"] = HTTPEmbeddings(args.remote_url)
+    elif os.getenv("OPENAI_API_KEY"):
+        backends["remote"] = get_embeddings(backend="openai")
+    else:
+        print("⚠️  No OPENAI_API_KEY or --remote-url, scoring the local model only")
+
+    print(
+        f"📊 {len(texts)} records, {len(queries)} queries, "
+        f"local model fitted in {fit_seconds:.2f}s"
+    )
+    results = {
+        name: evaluate(embeddings, texts, queries, args.k)
+        for name, embeddings in backends.items()
+    }
+
+    print(
+        f"\n   {'backend':<8} {'hit@1':>6} {f'hit@{args.k}':>7} {'mrr':>6} "
+        f"{'prec@k':>7} {'agree':>6} {'query ms':>9} {'p95 ms':>8} {'docs/s':>9}"
+    )
+    for name, (found, timings) in results.items():
+        metrics = {}
+        for (kind, _, relevant), rows in zip(queries, found):
+            for metric, value in score(kind, rows, relevant, args.k).items():
+                metrics.setdefault(metric, []).append(value)
+        agree = "-"
+        if "remote" in results:
+            remote = results["remote"][0]
+            overlap = [len(set(a) & set(b)) / args.k for a, b in zip(found, remote)]
+            agree = f"{np.mean(overlap):.3f}"
+        means = {metric: np.mean(values) for metric, values in metrics.items()}
+        print(
+            f"   {name:<8} {means['hit@1']:>6.3f} {means[f'hit@{args.k}']:>7.3f} "
+            f"{means['mrr']:>6.3f} {means['precision']:>7.3f} {agree:>6} "
+            f"{timings['query ms']:>9.3f} {timings['p95 ms']:>8.3f} "
+            f"{timings['docs/s']:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+⏱️ Fetch Engine Benchmark
+Times the Rebrickable and Brickset loaders against the local stub server:
+one request at a time, on the concurrent fetch engine, with the on-disk
+HTTP cache cold, warm and revalidating, and against a stub that answers a
+share of requests with 429 + Retry-After (no records may be lost).
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import load_data
+from fetch_engine import FetchEngine
+from stub_server import StubServer
+
+
+def run_loaders(engine):
+    """Run both loaders on the given engine and return (seconds, records)"""
+    start = time.perf_counter()
+    rebrickable_sets = load_data.fetch_rebrickable_enhanced(1000, engine=engine)
+    brickset_sets = load_data.fetch_brickset_enhanced(1000, engine=engine)
+    elapsed = time.perf_counter() - start
+    return elapsed, len(rebrickable_sets) + len(brickset_sets)
+
+
+def point_loaders_at(stub, cache_dir):
+    """Point the loaders at the stub with dummy credentials"""
+    load_data.REBRICKABLE_API_URL = f"{stub.base_url}/rebrickable"
+    load_data.BRICKSET_API_URL = f"{stub.base_url}/brickset"
+    load_data.BRICKSET_HASH_FILE = os.path.join(cache_dir, "brickset_user_hash.json")
+    load_data.rebrickable_api_key = "stub"
+    load_data.brickset_api_key = "stub"
+    load_data.brickset_username = "stub"
+    load_data.brickset_password = "stub"
+
+
+def main():
+    """Benchmark sequential vs concurrent fetching"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--delay", type=float, default=0.2, help="stub latency (s)")
+    parser.add_argument("--per-host", type=int, default=8, help="per-host cap")
+    parser.add_argument(
+        "--error-rate", type=float, default=0.2, help="share of 429 replies"
+    )
+    parser.add_argument(
+        "--retry-after", type=int, default=1, help="Retry-After seconds"
+    )
+    args = parser.parse_args()
+
+    print("⏱️ Fetch Engine Benchmark")
+    print("=" * 50)
+
+    cache_dir = tempfile.mkdtemp(prefix="http_cache_")
+    timings, counts = {}, {}
+    with StubServer(delay=args.delay) as stub:
+        point_loaders_at(stub, cache_dir)
+        for label, engine in [
+            ("sequential", FetchEngine(max_workers=1, per_host_limit=1)),
+            ("concurrent", FetchEngine(per_host_limit=args.per_host)),
+            # Same engine with the HTTP cache: cold, then fresh within TTL,
+            # then stale entries revalidated with If-None-Match
+            (
+                "cache cold",
+                FetchEngine(per_host_limit=args.per_host, cache_dir=cache_dir),
+            ),
+            (
+                "cache warm",
+                FetchEngine(per_host_limit=args.per_host, cache_dir=cache_dir),
+            ),
+            (
+                "cache revalidate",
+                FetchEngine(
+                    per_host_limit=args.per_host, cache_dir=cache_dir, cache_ttls=[]
+                ),
+            ),
+        ]:
+            with engine:
+                requests_before = stub.request_count
+                not_modified_before = stub.not_modified_count
+                elapsed, records = run_loaders(engine)
+                requests_made = stub.request_count - requests_before
+                not_modified = stub.not_modified_count - not_modified_before
+            timings[label], counts[label] = elapsed, records
+            print(
+                f"\n📊 {label}: {elapsed:.2f}s for {requests_made} requests, "
+                f"{not_modified} answered 304 ({records} records)"
+            )
+        logins = stub.login_count
+
+    # Throttling stub: every lost record would show up as a lower count
+    with StubServer(
+        delay=args.delay, error_rate=args.error_rate, retry_after=args.retry_after
+    ) as stub:
+        point_loaders_at(stub, cache_dir)
+        with FetchEngine(per_host_limit=args.per_host) as engine:
+            elapsed, records = run_loaders(engine)
+            retried = engine.adapter.retried
+        timings["throttled"], counts["throttled"] = elapsed, records
+        print(
+            f"\n📊 429 injected: {elapsed:.2f}s for {stub.request_count} requests, "
+            f"{stub.throttled_count} answered 429, {retried} retried "
+            f"({records} records)"
+        )
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print("\n📈 Results:")
+    print(f"   Stub latency: {args.delay * 1000:.0f} ms per request")
+    print(f"   Sequential: {timings['sequential']:.2f}s")
+    print(f"   Concurrent: {timings['concurrent']:.2f}s")
+    speedup = timings["sequential"] / timings["concurrent"]
+    print(f"   Speedup: {speedup:.1f}x")
+    print(f"   Cache warm: {timings['cache warm']:.2f}s")
+    print(f"   Cache revalidate: {timings['cache revalidate']:.2f}s")
+    print(f"   Brickset logins over 5 runs: {logins}")
+    lost = counts["concurrent"] - counts["throttled"]
+    print(f"   Records lost with {args.error_rate:.0%} 429s: {lost}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+⏱️ Filtered Search Benchmark
+Recall@k and latency of metadata-filtered vector search at decreasing
+filter selectivity. "post" is the old approach: search fetch_k neighbours
+and drop non-matching ones in Python. "pre" builds a row mask from the
+columnar filter arrays and searches only matching rows (ID selector, or an
+exact scan when few rows match). Ground truth is an exact search over the
+matching rows.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from benchmark_ann import make_vectors
+from search_filters import META_DTYPE, FilterColumns
+from vector_index import build_index, exact_search, filtered_search, index_params
+
+THEME_COUNT = 150
+
+FILTERS = [
+    ("year >= 2000", {"year": {"$gte": 2000}}),
+    ("pieces 500-1500", {"pieces": {"$gte": 500, "$lte": 1500}}),
+    ("theme", {"theme": "theme-3"}),
+    ("theme + 2015-2020", {"theme": "theme-3", "year": {"$gte": 2015, "$lte": 2020}}),
+    ("theme + 2020 + < $50", {"theme": "theme-3", "year": 2020, "price": {"$lt": 50}}),
+]
+
+
+def make_columns(count, seed=0):
+    """Synthetic filter columns: skewed themes, recent-heavy years, prices by size"""
+    rng = np.random.default_rng(seed)
+    meta = np.empty(count, dtype=META_DTYPE)
+    weights = 1 / np.arange(1, THEME_COUNT + 1)
+    meta["theme"] = rng.choice(THEME_COUNT, count, p=weights / weights.sum())
+    meta["year"] = np.clip(2025 - rng.exponential(12, count), 1970, 2025).astype(int)
+    meta["pieces"] = rng.lognormal(5.5, 1.0, count).astype(int)
+    meta["price"] = meta["pieces"] * rng.uniform(0.08, 0.15, count)
+    return FilterColumns(meta, [f"theme-{i}" for i in range(THEME_COUNT)])
+
+
+def recall(found, truth, k):
+    """Share of the true filtered top k that was returned"""
+    hits = total = 0
+    for f, t in zip(found, truth):
+        t = set(t[t >= 0][:k])
+        hits += len(t & set(f[f >= 0][:k]))
+        total += len(t)
+    return hits / total if total else 1.0
+
+
+def post_filter(index, queries, k, mask, fetch_k):
+    """Search fetch_k neighbours, keep the first k that match"""
+    _, rows = index.search(queries, fetch_k)
+    labels = np.full((len(queries), k), -1, dtype=np.int64)
+    for i, row in enumerate(rows):
+        kept = row[(row >= 0) & mask[np.maximum(row, 0)]][:k]
+        labels[i, : len(kept)] = kept
+    return labels
+
+
+def timed(search, queries):
+    """Run ``search`` one query at a time; returns (labels, mean ms)"""
+    labels, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        labels.append(search(query[None, :])[0])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(labels), float(np.mean(latencies))
+
+
+def main():
+    """Benchmark pre- versus post-filtering across selectivities"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", default="flat,hnsw")
+    parser.add_argument(
+        "--fetch-k", default="20,200", help="post-filter over-fetch sizes"
+    )
+    args = parser.parse_args()
+
+    print("⏱️ Filtered Search Benchmark")
+    print("=" * 50)
+
+    data = make_vectors(args.vectors + args.queries, args.dimension)
+    vectors, queries = data[: args.vectors], data[args.vectors :]
+    columns = make_columns(args.vectors)
+    fetch_ks = [int(f) for f in args.fetch_k.split(",")]
+
+    for index_type in args.types.split(","):
+        index, resolved = build_index(
+            vectors, index_params(type=index_type, metric="l2")
+        )
+        print(f"\n📊 {resolved['factory']}: {args.vectors:,} vectors, recall@{args.k}")
+        print(
+            f"   {'filter':<22} {'match':>7} {'method':<12} "
+            f"{'recall':>7} {'mean ms':>8}"
+        )
+
+        for name, condition in FILTERS:
+            mask = columns.mask(condition)
+            matched = f"{mask.mean():.2%}"
+            _, truth = exact_search(vectors, queries, args.k, np.flatnonzero(mask))
+
+            for fetch_k in fetch_ks:
+                labels, mean_ms = timed(
+                    lambda q: post_filter(index, q, args.k, mask, fetch_k), queries
+                )
+                print(
+                    f"   {name:<22} {matched:>7} {f'post {fetch_k}':<12} "
+                    f"{recall(labels, truth, args.k):>7.3f} {mean_ms:>8.3f}"
+                )
+                matched = ""
+                name = ""
+
+            def pre(q):
+                # The mask is rebuilt per query, as the app does per search
+                _, labels = filtered_search(
+                    index, vectors, q, args.k, columns.mask(condition)
+                )
+                return labels
+
+            labels, mean_ms = timed(pre, queries)
+            print(
+                f"   {name:<22} {matched:>7} {'pre':<12} "
+                f"{recall(labels, truth, args.k):>7.3f} {mean_ms:>8.3f}"
+            )
+        index = None  # free it before building the next type
+
+
+if __name__ == "__main__":
+    main()
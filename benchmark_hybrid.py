@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+⏱️ Hybrid Search Benchmark
+Quality and latency of vector-only, BM25-only and hybrid (reciprocal rank
+fusion) search over a synthetic lego_sets catalog. The vector leg uses LSA
+embeddings (TF-IDF + truncated SVD), which like API embeddings capture
+topic words but blur rare tokens such as set numbers; embed_query sleeps
+--api-ms to stand in for the embeddings API round trip, which the BM25
+leg runs alongside. Set-number and name+number queries have one right
+answer (hit@1, hit@k); theme+subject queries score precision@k.
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import duckdb
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from benchmark_dedup import ADJECTIVES, SUBJECTS, THEMES
+from canonical import ensure_lego_sets_table
+from docstore import build_index_text
+from hybrid_search import hybrid_search_with_score
+from vector_index import index_params, load_vectorstore, save_vectorstore
+
+
+class LSAEmbeddings(Embeddings):
+    """TF-IDF + truncated SVD embeddings fitted on the catalog texts"""
+
+    def __init__(self, texts, dimension, api_ms=0):
+        self.vectorizer = TfidfVectorizer().fit(texts)
+        self.svd = TruncatedSVD(dimension, random_state=0).fit(
+            self.vectorizer.transform(texts)
+        )
+        self.api_ms = api_ms
+
+    def _embed(self, texts):
+        vectors = self.svd.transform(self.vectorizer.transform(texts))
+        vectors = vectors.astype(np.float32)
+        faiss.normalize_L2(vectors)
+        return vectors
+
+    def embed_documents(self, texts):
+        return self._embed(texts).tolist()
+
+    def embed_query(self, text):
+        time.sleep(self.api_ms / 1000)
+        return self._embed([text])[0].tolist()
+
+
+def make_catalog(conn, count, seed=0):
+    """Synthetic lego_sets rows as [(id, text, set_number, name, theme, subject)]"""
+    rng = random.Random(seed)
+    ensure_lego_sets_table(conn)
+    rows, catalog = [], []
+    for i in range(count):
+        theme, subject = rng.choice(THEMES), rng.choice(SUBJECTS)
+        # Names repeat across years, as real ones do; the number tells them apart
+        name = f"{rng.choice(ADJECTIVES)} {subject.title()}"
+        number = str(10000 + i)
+        details = json.dumps({"description": f"A {subject} for the {theme} collection"})
+        year, pieces = 2000 + i % 25, 50 + (i * 37) % 4000
+        rows.append((f"set-{i}", number, name, details, theme, year, pieces))
+        text = build_index_text(details, name, theme, year, pieces)
+        catalog.append((f"set-{i}", text, number, name, theme, subject))
+    conn.executemany(
+        "INSERT INTO lego_sets (id, set_number, name, details, theme, year, pieces) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    return catalog
+
+
+def make_queries(catalog, count, seed=1):
+    """(kind, query, relevant ids) for each query kind"""
+    rng = random.Random(seed)
+    queries = []
+    for row_id, _, number, name, theme, _ in rng.sample(catalog, count):
+        queries.append(("set number", f"set {number}", {row_id}))
+        queries.append(("name + number", f"{theme} {name} {number}", {row_id}))
+    for _ in range(count):
+        theme, subject = rng.choice(THEMES), rng.choice(SUBJECTS)
+        relevant = {c[0] for c in catalog if c[4] == theme and c[5] == subject}
+        queries.append(("theme + subject", f"{theme} {subject}", relevant))
+    return queries
+
+
+def vector_search(vectorstore, query, k):
+    return vectorstore.similarity_search_with_score(query, k=k)
+
+
+def bm25_search(vectorstore, query, k):
+    _, rows = vectorstore.lexical.search(query, k)
+    return vectorstore.documents_for_rows(rows, np.zeros(len(rows)))
+
+
+def hybrid_search(vectorstore, query, k):
+    return hybrid_search_with_score(vectorstore, query, k=k)
+
+
+def main():
+    """Benchmark vector, BM25 and hybrid retrieval"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sets", type=int, default=20000)
+    parser.add_argument("--dimension", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=100, help="queries per kind")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument(
+        "--api-ms", type=float, default=100, help="simulated embed_query latency"
+    )
+    args = parser.parse_args()
+
+    print("⏱️ Hybrid Search Benchmark")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = duckdb.connect(os.path.join(tmp, "catalog.duckdb"))
+        catalog = make_catalog(conn, args.sets)
+        texts = [text for _, text, *_ in catalog]
+        embeddings = LSAEmbeddings(texts, args.dimension)
+
+        vectors = np.array(embeddings.embed_documents(texts), dtype=np.float32)
+        index = faiss.IndexFlatL2(args.dimension)
+        index.add(vectors)
+        docstore = InMemoryDocstore(
+            {
+                row_id: Document(page_content="", metadata={"id": row_id})
+                for row_id, *_ in catalog
+            }
+        )
+        ids = {row: row_id for row, (row_id, *_) in enumerate(catalog)}
+        index_path = os.path.join(tmp, "index")
+        save_vectorstore(
+            FAISS(embeddings, index, docstore, ids),
+            index_path,
+            index_params(type="flat", storage="float32"),
+            conn=conn,
+        )
+        embeddings.api_ms = args.api_ms
+        vectorstore = load_vectorstore(embeddings, index_path, conn=conn)
+        queries = make_queries(catalog, args.queries)
+
+        print(f"\n📊 {args.sets:,} sets, {args.dimension}-dim LSA, top {args.k}")
+        print(
+            f"   {'query kind':<16} {'method':<8} {'hit@1':>6} {f'hit@{args.k}':>7} "
+            f"{f'prec@{args.k}':>8} {'mean ms':>8}"
+        )
+        for kind in ("set number", "name + number", "theme + subject"):
+            subset = [(q, relevant) for kind_, q, relevant in queries if kind_ == kind]
+            for method, search in (
+                ("vector", vector_search),
+                ("bm25", bm25_search),
+                ("hybrid", hybrid_search),
+            ):
+                first = any_hit = precision = 0.0
+                latencies = []
+                for query, relevant in subset:
+                    start = time.perf_counter()
+                    results = search(vectorstore, query, args.k)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    found = [doc.metadata["id"] for doc, _ in results]
+                    first += bool(found) and found[0] in relevant
+                    any_hit += bool(set(found) & relevant)
+                    precision += len(set(found) & relevant) / args.k
+                n = len(subset)
+                print(
+                    f"   {kind:<16} {method:<8} {first / n:>6.2f} {any_hit / n:>7.2f} "
+                    f"{precision / n:>8.2f} {np.mean(latencies):>8.1f}"
+                )
+                kind = ""
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
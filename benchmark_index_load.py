@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+⏱️ Index Load Benchmark
+Cold start and memory of N app worker processes each opening the same saved
+index. "pickle" is the old layout: index.faiss read into private memory and
+index.pkl unpickled. "mmap" is the current one: index.faiss and docs.npy
+memory-mapped, with documents fetched from lego_sets per search. PSS splits
+shared pages between the processes mapping them, so it is the real cost per
+worker; RSS counts shared pages in full.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+import duckdb
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.embeddings import FakeEmbeddings
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from benchmark_ann import make_vectors
+from canonical import ensure_lego_sets_table
+from docstore import build_index_text
+from vector_index import build_index, index_params, load_vectorstore, save_vectorstore
+
+THEMES = [
+    "City",
+    "Star Wars",
+    "Technic",
+    "Friends",
+    "Ninjago",
+    "Creator",
+    "Harry Potter",
+]
+
+
+def memory_mb():
+    """(RSS, PSS) of this process in MB"""
+    values = {}
+    with open("/proc/self/smaps_rollup", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                values[parts[0]] = int(parts[1]) / 1024
+    return values.get("Rss:", 0.0), values.get("Pss:", 0.0)
+
+
+def worker(index_path, db_path, dimension, mmap, barrier, results):
+    """Load the index like app.py does, search once, report timings and memory"""
+    embeddings = FakeEmbeddings(size=dimension)
+    conn = duckdb.connect(db_path, read_only=True)
+    baseline = memory_mb()
+
+    start = time.perf_counter()
+    vectorstore = load_vectorstore(embeddings, index_path, mmap=mmap, conn=conn)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    query = np.random.default_rng(os.getpid()).standard_normal(dimension).tolist()
+    start = time.perf_counter()
+    vectorstore.similarity_search_with_score_by_vector(query, k=10)
+    search_ms = (time.perf_counter() - start) * 1000
+
+    # Measure while every worker still has the index open
+    barrier.wait()
+    rss, pss = memory_mb()
+    results.put((load_ms, search_ms, rss - baseline[0], pss - baseline[1]))
+    barrier.wait()
+
+
+def make_catalog(conn, count, seed=0):
+    """Synthetic lego_sets rows; returns their (id, text) in index order"""
+    rng = np.random.default_rng(seed)
+    ensure_lego_sets_table(conn)
+    rows = []
+    for i in range(count):
+        details = json.dumps(
+            {"description": " ".join(rng.choice(THEMES, 40)), "ageRange": {"min": 8}}
+        )
+        year, pieces = int(rng.integers(1990, 2025)), int(rng.integers(20, 5000))
+        rows.append(
+            (
+                f"set-{i}",
+                f"{10000 + i}",
+                f"Set {i}",
+                details,
+                THEMES[i % len(THEMES)],
+                year,
+                pieces,
+            )
+        )
+    conn.executemany(
+        "INSERT INTO lego_sets (id, set_number, name, details, theme, year, pieces) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    return [
+        (row_id, build_index_text(details, name, theme, year, pieces))
+        for row_id, _, name, details, theme, year, pieces in rows
+    ]
+
+
+def save_indexes(tmp, vectors, catalog, params):
+    """Save the same index in the old pickle layout and the current one"""
+    documents = {
+        row_id: Document(page_content=text, metadata={"id": row_id})
+        for row_id, text in catalog
+    }
+    exact, _ = build_index(vectors, index_params(type="flat", storage="float32"))
+    vectorstore = FAISS(
+        FakeEmbeddings(size=vectors.shape[1]),
+        exact,
+        InMemoryDocstore(documents),
+        {row: row_id for row, (row_id, _) in enumerate(catalog)},
+    )
+
+    current = os.path.join(tmp, "current")
+    save_vectorstore(vectorstore, current, params)
+    legacy = os.path.join(tmp, "legacy")
+    serving, _ = build_index(vectors, params)
+    vectorstore.index = serving
+    vectorstore.save_local(legacy)
+    return legacy, current
+
+
+def directory_mb(path):
+    """Size of the files in an index directory"""
+    size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    return size / 1024 / 1024
+
+
+def main():
+    """Benchmark index loading across worker processes"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument(
+        "--dimension", type=int, default=1536, help="OpenAI embedding size"
+    )
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--type", default="flat", help="index type to save and load")
+    args = parser.parse_args()
+
+    print("⏱️ Index Load Benchmark")
+    print("=" * 50)
+
+    vectors = make_vectors(args.vectors, args.dimension)
+    context = multiprocessing.get_context("spawn")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "catalog.duckdb")
+        conn = duckdb.connect(db_path)
+        catalog = make_catalog(conn, args.vectors)
+        conn.close()
+        legacy, current = save_indexes(
+            tmp, vectors, catalog, index_params(type=args.type)
+        )
+
+        print(
+            f"\n📊 {args.type}: {args.vectors:,} vectors, {args.dimension} dims, "
+            f"{args.workers} workers"
+        )
+        print(
+            f"   {'mode':<8} {'disk MB':>8} {'load ms':>9} {'search ms':>10} "
+            f"{'RSS MB':>8} {'PSS MB':>8} {'total PSS':>10}"
+        )
+        for mode, index_path, mmap in (
+            ("pickle", legacy, False),
+            ("mmap", current, True),
+        ):
+            barrier = context.Barrier(args.workers)
+            results = context.Queue()
+            processes = [
+                context.Process(
+                    target=worker,
+                    args=(index_path, db_path, args.dimension, mmap, barrier, results),
+                )
+                for _ in range(args.workers)
+            ]
+            for process in processes:
+                process.start()
+            rows = [results.get() for _ in processes]
+            for process in processes:
+                process.join()
+
+            load_ms, search_ms, rss, pss = (np.mean(column) for column in zip(*rows))
+            print(
+                f"   {mode:<8} {directory_mb(index_path):>8,.0f} {load_ms:>9.1f} "
+                f"{search_ms:>10.1f} {rss:>8.0f} {pss:>8.0f} "
+                f"{pss * args.workers:>10.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
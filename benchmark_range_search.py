@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+⏱️ Similarity Threshold Benchmark
+Finding every set above a cosine similarity threshold on unit vectors.
+"top-k + drop" is the old approach: search a fixed k and drop results
+below the threshold in Python, which misses qualifying sets whenever more
+than k exist. "range" is one FAISS range search on the inner-product
+index. "found" is the share of the truly qualifying rows returned.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from benchmark_ann import make_vectors
+from vector_index import (
+    ServingIndex,
+    build_index,
+    index_params,
+    prepare_vectors,
+    range_search,
+)
+
+
+def timed(search, queries):
+    """Run ``search`` one query at a time; returns (rows per query, mean ms)"""
+    found, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        found.append(search(query))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return found, float(np.mean(latencies))
+
+
+def found_share(found, truth):
+    """Share of the qualifying rows that were returned"""
+    hits = sum(len(set(f) & t) for f, t in zip(found, truth))
+    total = sum(len(t) for t in truth)
+    return hits / total if total else 1.0
+
+
+def main():
+    """Benchmark threshold search: fixed top-k versus range search"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--types", default="flat,ivf_flat,hnsw")
+    parser.add_argument("--storage", default="float32")
+    parser.add_argument("--thresholds", default="0.75,0.8,0.85")
+    parser.add_argument(
+        "--top-k", default="10,100", help="fixed k sizes for top-k + drop"
+    )
+    args = parser.parse_args()
+
+    print("⏱️ Similarity Threshold Benchmark")
+    print("=" * 50)
+
+    params = {"metric": "cosine"}
+    data = prepare_vectors(
+        make_vectors(args.vectors + args.queries, args.dimension), params
+    )
+    vectors, queries = data[: args.vectors], data[args.vectors :]
+    thresholds = [float(t) for t in args.thresholds.split(",")]
+    top_ks = [int(k) for k in args.top_k.split(",")]
+
+    for index_type in args.types.split(","):
+        index, resolved = build_index(
+            vectors,
+            index_params(type=index_type, storage=args.storage, metric="cosine"),
+        )
+        index = ServingIndex(index, vectors, resolved.get("rerank"), cosine=True)
+        print(f"\n📊 {resolved['factory']}: {args.vectors:,} unit vectors")
+        print(
+            f"   {'threshold':>9} {'qualify':>8} {'method':<14} "
+            f"{'found':>6} {'mean ms':>8}"
+        )
+
+        for threshold in thresholds:
+            truth = [
+                set(np.flatnonzero(vectors @ query > threshold)) for query in queries
+            ]
+            label = f"{threshold:.2f}"
+            qualify = f"{np.mean([len(t) for t in truth]):.1f}"
+
+            for k in top_ks:
+
+                def top_k(query):
+                    scores, rows = index.search(query[None, :], k)
+                    return rows[0][scores[0] > threshold]
+
+                found, mean_ms = timed(top_k, queries)
+                print(
+                    f"   {label:>9} {qualify:>8} {f'top-{k} + drop':<14} "
+                    f"{found_share(found, truth):>6.3f} {mean_ms:>8.3f}"
+                )
+                label = qualify = ""
+
+            def ranged(query):
+                return range_search(index, vectors, query, threshold)[1]
+
+            found, mean_ms = timed(ranged, queries)
+            print(
+                f"   {'':>9} {'':>8} {'range':<14} "
+                f"{found_share(found, truth):>6.3f} {mean_ms:>8.3f}"
+            )
+        index = None  # free it before building the next type
+
+
+if __name__ == "__main__":
+    main()
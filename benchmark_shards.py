@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+⏱️ Sharded Index Benchmark
+Theme-style queries against one index over the whole catalog versus
+per-theme shards behind the centroid router, as the catalog grows.
+Vectors are clustered by theme (each theme a region of embedding space
+with its own sub-clusters). "theme" queries sit near one theme,
+"between" queries halfway between two, which the router fans out on.
+Recall@k is against an exact search of the whole catalog; "shards" is the
+mean number of shards a query was sent to.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+from index_shards import ShardedIndex, save_shards
+from search_filters import META_DTYPE
+from vector_index import ServingIndex, build_index, index_params, prepare_vectors
+
+
+def make_catalog(count, themes, dimension, seed=0):
+    """Unit vectors clustered by theme; returns (vectors, meta, theme centers)"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((themes, dimension)).astype(np.float32)
+    subclusters = rng.standard_normal((themes, 20, dimension)).astype(np.float32) * 0.6
+    theme = rng.integers(0, themes, count)
+    vectors = (
+        centers[theme]
+        + subclusters[theme, rng.integers(0, 20, count)]
+        + 0.4 * rng.standard_normal((count, dimension)).astype(np.float32)
+    )
+    meta = np.empty(count, dtype=META_DTYPE)
+    meta["theme"] = theme
+    meta["year"] = rng.integers(1990, 2025, count)
+    meta["pieces"] = meta["price"] = np.nan
+    return prepare_vectors(vectors, {"metric": "cosine"}), meta, centers
+
+
+def timed(search, queries):
+    """Run ``search`` one query at a time; returns (rows, mean ms)"""
+    found, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        found.append(search(query))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return found, float(np.mean(latencies))
+
+
+def recall(found, truth, k):
+    """Share of the true top k present in the returned top k"""
+    hits = sum(len(set(f[:k]) & set(t[:k])) for f, t in zip(found, truth))
+    return hits / (len(truth) * k)
+
+
+def main():
+    """Benchmark whole-catalog versus routed shard search"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="50000,200000")
+    parser.add_argument("--themes", type=int, default=40)
+    parser.add_argument("--dimension", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument(
+        "--type", default="flat", help="index type of the whole index and shards"
+    )
+    args = parser.parse_args()
+
+    print("⏱️ Sharded Index Benchmark")
+    print("=" * 50)
+
+    params = index_params(type=args.type, metric="cosine", shard_by="theme")
+    themes = [f"theme-{i}" for i in range(args.themes)]
+    for size in (int(s) for s in args.sizes.split(",")):
+        vectors, meta, centers = make_catalog(size, args.themes, args.dimension)
+        rng = np.random.default_rng(1)
+        first, second = rng.integers(0, args.themes, (2, args.queries))
+        noise = 0.8 * rng.standard_normal((args.queries, args.dimension))
+        query_sets = {
+            "theme": prepare_vectors(centers[first] + noise, {"metric": "cosine"}),
+            "between": prepare_vectors(
+                centers[first] + centers[second] + noise, {"metric": "cosine"}
+            ),
+        }
+
+        index, resolved = build_index(vectors, params)
+        whole = ServingIndex(index, vectors, resolved.get("rerank"), cosine=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            ids = [str(i) for i in range(size)]
+            save_shards(tmp, tmp, vectors, ids, ids, meta, themes, params)
+            np.save(os.path.join(tmp, "vectors.npy"), vectors)
+            shards = ShardedIndex.load(
+                tmp, np.load(os.path.join(tmp, "vectors.npy"), mmap_mode="r")
+            )
+
+            print(
+                f"\n📊 {size:,} sets, {len(shards.keys)} theme shards, "
+                f"{resolved['factory']}"
+            )
+            print(
+                f"   {'queries':<8} {'search':<8} {'recall':>7} "
+                f"{'shards':>7} {'mean ms':>8}"
+            )
+            for kind, queries in query_sets.items():
+                _, truth = faiss.knn(
+                    queries, vectors, args.k, faiss.METRIC_INNER_PRODUCT
+                )
+
+                def search_whole(query):
+                    return whole.search(query[None, :], args.k)[1][0]
+
+                found, mean_ms = timed(search_whole, queries)
+                print(
+                    f"   {kind:<8} {'whole':<8} {recall(found, truth, args.k):>7.3f} "
+                    f"{'-':>7} {mean_ms:>8.3f}"
+                )
+                fanout = [len(shards.route(q)) for q in queries]
+                found, mean_ms = timed(lambda q: shards.search(q, args.k)[1], queries)
+                print(
+                    f"   {'':<8} {'routed':<8} {recall(found, truth, args.k):>7.3f} "
+                    f"{np.mean(fanout):>7.2f} {mean_ms:>8.3f}"
+                )
+            shards = None  # free each layout before building the next size
+        whole = index = None
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+⏱️ Bulk Upsert Benchmark
+Compares the batched lego_data upsert with the previous one-INSERT-per-row
+loop at several row counts, each against a fresh on-disk DuckDB file.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import duckdb
+
+from db_writer import LEGO_DATA_COLUMNS, upsert_lego_data
+from load_data import generate_unique_id
+
+SCHEMA = """
+    CREATE TABLE lego_data (
+        id VARCHAR PRIMARY KEY,
+        source VARCHAR,
+        name VARCHAR,
+        details TEXT,
+        set_number VARCHAR,
+        year INTEGER,
+        theme VARCHAR,
+        pieces INTEGER,
+        minifigures INTEGER,
+        price DECIMAL(10,2),
+        rating DECIMAL(3,2),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+def make_rows(count):
+    """Generate synthetic lego_data rows"""
+    rows = []
+    for i in range(count):
+        set_number = f"{10000 + i}-1"
+        record = {"set_num": set_number, "name": f"Set {i}", "year": 2000 + i % 25}
+        rows.append(
+            {
+                "id": generate_unique_id("benchmark", set_number),
+                "source": "benchmark",
+                "name": record["name"],
+                "details": json.dumps(record),
+                "set_number": set_number,
+                "year": record["year"],
+                "theme": f"Theme {i % 40}",
+                "pieces": 50 + i % 5000,
+                "minifigures": i % 8,
+                "price": round(9.99 + i % 500, 2),
+                "rating": round((i % 50) / 10, 2),
+            }
+        )
+    return rows
+
+
+def row_by_row_upsert(conn, rows):
+    """The previous save path: one INSERT OR REPLACE per record"""
+    for row in rows:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO lego_data
+            (id, source, name, details, set_number, year, theme, pieces, minifigures,
+             price, rating)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+            [row[column] for column in LEGO_DATA_COLUMNS],
+        )
+    return len(rows)
+
+
+def time_load(writer, rows):
+    """Time one load into a fresh database file"""
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = duckdb.connect(os.path.join(tmp, "bench.duckdb"))
+        conn.execute(SCHEMA)
+        start = time.perf_counter()
+        writer(conn, rows)
+        conn.commit()
+        elapsed = time.perf_counter() - start
+        count = conn.execute("SELECT COUNT(*) FROM lego_data").fetchone()[0]
+        conn.close()
+    assert count == len(rows), f"expected {len(rows)} rows, found {count}"
+    return elapsed
+
+
+def main():
+    """Benchmark row-by-row vs batched upserts"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000], help="row counts"
+    )
+    args = parser.parse_args()
+
+    print("⏱️ Bulk Upsert Benchmark")
+    print("=" * 50)
+
+    for size in args.sizes:
+        rows = make_rows(size)
+        batched = time_load(upsert_lego_data, rows)
+        row_by_row = time_load(row_by_row_upsert, rows)
+
+        print(f"\n📊 {size:,} rows")
+        print(f"   Row by row: {row_by_row:.2f}s ({size / row_by_row:,.0f} rows/s)")
+        print(f"   Batched:    {batched:.2f}s ({size / batched:,.0f} rows/s)")
+        print(f"   Speedup:    {row_by_row / batched:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+🧩 Canonical Set Records
+The same physical set arrives from several sources under slightly different
+numbers (Rebrickable ``75192-1``, Brickset ``75192``). This stage maps every
+lego_data row to a canonical set key and merges each group into one
+lego_sets row by source priority, so the index holds one vector per set.
+Each lego_sets row lists the lego_data ids it was merged from, so a record
+whose key changes is moved out of the set it used to belong to.
+"""
+
+import hashlib
+import json
+import re
+
+import pandas as pd
+
+# Earlier sources win when several provide the same field
+SOURCE_PRIORITY = ["rebrickable", "brickset", "brickowl", "bricklink"]
+
+# Fields where another source is more authoritative than the default order
+FIELD_PRIORITY = {
+    "price": ["brickset", "brickowl", "bricklink", "rebrickable"],
+    "rating": ["brickset", "brickowl", "bricklink", "rebrickable"],
+}
+
+MERGED_FIELDS = ["name", "year", "theme", "pieces", "minifigures", "price", "rating"]
+
+LEGO_SETS_COLUMNS = [
+    "id",
+    "canonical_key",
+    "sources",
+    "name",
+    "details",
+    "set_number",
+    "year",
+    "theme",
+    "pieces",
+    "minifigures",
+    "price",
+    "rating",
+    "source_ids",
+]
+
+# LEGO set numbers: digits with an optional "-<variant>" suffix
+SET_NUMBER_RE = re.compile(r"^(\d{3,7})(?:-(\d+))?$")
+
+
+def canonical_set_key(set_number, name=None, year=None, variant=None):
+    """Canonical key for a set; variant 1 is the default and is dropped.
+
+    Records without a real set number (the sample sources use ids such as
+    ``arch_001``) fall back to their normalised name and year.
+    """
+    number = str(set_number or "").strip().lower()
+    match = SET_NUMBER_RE.match(number)
+    if match:
+        number, suffix = match.groups()
+        variant = suffix or variant
+        if variant and int(variant) != 1:
+            return f"{number}-{int(variant)}"
+        return number
+
+    normalised = re.sub(r"[^a-z0-9]+", " ", str(name or "").lower()).strip()
+    if normalised:
+        return f"name:{normalised}|{year or ''}"
+    return f"raw:{number}"
+
+
+def canonical_id(key):
+    """Stable lego_sets id, independent of which sources hold the set"""
+    return hashlib.md5(f"canonical_{key}".encode()).hexdigest()
+
+
+def _source_rank(source, order=SOURCE_PRIORITY):
+    """Position of a source in a priority list; unknown sources go last"""
+    return order.index(source) if source in order else len(order)
+
+
+def _is_missing(value):
+    return value is None or value == "" or (isinstance(value, float) and pd.isna(value))
+
+
+def merge_records(key, records):
+    """Merge lego_data rows describing the same set into one lego_sets row"""
+    records = sorted(records, key=lambda r: (_source_rank(r["source"]), r["id"]))
+
+    merged = {"id": canonical_id(key), "canonical_key": key}
+    for field in MERGED_FIELDS:
+        order = FIELD_PRIORITY.get(field, SOURCE_PRIORITY)
+        merged[field] = None
+        for record in sorted(records, key=lambda r: _source_rank(r["source"], order)):
+            if not _is_missing(record[field]) and record[field] != 0:
+                merged[field] = record[field]
+                break
+
+    # Details: the primary source's payload, topped up with keys only the
+    # other sources have
+    details = {}
+    for record in records:
+        try:
+            extra = json.loads(record["details"]) if record["details"] else {}
+        except ValueError:
+            extra = {}
+        for name, value in extra.items():
+            if _is_missing(details.get(name)):
+                details[name] = value
+    sources = list(dict.fromkeys(r["source"] for r in records))
+    details["sources"] = sources
+
+    merged["sources"] = ",".join(sources)
+    merged["source_ids"] = [r["id"] for r in records]
+    merged["set_number"] = records[0]["set_number"]
+    merged["details"] = json.dumps(details, ensure_ascii=False, default=str)
+    return merged
+
+
+def group_by_canonical_key(rows):
+    """Group lego_data rows (dicts) by canonical set key"""
+    groups = {}
+    for row in rows:
+        variant = None
+        if row.get("details"):
+            try:
+                variant = json.loads(row["details"]).get("numberVariant")
+            except (ValueError, AttributeError):
+                variant = None
+        key = canonical_set_key(row["set_number"], row["name"], row["year"], variant)
+        groups.setdefault(key, []).append(row)
+    return groups
+
+
+def ensure_lego_sets_table(conn):
+    """Create the canonical lego_sets table if it does not exist yet"""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS lego_sets (
+            id VARCHAR PRIMARY KEY,
+            canonical_key VARCHAR,
+            sources VARCHAR,
+            name VARCHAR,
+            details TEXT,
+            set_number VARCHAR,
+            year INTEGER,
+            theme VARCHAR,
+            pieces INTEGER,
+            minifigures INTEGER,
+            price DECIMAL(10,2),
+            rating DECIMAL(3,2),
+            source_ids VARCHAR[]
+        )
+    """
+    )
+    # Tables created before source ids were tracked; the next full refresh fills them
+    conn.execute("ALTER TABLE lego_sets ADD COLUMN IF NOT EXISTS source_ids VARCHAR[]")
+
+
+def _fetch_rows(conn, where="", params=None):
+    """lego_data rows as dicts, optionally filtered"""
+    raw = conn.execute(
+        f"""
+        SELECT id, source, name, details, set_number, year, theme,
+               pieces, minifigures, price, rating
+        FROM lego_data
+        {where}
+    """,
+        params or [],
+    ).fetchdf()
+    return raw.astype(object).where(raw.notna(), None).to_dict("records")
+
+
+def _write_sets(conn, merged, replace_all=False, delete_ids=()):
+    """Write merged rows to lego_sets in one statement, dropping ``delete_ids``"""
+    batch = pd.DataFrame(merged, columns=LEGO_SETS_COLUMNS)
+    for column in ("year", "pieces", "minifigures"):
+        batch[column] = pd.to_numeric(batch[column], errors="coerce").astype("Int64")
+    for column in ("price", "rating"):
+        batch[column] = pd.to_numeric(batch[column], errors="coerce").astype("Float64")
+
+    ensure_lego_sets_table(conn)
+    conn.register("lego_sets_batch", batch)
+    try:
+        conn.execute("BEGIN TRANSACTION")
+        if replace_all:
+            conn.execute("DELETE FROM lego_sets")
+        elif delete_ids:
+            conn.execute(
+                "DELETE FROM lego_sets WHERE id IN (SELECT unnest(?))",
+                [sorted(delete_ids)],
+            )
+        columns = ", ".join(LEGO_SETS_COLUMNS)
+        conn.execute(
+            f"""
+            INSERT OR REPLACE INTO lego_sets ({columns})
+            SELECT {columns} FROM lego_sets_batch
+        """
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.unregister("lego_sets_batch")
+
+
+def refresh_canonical_sets(conn):
+    """Rebuild lego_sets from lego_data; returns (raw_rows, canonical_sets)"""
+    rows = _fetch_rows(conn)
+    merged = [
+        merge_records(key, group) for key, group in group_by_canonical_key(rows).items()
+    ]
+    _write_sets(conn, merged, replace_all=True)
+
+    print(f"  Canonicalised {len(rows)} source records into {len(merged)} sets")
+    return len(rows), len(merged)
+
+
+def _merge_keys(conn, keys):
+    """Merge the stored lego_data rows of the given canonical keys"""
+    # Superset of the stored rows for these keys, narrowed in Python below
+    numbers, names = set(), set()
+    for key in keys:
+        if key.startswith("name:"):
+            names.add(key[len("name:") :].rsplit("|", 1)[0])
+        elif key.startswith("raw:"):
+            numbers.add(key[len("raw:") :])
+        else:
+            base = key.split("-", 1)[0]
+            numbers.update({key, base, f"{base}-1"})
+
+    stored = _fetch_rows(
+        conn,
+        """
+        WHERE lower(trim(set_number)) IN (SELECT unnest(?))
+           OR trim(regexp_replace(lower(name), '[^a-z0-9]+', ' ', 'g'))
+              IN (SELECT unnest(?))
+    """,
+        [sorted(numbers), sorted(names)],
+    )
+    groups = group_by_canonical_key(stored)
+    return [merge_records(key, groups[key]) for key in keys if key in groups]
+
+
+def upsert_canonical_sets(conn, rows):
+    """Re-merge only the sets touched by the given lego_data rows.
+
+    Every stored source record of those sets is re-read, so a set seen on
+    one source in this batch still merges with what other sources stored
+    earlier. A set that held one of these records under its old key (a
+    renamed name-keyed record, say) is re-merged from its other records,
+    or deleted when it has none left, like refresh_canonical_sets would.
+    Returns the merged lego_sets rows.
+    """
+    keys = set(group_by_canonical_key(rows))
+    if not keys:
+        return []
+
+    ensure_lego_sets_table(conn)
+    merged = _merge_keys(conn, keys)
+    members = {source_id for record in merged for source_id in record["source_ids"]}
+    stale = conn.execute(
+        """
+        SELECT id, source_ids FROM lego_sets
+        WHERE list_has_any(source_ids, ?) AND id NOT IN (SELECT unnest(?))
+    """,
+        [sorted(members), [record["id"] for record in merged]],
+    ).fetchall()
+
+    delete_ids = {set_id for set_id, _ in stale}
+    remaining = sorted({i for _, source_ids in stale for i in source_ids} - members)
+    if remaining:
+        rest = _fetch_rows(conn, "WHERE id IN (SELECT unnest(?))", [remaining])
+        regrouped = _merge_keys(conn, set(group_by_canonical_key(rest)) - keys)
+        merged += regrouped
+        delete_ids -= {record["id"] for record in regrouped}
+
+    if merged or delete_ids:
+        _write_sets(conn, merged, delete_ids=delete_ids)
+    return merged
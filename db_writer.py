@@ -0,0 +1,137 @@
+"""
+💾 Bulk DuckDB Writer
+Batched upsert path for lego_data: rows are validated one by one, collected
+into columnar DataFrame batches and merged with one statement per batch.
+"""
+
+import pandas as pd
+
+LEGO_DATA_COLUMNS = [
+    "id",
+    "source",
+    "name",
+    "details",
+    "set_number",
+    "year",
+    "theme",
+    "pieces",
+    "minifigures",
+    "price",
+    "rating",
+]
+
+INTEGER_COLUMNS = ["year", "pieces", "minifigures"]
+# DECIMAL(10,2) and DECIMAL(3,2) upper bounds
+DECIMAL_LIMITS = {"price": 10**8, "rating": 10}
+
+DEFAULT_BATCH_SIZE = 10000
+
+
+def _to_int(value):
+    """Coerce a value to int, keeping missing values as None"""
+    if value is None or value == "":
+        return None
+    return int(value)
+
+
+def _to_decimal(value, limit):
+    """Coerce a value to a float that fits the column's DECIMAL range"""
+    if value is None or value == "":
+        return None
+    value = float(value)
+    if abs(value) >= limit:
+        raise ValueError(f"{value} out of range for DECIMAL column")
+    return value
+
+
+def validate_row(row):
+    """Return a copy of the row with every column coerced to its DB type"""
+    clean = {column: row.get(column) for column in LEGO_DATA_COLUMNS}
+    if not clean["id"]:
+        raise ValueError("missing id")
+    for column in INTEGER_COLUMNS:
+        clean[column] = _to_int(clean[column])
+    for column, limit in DECIMAL_LIMITS.items():
+        clean[column] = _to_decimal(clean[column], limit)
+    return clean
+
+
+def _build_batch(rows):
+    """Turn validated rows into a typed DataFrame, last write wins per id"""
+    frame = pd.DataFrame.from_records(rows, columns=LEGO_DATA_COLUMNS)
+    frame = frame.drop_duplicates(subset="id", keep="last")
+    for column in INTEGER_COLUMNS:
+        frame[column] = frame[column].astype("Int64")
+    for column in DECIMAL_LIMITS:
+        frame[column] = frame[column].astype("Float64")
+    return frame
+
+
+def _insert_row(conn, row):
+    """Single-row fallback used to pinpoint failures inside a batch"""
+    conn.execute(
+        f"""
+        INSERT OR REPLACE INTO lego_data
+        ({", ".join(LEGO_DATA_COLUMNS)})
+        VALUES ({", ".join("?" for _ in LEGO_DATA_COLUMNS)})
+    """,
+        [row[column] for column in LEGO_DATA_COLUMNS],
+    )
+
+
+def _write_batch(conn, rows, on_error):
+    """Merge one batch into lego_data, falling back to per-row on failure"""
+    batch = _build_batch(rows)
+    columns = ", ".join(LEGO_DATA_COLUMNS)
+    try:
+        conn.register("lego_data_batch", batch)
+        conn.execute(
+            f"""
+            INSERT OR REPLACE INTO lego_data ({columns})
+            SELECT {columns} FROM lego_data_batch
+        """
+        )
+        return len(batch)
+    except Exception:
+        # Retry row by row so only the offending rows are reported
+        saved = 0
+        for row in batch.astype(object).where(batch.notna(), None).to_dict("records"):
+            try:
+                _insert_row(conn, row)
+                saved += 1
+            except Exception as e:
+                on_error(row, e)
+        return saved
+    finally:
+        conn.unregister("lego_data_batch")
+
+
+def upsert_lego_data(conn, rows, batch_size=DEFAULT_BATCH_SIZE, on_error=None):
+    """Upsert an iterable of lego_data rows in columnar batches.
+
+    ``rows`` are dicts keyed by LEGO_DATA_COLUMNS. Rows that fail validation
+    or insertion are passed to ``on_error(row, exception)`` and skipped.
+    Returns the number of rows written.
+    """
+    if on_error is None:
+
+        def on_error(row, e):
+            print(f"  Error saving set {row.get('set_number', 'unknown')}: {e}")
+
+    saved = 0
+    batch = []
+    for row in rows:
+        try:
+            batch.append(validate_row(row))
+        except Exception as e:
+            on_error(row, e)
+            continue
+
+        if len(batch) >= batch_size:
+            saved += _write_batch(conn, batch, on_error)
+            batch = []
+
+    if batch:
+        saved += _write_batch(conn, batch, on_error)
+
+    return saved
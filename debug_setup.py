@@ -301,24 +301,28 @@ def test_faiss_index():
     print_header("FAISS Index Test")
 
     faiss_index_path = "./faiss_index"
+    # The current snapshot, or the directory itself for unversioned indexes
+    from index_snapshots import resolve_index_path
 
-    if os.path.exists(f"{faiss_index_path}/index.faiss") and os.path.exists(
-        f"{faiss_index_path}/index.pkl"
+    live_path = resolve_index_path(faiss_index_path)
+
+    if os.path.exists(f"{live_path}/index.faiss") and os.path.exists(
+        f"{live_path}/docs.npy"
     ):
         print_success("FAISS index files found")
 
         try:
             # Try to load the index
-            from langchain_openai import OpenAIEmbeddings
-            from langchain_community.vectorstores import FAISS
+            from embedding_backend import get_embeddings
+            from vector_index import load_vectorstore
 
             api_key = os.getenv("OPENAI_API_KEY")
             if not api_key:
                 print_error("OpenAI API key required to test FAISS index")
                 return False
 
-            embeddings = OpenAIEmbeddings(openai_api_key=api_key)
-            vectorstore = FAISS.load_local(faiss_index_path, embeddings)
+            embeddings = get_embeddings(api_key)
+            vectorstore = load_vectorstore(embeddings, faiss_index_path)
 
             # Test similarity search
             docs = vectorstore.similarity_search("test", k=1)
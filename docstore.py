@@ -0,0 +1,195 @@
+"""
+📚 DuckDB Document Store
+Serves the documents behind FAISS search results from lego_sets rows
+instead of a pickled copy of every text. The index directory keeps
+docs.npy (the lego_sets id and content hash of each FAISS row), which is
+memory-mapped like the index itself, and docs.parquet, a copy of the
+indexed lego_sets rows that is loaded into in-memory DuckDB. Serving processes
+read documents from the snapshot they loaded and never open
+lego_data.duckdb, so loaders can always take its write lock.
+"""
+
+import hashlib
+import json
+import os
+from collections.abc import Mapping
+
+import duckdb
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_core.documents import Document
+
+DB_PATH = "lego_data.duckdb"
+DOCS_FILE = "docs.npy"
+DOCSTORE_FILE = "docs.parquet"
+
+# Characters of a set's details JSON included in its embedded text. Every
+# index builder and loader uses this, so the same set always hashes the same
+DETAILS_CHARS = 500
+
+# lego_sets columns returned as document metadata
+METADATA_COLUMNS = ["id", "set_number", "name", "theme", "year", "pieces", "price"]
+
+
+def build_index_text(details, name, theme, year, pieces, details_chars=DETAILS_CHARS):
+    """Create the text representation that gets embedded for one record"""
+    details = json.loads(details) if details else {}
+    name = name or ""
+    theme = theme or ""
+    year = year or ""
+    pieces = pieces or ""
+
+    # Keep the text compact to avoid token limits
+    details_text = json.dumps(details, ensure_ascii=False)[:details_chars]
+    return (
+        f"LEGO Set: {name} | Theme: {theme} | Year: {year} | Pieces: {pieces} | "
+        f"Details: {details_text}"
+    )
+
+
+def content_hash(text):
+    """Hash of the embedded text; changes whenever the vector must change"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def sql_string(value):
+    """``value`` as a quoted SQL string literal, for paths DuckDB cannot bind"""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def save_docstore(conn, index_path, ids):
+    """Copy the lego_sets rows of ``ids`` to the index's docs.parquet, sorted by id.
+
+    The same rows always give the same file, so unchanged copies can be
+    compared byte for byte.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"""
+            COPY (
+                SELECT {", ".join(METADATA_COLUMNS)}, details
+                FROM lego_sets
+                WHERE id IN (SELECT unnest(?))
+                ORDER BY id
+            ) TO {sql_string(os.path.join(index_path, DOCSTORE_FILE))} (FORMAT parquet)
+        """,
+            [list(ids)],
+        )
+
+
+def save_docs(index_path, ids, hashes):
+    """Write the id and content hash of every FAISS row, in row order"""
+    id_width = max((len(i) for i in ids), default=1)
+    hash_width = max((len(h) for h in hashes), default=1)
+    docs = np.empty(
+        len(ids), dtype=[("id", f"U{id_width}"), ("content_hash", f"U{hash_width}")]
+    )
+    docs["id"] = ids
+    docs["content_hash"] = hashes
+    np.save(os.path.join(index_path, DOCS_FILE), docs)
+
+
+def load_docs(index_path, mmap=True):
+    """docs.npy as a structured array, memory-mapped read-only by default"""
+    return np.load(os.path.join(index_path, DOCS_FILE), mmap_mode="r" if mmap else None)
+
+
+class RowIds(Mapping):
+    """FAISS row -> lego_sets id, read from docs.npy on demand"""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __getitem__(self, row):
+        if not 0 <= row < len(self.docs):
+            raise KeyError(row)
+        return str(self.docs["id"][row])
+
+    def __len__(self):
+        return len(self.docs)
+
+    def __iter__(self):
+        return iter(range(len(self.docs)))
+
+
+class DuckDBDocstore(Docstore):
+    """Read-only docstore that builds documents from lego_sets rows.
+
+    ``mget`` fetches any number of ids with one query; page_content is
+    rebuilt with the same ``build_index_text`` the index was embedded from.
+    Rows are read through ``conn``, or without one from ``path`` with a
+    short-lived read-only connection per call, so the database is never
+    held open between calls.
+    """
+
+    def __init__(self, conn=None, details_chars=DETAILS_CHARS, path=DB_PATH):
+        self.conn = conn
+        self.path = path
+        self.details_chars = details_chars
+
+    @classmethod
+    def open_snapshot(cls, index_path, details_chars=DETAILS_CHARS):
+        """Docstore over the docs.parquet saved with an index, or None without one.
+
+        The documents are copied into an in-memory database, so they stay
+        readable after the snapshot directory is pruned.
+        """
+        path = os.path.abspath(os.path.join(index_path, DOCSTORE_FILE))
+        if not os.path.exists(path):
+            return None
+        conn = duckdb.connect()
+        conn.execute(
+            "CREATE TABLE lego_sets AS "
+            f"SELECT * FROM read_parquet({sql_string(path)})"
+        )
+        return cls(conn, details_chars)
+
+    def _cursor(self):
+        # A cursor per call keeps this safe from concurrent sessions
+        if self.conn is not None:
+            return self.conn.cursor()
+        return duckdb.connect(self.path, read_only=True)
+
+    def _documents(self, where, params):
+        """Documents for the lego_sets rows matching ``where``, in id order"""
+        with self._cursor() as cursor:
+            rows = cursor.execute(
+                f"""
+                SELECT {", ".join(METADATA_COLUMNS)}, details
+                FROM lego_sets
+                WHERE {where}
+                ORDER BY id
+            """,
+                params,
+            ).fetchall()
+        docs = []
+        for row in rows:
+            metadata = dict(zip(METADATA_COLUMNS, row))
+            text = build_index_text(
+                row[-1],
+                metadata["name"],
+                metadata["theme"],
+                metadata["year"],
+                metadata["pieces"],
+                self.details_chars,
+            )
+            docs.append(
+                Document(id=metadata["id"], page_content=text, metadata=metadata)
+            )
+        return docs
+
+    def mget(self, ids):
+        """Documents for the given lego_sets ids as {id: Document}"""
+        if not ids:
+            return {}
+        return {
+            doc.id: doc
+            for doc in self._documents("id IN (SELECT unnest(?))", [list(ids)])
+        }
+
+    def find(self, set_number):
+        """Documents of the sets with a LEGO set number, in id order"""
+        return self._documents("set_number = ?", [set_number])
+
+    def search(self, search):
+        return self.mget([search]).get(search, f"ID {search} not found.")
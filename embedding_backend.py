@@ -0,0 +1,65 @@
+"""
+🧠 Embedding Backend
+Single place where embedding models are created, so every index builder and
+query path shares the same model settings and on-disk embedding cache.
+EMBEDDING_BACKEND selects OpenAI ("openai", the default) or the offline
+scikit-learn model in local_embeddings ("local").
+"""
+
+import os
+
+from langchain_openai import OpenAIEmbeddings
+
+from embedding_cache import CachedEmbeddings, EmbeddingCache
+from embedding_dispatcher import ParallelEmbeddings
+
+EMBEDDING_BACKENDS = ["openai", "local"]
+REMOTE_MODEL = "text-embedding-ada-002"
+
+_shared_cache = None
+
+
+def get_embedding_cache():
+    """Open the process-wide embedding cache, or None if it is unavailable"""
+    global _shared_cache
+    if _shared_cache is None:
+        try:
+            _shared_cache = EmbeddingCache()
+        except Exception as e:
+            print(f"⚠️  Embedding cache unavailable, embedding without cache: {e}")
+            return None
+    return _shared_cache
+
+
+def get_embeddings(openai_api_key=None, backend=None, conn=None):
+    """Create the embeddings used for indexing and querying.
+
+    ``backend`` defaults to EMBEDDING_BACKEND. The local model is fitted
+    on lego_data (through ``conn``) the first time it is needed.
+    """
+    backend = backend or os.getenv("EMBEDDING_BACKEND", "openai")
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(
+            f"Unknown embedding backend {backend!r}, expected {EMBEDDING_BACKENDS}"
+        )
+    if backend == "local":
+        from local_embeddings import LocalEmbeddings  # sklearn is only needed here
+
+        # Embedding in-process is cheaper than a cache lookup
+        return LocalEmbeddings.load_or_fit(conn)
+
+    model = OpenAIEmbeddings(
+        model=REMOTE_MODEL, openai_api_key=openai_api_key or os.getenv("OPENAI_API_KEY")
+    )
+    # Token-packed batches go out concurrently under the API rate limits
+    embeddings = ParallelEmbeddings(model)
+
+    cache = get_embedding_cache()
+    if cache is None:
+        return embeddings
+    return CachedEmbeddings(embeddings, cache, model_name=model.model)
+
+
+def embedding_model_name(embeddings):
+    """Name of the model behind ``embeddings``, recorded with the index built from it"""
+    return getattr(embeddings, "model_name", None) or getattr(embeddings, "model", None)
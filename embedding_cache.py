@@ -0,0 +1,282 @@
+"""
+🗄️ Persistent Embedding Cache
+Content-addressed store for embedding vectors in DuckDB, keyed by model name
+plus a hash of the text. Wrapping any langchain Embeddings with
+CachedEmbeddings means unchanged text is never sent to the API twice.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import duckdb
+import numpy as np
+import pandas as pd
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.duckdb")
+DEFAULT_MAX_BYTES = int(float(os.getenv("EMBEDDING_CACHE_MAX_MB", "512")) * 1024 * 1024)
+DEFAULT_MEMORY_BYTES = int(
+    float(os.getenv("EMBEDDING_CACHE_MEMORY_MB", "64")) * 1024 * 1024
+)
+
+# Eviction trims the file to this share of its budget, so it runs once per
+# overflow rather than on every write at the limit
+EVICT_TO = 0.9
+# Reads whose last_used update is still pending before one is written
+MAX_PENDING_TOUCHES = 1024
+
+
+def cache_key(model_name, text):
+    """Content address for one (model, text) pair"""
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """DuckDB-backed vector store keyed by content hash with LRU eviction.
+
+    Recently used vectors are also kept in a process-local LRU, so repeated
+    lookups never touch the file. The file is opened per operation rather
+    than held open, so the app and a loader running in another process can
+    both use it: read-only (shared) for lookups, read-write (exclusive)
+    only to store vectors. Reads mark entries as used in memory; the marks
+    are written with the next write. The cache is best-effort: if the file
+    stays locked, a lookup is a miss and a store is skipped.
+    """
+
+    def __init__(
+        self,
+        path=EMBEDDING_CACHE_PATH,
+        max_bytes=DEFAULT_MAX_BYTES,
+        memory_bytes=DEFAULT_MEMORY_BYTES,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> float32 vector, least recent first
+        self._memory_size = 0
+        self._touched = set()  # keys read from the file since the last write
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    key VARCHAR PRIMARY KEY,
+                    model VARCHAR,
+                    vector FLOAT[],
+                    nbytes INTEGER,
+                    last_used TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """
+            )
+            # Running total of nbytes, kept with every write
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embedding_cache_size (bytes BIGINT)"
+            )
+            stored = conn.execute("SELECT COUNT(*) FROM embedding_cache_size")
+            if stored.fetchone()[0] == 0:
+                conn.execute(
+                    """
+                    INSERT INTO embedding_cache_size
+                    SELECT COALESCE(SUM(nbytes), 0) FROM embedding_cache
+                """
+                )
+
+    def _connect(self, read_only=False, retries=20, delay=0.05):
+        """Open the cache file, waiting briefly if another process holds it"""
+        for attempt in range(retries):
+            try:
+                return duckdb.connect(self.path, read_only=read_only)
+            except duckdb.IOException:
+                if attempt == retries - 1:
+                    raise
+                time.sleep(delay)
+
+    def _remember(self, key, vector):
+        """Put a vector in the in-memory LRU, evicting the least recent past its size"""
+        vector = np.asarray(vector, dtype=np.float32)
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_size -= previous.nbytes
+        self._memory[key] = vector
+        self._memory_size += vector.nbytes
+        while self._memory_size > self.memory_bytes and self._memory:
+            _, dropped = self._memory.popitem(last=False)
+            self._memory_size -= dropped.nbytes
+
+    def get_many(self, keys):
+        """Return {key: vector} for the keys present and mark them as used"""
+        if not keys:
+            return {}
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector.tolist()
+            missing = [key for key in keys if key not in found]
+            if not missing:
+                return found
+            try:
+                with self._connect(read_only=True) as conn:
+                    rows = conn.execute(
+                        """
+                        SELECT key, vector FROM embedding_cache
+                        WHERE key IN (SELECT unnest(?))
+                    """,
+                        [missing],
+                    ).fetchall()
+            except duckdb.Error as e:
+                print(f"⚠️  Embedding cache busy, treating lookup as a miss: {e}")
+                return found
+            for key, vector in rows:
+                self._remember(key, vector)
+                found[key] = list(vector)
+            self._touched.update(key for key, _ in rows)
+            if len(self._touched) >= MAX_PENDING_TOUCHES:
+                self._write(lambda conn: None)
+        return found
+
+    def put_many(self, model_name, items):
+        """Store {key: vector} entries, then evict down to the size budget"""
+        if not items:
+            return
+        batch = pd.DataFrame(
+            {
+                "key": list(items),
+                "vector": list(items.values()),
+                "nbytes": [4 * len(vector) for vector in items.values()],
+            }
+        )
+
+        def insert(conn):
+            conn.register("embedding_batch", batch)
+            replaced = conn.execute(
+                """
+                SELECT COALESCE(SUM(nbytes), 0) FROM embedding_cache
+                WHERE key IN (SELECT key FROM embedding_batch)
+            """
+            ).fetchone()[0]
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO embedding_cache (key, model, vector, nbytes)
+                SELECT key, ?, CAST(vector AS FLOAT[]), nbytes FROM embedding_batch
+            """,
+                [model_name],
+            )
+            size = conn.execute(
+                "UPDATE embedding_cache_size SET bytes = bytes + ? RETURNING bytes",
+                [int(batch["nbytes"].sum()) - replaced],
+            ).fetchone()[0]
+            if size > self.max_bytes:
+                self._evict(conn)
+
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+            self._write(insert)
+
+    def _write(self, operation):
+        """Run ``operation(conn)`` and pending last_used marks in one write transaction.
+
+        Skipped, keeping the marks, if the file stays locked by another process.
+        """
+        try:
+            conn = self._connect()
+        except duckdb.Error as e:
+            print(f"⚠️  Embedding cache busy, not storing vectors: {e}")
+            return
+        with conn:
+            conn.execute("BEGIN TRANSACTION")
+            # Marks go first, so eviction sees what this process has used
+            if self._touched:
+                conn.execute(
+                    """
+                    UPDATE embedding_cache SET last_used = CURRENT_TIMESTAMP
+                    WHERE key IN (SELECT unnest(?))
+                """,
+                    [list(self._touched)],
+                )
+            operation(conn)
+            conn.execute("COMMIT")
+        self._touched.clear()
+
+    def _evict(self, conn):
+        """Drop least recently used entries down to EVICT_TO of max_bytes"""
+        conn.execute(
+            """
+            DELETE FROM embedding_cache WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(nbytes) OVER (
+                        ORDER BY last_used DESC, key
+                    ) AS running_bytes
+                    FROM embedding_cache
+                ) WHERE running_bytes > ?
+            )
+        """,
+            [int(self.max_bytes * EVICT_TO)],
+        )
+        conn.execute(
+            """
+            UPDATE embedding_cache_size
+            SET bytes = (SELECT COALESCE(SUM(nbytes), 0) FROM embedding_cache)
+        """
+        )
+
+    def stats(self):
+        """Return (entries, bytes) currently cached"""
+        with self._lock, self._connect(read_only=True) as conn:
+            count = conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+            size = conn.execute("SELECT bytes FROM embedding_cache_size").fetchone()[0]
+        return count, size
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only calls the model for uncached text"""
+
+    def __init__(self, underlying, cache, model_name=None):
+        self.underlying = underlying
+        self.cache = cache
+        self.model_name = (
+            model_name
+            or getattr(underlying, "model", None)
+            or type(underlying).__name__
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts):
+        keys = [cache_key(self.model_name, text) for text in texts]
+        found = self.cache.get_many(set(keys))
+
+        # Embed each missing text once, even if it repeats in the input
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+
+        self.hits += len(texts) - sum(key not in found for key in keys)
+        self.misses += len(missing)
+
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing, vectors))
+            self.cache.put_many(self.model_name, fresh)
+            found.update(fresh)
+
+        return [list(found[key]) for key in keys]
+
+    def embed_query(self, text):
+        key = cache_key(self.model_name, f"query\0{text}")
+        found = self.cache.get_many([key])
+        if key in found:
+            self.hits += 1
+            return list(found[key])
+
+        self.misses += 1
+        vector = self.underlying.embed_query(text)
+        self.cache.put_many(self.model_name, {key: vector})
+        return vector
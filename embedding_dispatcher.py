@@ -0,0 +1,147 @@
+"""
+🚀 Embedding Dispatcher
+Packs texts into batches by token budget and sends several batches at once
+under request/token rate limits, returning vectors in input order.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from langchain_core.embeddings import Embeddings
+from requests.adapters import HTTPAdapter
+
+from rate_limit import TokenBucket
+
+DEFAULT_MAX_BATCH_TOKENS = int(os.getenv("EMBEDDING_MAX_BATCH_TOKENS", "50000"))
+DEFAULT_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "512"))
+DEFAULT_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+DEFAULT_REQUESTS_PER_MINUTE = int(os.getenv("EMBEDDING_RPM", "3000"))
+DEFAULT_TOKENS_PER_MINUTE = int(os.getenv("EMBEDDING_TPM", "1000000"))
+
+try:
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken missing or encoding not downloadable offline
+    _encoding = None
+
+
+def count_tokens(text):
+    """Token count for budgeting (approximate when tiktoken is unavailable)"""
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def pack_batches(token_counts, max_batch_tokens, max_batch_size):
+    """Greedily group input positions into batches under both limits.
+
+    Returns a list of index lists; input order is preserved within and
+    across batches. A single text over the token budget gets its own batch.
+    """
+    batches = []
+    current, current_tokens = [], 0
+    for index, tokens in enumerate(token_counts):
+        if current and (
+            current_tokens + tokens > max_batch_tokens or len(current) >= max_batch_size
+        ):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+class ParallelEmbeddings(Embeddings):
+    """Embeddings wrapper that dispatches token-packed batches concurrently"""
+
+    def __init__(
+        self,
+        underlying,
+        max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS,
+        max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+        concurrency=DEFAULT_CONCURRENCY,
+        requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+        tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE,
+    ):
+        self.underlying = underlying
+        self.model = getattr(underlying, "model", None)
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.concurrency = concurrency
+        self.request_bucket = TokenBucket.per_minute(requests_per_minute)
+        self.token_bucket = TokenBucket.per_minute(tokens_per_minute)
+
+    def _embed_batch(self, texts, tokens):
+        self.request_bucket.acquire(1)
+        self.token_bucket.acquire(tokens)
+        return self.underlying.embed_documents(texts)
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+
+        token_counts = [count_tokens(text) for text in texts]
+        batches = pack_batches(token_counts, self.max_batch_tokens, self.max_batch_size)
+
+        vectors = [None] * len(texts)
+        with ThreadPoolExecutor(
+            max_workers=min(self.concurrency, len(batches)),
+            thread_name_prefix="embed",
+        ) as executor:
+            futures = [
+                (
+                    batch,
+                    executor.submit(
+                        self._embed_batch,
+                        [texts[i] for i in batch],
+                        sum(token_counts[i] for i in batch),
+                    ),
+                )
+                for batch in batches
+            ]
+            for batch, future in futures:
+                for index, vector in zip(batch, future.result()):
+                    vectors[index] = vector
+        return vectors
+
+    def embed_query(self, text):
+        self.request_bucket.acquire(1)
+        self.token_bucket.acquire(count_tokens(text))
+        return self.underlying.embed_query(text)
+
+
+class HTTPEmbeddings(Embeddings):
+    """Minimal client for an OpenAI-compatible ``/embeddings`` endpoint.
+
+    Used to drive the local fake embeddings server, where the full
+    OpenAI client stack is not needed.
+    """
+
+    def __init__(
+        self, base_url, model="text-embedding-ada-002", api_key="local", timeout=60
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": f"Bearer {api_key}"})
+        adapter = HTTPAdapter(pool_maxsize=32)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def embed_documents(self, texts):
+        response = self.session.post(
+            f"{self.base_url}/embeddings",
+            json={"model": self.model, "input": list(texts)},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        return [item["embedding"] for item in data]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+🧪 Fake Embeddings Server
+OpenAI-compatible ``POST /v1/embeddings`` endpoint returning deterministic
+vectors after a simulated latency, for offline embedding benchmarks.
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+POOL_SIZE = 4096
+
+
+def build_vector_pool(dimensions, size=POOL_SIZE, seed=0):
+    """Pre-serialised random unit vectors, so responses cost almost no CPU"""
+    vectors = np.random.default_rng(seed).standard_normal((size, dimensions))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return [json.dumps(vector.astype(np.float32).tolist()) for vector in vectors]
+
+
+def pool_index(text):
+    """Deterministic pool slot for a text"""
+    digest = hashlib.blake2b(str(text).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % POOL_SIZE
+
+
+class FakeEmbeddingsHandler(BaseHTTPRequestHandler):
+    """Serve /v1/embeddings with latency = base + per-input delay"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/embeddings"):
+            self.send_error(404)
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        inputs = payload.get("input", [])
+        # Accept a single string, a list of strings or a list of token arrays
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+
+        server = self.server
+        with server.stats_lock:
+            server.request_count += 1
+            server.input_count += len(inputs)
+        time.sleep(server.base_latency + server.per_input_latency * len(inputs))
+
+        # Splice the pre-serialised vectors straight into the JSON body
+        data = ",".join(
+            f'{{"object": "embedding", "index": {i}, '
+            f'"embedding": {server.pool[pool_index(text)]}}}'
+            for i, text in enumerate(inputs)
+        )
+        model = json.dumps(payload.get("model", "fake"))
+        body = (
+            f'{{"object": "list", "data": [{data}], "model": {model}, '
+            f'"usage": {{"prompt_tokens": 0, "total_tokens": 0}}}}'
+        ).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeEmbeddingsServer:
+    """Run the fake embeddings API on a background thread"""
+
+    def __init__(
+        self, dimensions=1536, base_latency=0.2, per_input_latency=0.0005, port=0
+    ):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), FakeEmbeddingsHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.pool = build_vector_pool(dimensions)
+        self.httpd.base_latency = base_latency
+        self.httpd.per_input_latency = per_input_latency
+        self.httpd.request_count = 0
+        self.httpd.input_count = 0
+        self.httpd.stats_lock = threading.Lock()
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def request_count(self):
+        return self.httpd.request_count
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with FakeEmbeddingsServer(args.dimensions, args.latency, port=args.port) as server:
+        print(f"🧪 Fake embeddings API on {server.base_url} (Ctrl+C to stop)")
+        print(f"   OPENAI_BASE_URL={server.base_url}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
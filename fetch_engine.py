@@ -0,0 +1,141 @@
+"""
+🌐 Concurrent Fetch Engine
+Shared HTTP layer for the catalog loaders: one keep-alive connection pool,
+a thread pool for overlapping round-trips, a per-host concurrency cap and
+per-API rate limits with retries (see http_retry).
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+from http_cache import HTTP_CACHE_DIR, CachingAdapter
+from http_retry import DEFAULT_RETRIES, ThrottledAdapter
+
+DEFAULT_MAX_WORKERS = 16
+DEFAULT_PER_HOST_LIMIT = 4
+DEFAULT_TIMEOUT = 30
+
+
+class FetchEngine:
+    """Run many GET requests at once without overloading any single API"""
+
+    def __init__(
+        self,
+        max_workers=DEFAULT_MAX_WORKERS,
+        per_host_limit=DEFAULT_PER_HOST_LIMIT,
+        timeout=DEFAULT_TIMEOUT,
+        session=None,
+        cache_dir=None,
+        cache_ttls=None,
+        rate_limits=None,
+        retries=DEFAULT_RETRIES,
+    ):
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+
+        self.session = session or requests.Session()
+        self.session.headers.update(
+            {"User-Agent": "LEGO-RAG-Search/1.0 (Educational Project)"}
+        )
+        # One pooled adapter per scheme; pool_block keeps the number of open
+        # sockets per host at the pool size instead of opening throwaway ones.
+        # rate_limits=None uses the process-wide per-API limits
+        adapter_kwargs = {
+            "pool_connections": max_workers,
+            "pool_maxsize": max(max_workers, per_host_limit),
+            "pool_block": True,
+            "rate_limits": rate_limits,
+            "retries": retries,
+        }
+        if cache_dir:
+            adapter = CachingAdapter(
+                cache_dir=cache_dir, ttls=cache_ttls, **adapter_kwargs
+            )
+        else:
+            adapter = ThrottledAdapter(**adapter_kwargs)
+        self.adapter = adapter
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="fetch"
+        )
+        self._host_slots = {}
+        self._host_lock = threading.Lock()
+
+    def _slot_for(self, url):
+        """Get the semaphore limiting concurrent requests to the URL's host"""
+        host = urlsplit(url).netloc
+        with self._host_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.per_host_limit)
+                self._host_slots[host] = slot
+            return slot
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        """Blocking GET that respects the per-host cap"""
+        with self._slot_for(url):
+            response = self.session.get(
+                url,
+                params=params,
+                headers=headers,
+                timeout=timeout or self.timeout,
+            )
+        response.raise_for_status()
+        return response
+
+    def get_json(self, url, params=None, headers=None, timeout=None):
+        """Blocking GET returning the decoded JSON body"""
+        return self.get(url, params=params, headers=headers, timeout=timeout).json()
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedule a callable on the fetch pool and return its future"""
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def get_json_many(self, requests_list):
+        """Fetch several ``(url, params)`` pairs concurrently.
+
+        Returns a list of ``(data, error)`` tuples in input order so callers
+        can report failures per request without losing the others.
+        """
+        futures = [
+            self.submit(self.get_json, url, params=params)
+            for url, params in requests_list
+        ]
+        results = []
+        for future in futures:
+            try:
+                results.append((future.result(), None))
+            except Exception as e:
+                results.append((None, e))
+        return results
+
+    def close(self):
+        """Shut down the pool and release pooled connections"""
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_shared_engine = None
+_shared_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Return the process-wide engine shared by all loaders"""
+    global _shared_engine
+    with _shared_engine_lock:
+        if _shared_engine is None:
+            # Catalog responses are cached on disk and revalidated when stale
+            _shared_engine = FetchEngine(cache_dir=HTTP_CACHE_DIR)
+        return _shared_engine
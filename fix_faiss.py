@@ -1,63 +1,39 @@
 #!/usr/bin/env python3
 """
 🔧 FAISS Index Fixer
-Recreates the FAISS index with optimized text processing
+Rebuilds or incrementally updates the FAISS index with optimized text processing
 """
 
-import json
+import argparse
 import os
 from dotenv import load_dotenv
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
 import duckdb
 
+from embedding_backend import EMBEDDING_BACKENDS, get_embeddings
+from index_builder import sync_faiss_index
+from vector_index import INDEX_TYPES, index_params
+
 # Load environment variables
 load_dotenv()
 openai_api_key = os.getenv("OPENAI_API_KEY")
 
-def create_faiss_index():
-    """Create FAISS index with optimized text processing"""
+def create_faiss_index(index_type=None, embedding_backend=None):
+    """Create or incrementally update the FAISS index"""
     print("🔧 Creating FAISS index...")
     
     # Connect to database
     conn = duckdb.connect("lego_data.duckdb")
-    
-    # Get all records
-    result = conn.execute(
-        """
-        SELECT details, name, theme, year, pieces 
-        FROM lego_data 
-        ORDER BY year DESC, pieces DESC
-    """
-    ).fetchall()
-
-    if not result:
-        print("⚠️  No data found in database.")
-        return
-
-    print(f"  Processing {len(result)} records...")
-
-    # Create optimized text representations
-    enhanced_texts = []
-    for row in result:
-        details = json.loads(row[0])
-        name = row[1] or ""
-        theme = row[2] or ""
-        year = row[3] or ""
-        pieces = row[4] or ""
-
-        # Create compact text representation (avoid token limits)
-        enhanced_text = f"LEGO Set: {name} | Theme: {theme} | Year: {year} | Pieces: {pieces} | Details: {json.dumps(details, ensure_ascii=False)[:300]}"
-        enhanced_texts.append(enhanced_text)
-
-    print(f"  Creating embeddings for {len(enhanced_texts)} texts...")
 
     try:
-        embeddings = OpenAIEmbeddings(openai_api_key=openai_api_key)
-        vectorstore = FAISS.from_texts(enhanced_texts, embeddings)
+        embeddings = get_embeddings(openai_api_key, embedding_backend, conn=conn)
+        # Compact text representation (avoid token limits); unchanged
+        # records keep their existing vectors
+        vectorstore = sync_faiss_index(
+            conn, embeddings, params=index_params(type=index_type)
+        )
+        if vectorstore is None:
+            return
 
-        # Save the FAISS index
-        vectorstore.save_local("./faiss_index")
         print("✅ FAISS index created and saved successfully!")
         
         # Test the index
@@ -72,4 +48,14 @@ def create_faiss_index():
         conn.close()
 
 if __name__ == "__main__":
-    create_faiss_index() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--index-type", choices=INDEX_TYPES, help="defaults to FAISS_INDEX_TYPE or flat"
+    )
+    parser.add_argument(
+        "--embeddings",
+        choices=EMBEDDING_BACKENDS,
+        help="defaults to EMBEDDING_BACKEND or openai",
+    )
+    args = parser.parse_args()
+    create_faiss_index(args.index_type, args.embeddings)
@@ -0,0 +1,189 @@
+"""
+🗃️ Conditional-Request HTTP Cache
+Transport adapter that keeps GET responses on disk. Fresh entries (within the
+endpoint's TTL) are served without touching the network; stale ones are
+revalidated with If-None-Match / If-Modified-Since so unchanged payloads come
+back as cheap 304s. API errors sent as 200s are never stored. Only requests
+that reach the network are rate-limited and retried.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from http_retry import ThrottledAdapter
+
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", ".http_cache")
+
+# Seconds a cached response is served without revalidation, by URL pattern
+DEFAULT_TTLS = [
+    (r"/lego/themes/", 7 * 24 * 3600),
+    (r"/lego/sets/", 6 * 3600),
+    (r"/getSets", 6 * 3600),
+    (r"api\.brickowl\.com", 24 * 3600),
+    (r"api\.bricklink\.com", 24 * 3600),
+]
+DEFAULT_TTL = 0  # unknown endpoints are always revalidated
+
+# Endpoints whose responses must never be written to disk
+NO_STORE = [r"/login"]
+
+# Bodies are stored decoded, so these headers would no longer describe them
+UNSTORED_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+
+def is_error_payload(body):
+    """Whether a 200 body is an API error, which must not be replayed.
+
+    Brickset reports rate limits and bad user hashes as ``{"status": "error"}``.
+    """
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return False
+    return isinstance(payload, dict) and payload.get("status") == "error"
+
+
+class CachingAdapter(ThrottledAdapter):
+    """HTTPAdapter with a persistent, conditional-request response cache"""
+
+    def __init__(
+        self, cache_dir=HTTP_CACHE_DIR, ttls=None, default_ttl=DEFAULT_TTL, **kwargs
+    ):
+        super().__init__(**kwargs)
+        self.cache_dir = cache_dir
+        ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.ttls = [(re.compile(pattern), ttl) for pattern, ttl in ttls]
+        self.default_ttl = default_ttl
+        self.no_store = [re.compile(pattern) for pattern in NO_STORE]
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def ttl_for(self, url):
+        """TTL of the first pattern matching the URL"""
+        for pattern, ttl in self.ttls:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+
+    def _tally(self, counter):
+        # Sends run on FetchEngine worker threads
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _paths(self, url):
+        # URLs can carry API keys, so only their hash touches the disk
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return f"{base}.json", f"{base}.body"
+
+    def _load(self, url):
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        return meta, body
+
+    def _atomic_write(self, path, data):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _store(self, url, response, body):
+        meta_path, body_path = self._paths(url)
+        # The body is stored decoded, so transfer headers no longer apply
+        headers = {
+            name: value
+            for name, value in response.headers.items()
+            if name.lower() not in UNSTORED_HEADERS
+        }
+        meta = {
+            "fetched_at": time.time(),
+            "status": response.status_code,
+            "headers": headers,
+        }
+        # Body first, so a reader never sees metadata without its payload
+        self._atomic_write(body_path, body)
+        self._atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+
+    def _touch(self, url, meta, response):
+        """Record a successful revalidation, keeping any refreshed validators"""
+        meta_path, _ = self._paths(url)
+        meta["fetched_at"] = time.time()
+        for header in ("ETag", "Last-Modified", "Cache-Control", "Expires"):
+            if header in response.headers:
+                meta["headers"][header] = response.headers[header]
+        self._atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+
+    def _cached_response(self, request, meta, body):
+        response = Response()
+        response.status_code = meta["status"]
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict(meta["headers"])
+        response._content = body
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.from_cache = True
+        return response
+
+    def send(self, request, **kwargs):
+        url = request.url
+        if request.method != "GET" or any(p.search(url) for p in self.no_store):
+            return super().send(request, **kwargs)
+
+        cached = self._load(url)
+        if cached is not None:
+            meta, body = cached
+            if time.time() - meta["fetched_at"] < self.ttl_for(url):
+                self._tally("hits")
+                return self._cached_response(request, meta, body)
+
+            headers = CaseInsensitiveDict(meta["headers"])
+            if "ETag" in headers:
+                request.headers["If-None-Match"] = headers["ETag"]
+            if "Last-Modified" in headers:
+                request.headers["If-Modified-Since"] = headers["Last-Modified"]
+
+        response = super().send(request, **kwargs)
+
+        if response.status_code == 304 and cached is not None:
+            self._tally("revalidated")
+            meta, body = cached
+            self._touch(url, meta, response)
+            response.close()
+            return self._cached_response(request, meta, body)
+
+        self._tally("misses")
+        if (
+            response.status_code == 200
+            and "no-store" not in response.headers.get("Cache-Control", "")
+            and not is_error_payload(response.content)
+        ):
+            self._store(url, response, response.content)
+        return response
+
+
+def mount_http_cache(session, cache_dir=HTTP_CACHE_DIR, **adapter_kwargs):
+    """Route a session's http/https traffic through a CachingAdapter"""
+    adapter = CachingAdapter(cache_dir=cache_dir, **adapter_kwargs)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return adapter
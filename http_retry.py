@@ -0,0 +1,171 @@
+"""
+🔁 Throttled, Retrying HTTP Transport
+Transport adapter shared by every catalog client: each API host gets a token
+bucket sized to its published limits, throttled or failed requests are
+retried with jittered exponential backoff, and a Retry-After header holds
+all requests to that host until the server says it is ready again.
+"""
+
+import email.utils
+import random
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limit import TokenBucket
+
+# (host pattern, requests per second, burst) from each provider's API docs
+DEFAULT_RATE_LIMITS = [
+    (r"rebrickable\.com", 1.0, 3),  # 1 request/s on average, short bursts allowed
+    (r"brickset\.com", 2.0, 5),
+    (r"api\.brickowl\.com", 5.0, 10),
+    (r"api\.bricklink\.com", 1.0, 5),
+]
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_METHODS = {"GET", "HEAD"}
+DEFAULT_RETRIES = 5
+BACKOFF_BASE = 0.5  # seconds, doubled per attempt
+BACKOFF_CAP = 30.0
+MAX_RETRY_AFTER = 300.0
+
+
+class HostThrottle:
+    """Rate limit plus a shared hold-off for one host"""
+
+    def __init__(self, bucket=None):
+        self.bucket = bucket
+        self._hold_until = 0.0
+        self._lock = threading.Lock()
+
+    def hold(self, seconds):
+        """Keep every caller away from the host for ``seconds``"""
+        with self._lock:
+            self._hold_until = max(self._hold_until, time.monotonic() + seconds)
+
+    def wait(self):
+        """Block until the host may be called again"""
+        while True:
+            with self._lock:
+                delay = self._hold_until - time.monotonic()
+            if delay <= 0:
+                break
+            time.sleep(delay)
+        if self.bucket is not None:
+            self.bucket.acquire()
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            when = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        seconds = when.timestamp() - time.time()
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """Full-jitter exponential backoff for the given retry attempt"""
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class ThrottleRegistry:
+    """Lazily created HostThrottle per host, sized from a limits table"""
+
+    def __init__(self, rate_limits=None):
+        limits = DEFAULT_RATE_LIMITS if rate_limits is None else rate_limits
+        self.limits = [
+            (re.compile(pattern), rate, burst) for pattern, rate, burst in limits
+        ]
+        self._throttles = {}
+        self._lock = threading.Lock()
+
+    def for_host(self, host):
+        with self._lock:
+            throttle = self._throttles.get(host)
+            if throttle is None:
+                bucket = None
+                for pattern, rate, burst in self.limits:
+                    if pattern.search(host):
+                        bucket = TokenBucket(rate, burst)
+                        break
+                throttle = HostThrottle(bucket)
+                self._throttles[host] = throttle
+            return throttle
+
+
+# Limits are per provider, so every session in the process shares them
+shared_throttles = ThrottleRegistry()
+
+
+class ThrottledAdapter(HTTPAdapter):
+    """HTTPAdapter that rate-limits per host and retries transient failures"""
+
+    def __init__(self, rate_limits=None, retries=DEFAULT_RETRIES, **kwargs):
+        super().__init__(**kwargs)
+        self.throttles = (
+            shared_throttles if rate_limits is None else ThrottleRegistry(rate_limits)
+        )
+        self.retries = retries
+        self.retried = 0
+        self.throttled = 0
+        self._stats_lock = threading.Lock()
+
+    def _count(self, throttled):
+        with self._stats_lock:
+            self.retried += 1
+            if throttled:
+                self.throttled += 1
+
+    def send(self, request, **kwargs):
+        throttle = self.throttles.for_host(urlsplit(request.url).netloc)
+        retryable = request.method in RETRY_METHODS
+
+        attempt = 0
+        while True:
+            throttle.wait()
+            try:
+                response = super().send(request, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if not retryable or attempt >= self.retries:
+                    raise
+                self._count(throttled=False)
+                time.sleep(backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            if (
+                response.status_code not in RETRY_STATUSES
+                or not retryable
+                or attempt >= self.retries
+            ):
+                return response
+
+            delay = parse_retry_after(response.headers.get("Retry-After"))
+            if delay is None:
+                delay = backoff_delay(attempt)
+            if response.status_code == 429:
+                # The whole host is over its limit, not just this request
+                throttle.hold(delay)
+            self._count(throttled=response.status_code == 429)
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+
+
+def mount_throttled(session, **adapter_kwargs):
+    """Route a session's http/https traffic through a ThrottledAdapter"""
+    adapter = ThrottledAdapter(**adapter_kwargs)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return adapter
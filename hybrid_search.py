@@ -0,0 +1,221 @@
+"""
+🔀 Hybrid Search
+Runs the vector search and the BM25 search (see lexical_index) over the
+same rows concurrently and merges the two rankings with reciprocal rank
+fusion. The vector leg understands "big Star Wars ship"; the lexical leg
+finds exact names and set numbers like "UCS Falcon 75192". Rank fusion
+ignores how decisive a BM25 match is, so sets whose number appears in the
+query are put first.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+import numpy as np
+from langchain_core.retrievers import BaseRetriever
+
+from lexical_index import tokenize
+
+# Constant from the RRF paper; damps the weight of the very top ranks
+RRF_K = 60
+
+# The vector leg waits on the embeddings API, so it gets its own thread
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hybrid")
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K, limit=None):
+    """Fuse ranked row lists into (scores, rows), best first.
+
+    Each row scores sum(1 / (k + rank)) over the rankings it appears in.
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, start=1):
+            fused[int(row)] = fused.get(int(row), 0.0) + 1.0 / (k + rank)
+    ordered = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return (
+        np.array([score for _, score in ordered], dtype=np.float32),
+        np.array([row for row, _ in ordered], dtype=np.int64),
+    )
+
+
+def set_number_rows(lexical, query, limit, mask=None):
+    """Rows containing a number from ``query`` that only a few sets share.
+
+    Set numbers (4+ digits) are unique to a set or two; numbers matching
+    more than ``limit`` rows are years or piece counts and are ignored.
+    """
+    rows = []
+    for token in tokenize(query):
+        if len(token) < 4 or not token.isdigit():
+            continue
+        matches = lexical.rows_with(token)
+        if mask is not None:
+            matches = matches[mask[matches]]
+        if 0 < len(matches) <= limit:
+            rows.extend(int(row) for row in matches)
+    return rows
+
+
+def _vector_rows(
+    vectorstore, query, k, filter, mask, embedding=None, score_threshold=None
+):
+    if embedding is None:
+        embedding = vectorstore.embedding_function.embed_query(query)
+    scores, rows, _ = vectorstore.search_rows(
+        embedding, k, filter, fetch_k=k, mask=mask, score_threshold=score_threshold
+    )
+    return embedding, scores, rows
+
+
+def hybrid_search(
+    vectorstore,
+    query,
+    k=4,
+    filter=None,
+    fetch_k=None,
+    embedding=None,
+    score_threshold=None,
+):
+    """Top ``k`` (Document, fused score, vector score) triples for ``query``.
+
+    The vector score is the row's similarity (or distance) to the query as
+    a plain vector search reports it, also for rows only the BM25 leg
+    found, so one retrieval can feed both an answer and a scored source
+    list. Each leg returns ``fetch_k`` candidates (default max(20, 4k))
+    under the same filter; vectorstores without a BM25 index fall back to
+    a plain similarity search. Pass the query's ``embedding`` when it was
+    already computed.
+
+    With ``score_threshold`` only rows whose vector score clears it are
+    fused: the vector leg is one range search on cosine indexes (see
+    vector_index.range_search) and BM25 candidates below it are dropped,
+    so up to ``k`` qualifying sets come back, not the qualifying part of
+    the top ``k``.
+    """
+    if getattr(vectorstore, "lexical", None) is None:
+        if embedding is None:
+            embedding = vectorstore.embedding_function.embed_query(query)
+        results = vectorstore.similarity_search_with_score_by_vector(
+            embedding, k=k, filter=filter, score_threshold=score_threshold
+        )
+        return [(doc, score, score) for doc, score in results]
+    fetch_k = fetch_k or max(20, 4 * k)
+    mask = vectorstore.row_mask(filter)
+
+    vector_leg = _executor.submit(
+        _vector_rows,
+        vectorstore,
+        query,
+        fetch_k,
+        filter,
+        mask,
+        embedding,
+        score_threshold,
+    )
+    _, lexical_rows = vectorstore.lexical.search(query, fetch_k, mask)
+    return _fuse(
+        vectorstore,
+        query,
+        k,
+        fetch_k,
+        filter,
+        mask,
+        vector_leg.result(),
+        lexical_rows,
+        score_threshold,
+    )
+
+
+def hybrid_search_batch(
+    vectorstore, queries, embeddings, k=4, filter=None, fetch_k=None
+):
+    """hybrid_search for many queries sharing a filter, with one vector search for all.
+
+    ``embeddings`` are the queries' embeddings, in order; returns one
+    list of (Document, fused score, vector score) triples per query.
+    """
+    if getattr(vectorstore, "lexical", None) is None:
+        return [
+            hybrid_search(vectorstore, query, k, filter, fetch_k, embedding)
+            for query, embedding in zip(queries, embeddings)
+        ]
+    fetch_k = fetch_k or max(20, 4 * k)
+    mask = vectorstore.row_mask(filter)
+    vector_legs, _ = vectorstore.search_rows_batch(
+        embeddings, fetch_k, filter, fetch_k, mask
+    )
+    results = []
+    for query, embedding, (scores, rows) in zip(queries, embeddings, vector_legs):
+        _, lexical_rows = vectorstore.lexical.search(query, fetch_k, mask)
+        vector_leg = (embedding, scores, rows)
+        results.append(
+            _fuse(
+                vectorstore, query, k, fetch_k, filter, mask, vector_leg, lexical_rows
+            )
+        )
+    return results
+
+
+def _fuse(
+    vectorstore,
+    query,
+    k,
+    fetch_k,
+    filter,
+    mask,
+    vector_leg,
+    lexical_rows,
+    score_threshold=None,
+):
+    """RRF of the two legs with set numbers pinned first, as (doc, fused, similarity)"""
+    embedding, vector_scores, vector_rows = vector_leg
+    if score_threshold is not None:
+        # Ranks are taken among qualifying rows only
+        keep = vectorstore.clears_threshold(vector_scores, score_threshold)
+        vector_scores, vector_rows = vector_scores[keep], vector_rows[keep]
+        lexical_scores = vectorstore.score_rows(embedding, lexical_rows)
+        if lexical_scores is None:
+            keep = np.isin(lexical_rows, vector_rows)
+        else:
+            keep = vectorstore.clears_threshold(lexical_scores, score_threshold)
+        lexical_rows = lexical_rows[keep]
+    scores, rows = reciprocal_rank_fusion([vector_rows, lexical_rows])
+
+    pinned = set(set_number_rows(vectorstore.lexical, query, k, mask))
+    if pinned:
+        first = np.isin(rows, list(pinned))
+        order = np.concatenate([np.flatnonzero(first), np.flatnonzero(~first)])
+        scores, rows = scores[order], rows[order]
+
+    # Filters the mask could not express are checked on document metadata
+    remaining = filter if mask is None else None
+    rows, scores = rows[:fetch_k], scores[:fetch_k]
+    similarities = vectorstore.score_rows(embedding, rows)
+    if similarities is None:
+        known = dict(zip(vector_rows.tolist(), vector_scores.tolist()))
+        similarities = [known.get(int(row)) for row in rows]
+    results = vectorstore.documents_for_rows(
+        rows, list(zip(scores, similarities)), remaining
+    )
+    return [(doc, fused, similarity) for doc, (fused, similarity) in results[:k]]
+
+
+def hybrid_search_with_score(vectorstore, query, k=4, filter=None, fetch_k=None):
+    """Top ``k`` (Document, fused score) pairs for ``query``"""
+    results = hybrid_search(vectorstore, query, k, filter, fetch_k)
+    return [(doc, fused) for doc, fused, _ in results]
+
+
+class HybridRetriever(BaseRetriever):
+    """Retriever over hybrid_search_with_score"""
+
+    vectorstore: Any
+    k: int = 4
+    filter: Optional[dict] = None
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        results = hybrid_search_with_score(
+            self.vectorstore, query, k=self.k, filter=self.filter
+        )
+        return [doc for doc, _ in results]
@@ -0,0 +1,254 @@
+"""
+🔍 Incremental FAISS Index Builder
+Keeps ./faiss_index in sync with the canonical lego_sets table (one row per
+physical set, merged across sources). Every vector is stored under its
+lego_sets id together with a hash of the text it was embedded from, so a
+refresh only embeds new or changed sets and drops vectors of deleted ones.
+"""
+
+import os
+
+from langchain_community.vectorstores import FAISS
+
+from canonical import refresh_canonical_sets
+from docstore import DETAILS_CHARS, build_index_text, content_hash
+from embedding_backend import REMOTE_MODEL, embedding_model_name
+from index_snapshots import resolve_index_path
+from vector_index import (
+    INDEX_PATH,
+    index_params,
+    load_params,
+    load_vectorstore,
+    refresh_catalog_files,
+    save_vectorstore,
+)
+
+
+def index_records(rows, details_chars=DETAILS_CHARS):
+    """Turn lego_sets rows (dicts) into {id: (text, content_hash)}"""
+    records = {}
+    for row in rows:
+        text = build_index_text(
+            row["details"],
+            row["name"],
+            row["theme"],
+            row["year"],
+            row["pieces"],
+            details_chars,
+        )
+        records[row["id"]] = (text, content_hash(text))
+    return records
+
+
+def load_index_records(conn, details_chars=DETAILS_CHARS):
+    """Read lego_sets and return {id: (text, content_hash)} in index order"""
+    cursor = conn.execute(
+        """
+        SELECT id, details, name, theme, year, pieces
+        FROM lego_sets
+        ORDER BY year DESC, pieces DESC
+    """
+    )
+    columns = [c[0] for c in cursor.description]
+    return index_records(
+        (dict(zip(columns, row)) for row in cursor.fetchall()), details_chars
+    )
+
+
+def load_existing_index(embeddings, index_path=INDEX_PATH):
+    """Load a previously saved index as an exact, updatable one (or None)"""
+    if not os.path.exists(os.path.join(resolve_index_path(index_path), "index.faiss")):
+        return None
+    try:
+        return load_vectorstore(embeddings, index_path, exact=True)
+    except Exception as e:
+        print(f"  Could not load existing index, rebuilding: {e}")
+        return None
+
+
+def indexed_hashes(vectorstore):
+    """Map each indexed lego_sets id to the content hash it was built from"""
+    hashes = {}
+    for doc_id in vectorstore.index_to_docstore_id.values():
+        doc = vectorstore.docstore.search(doc_id)
+        hashes[doc_id] = getattr(doc, "metadata", {}).get("content_hash")
+    return hashes
+
+
+class IndexWriter:
+    """Apply batches of records to the saved index.
+
+    ``embed`` and ``add`` are split so a pipeline can embed one batch while
+    the previous one is being added; only ``add`` touches the vectorstore.
+    Updates go to an exact index; ``save`` builds the configured index type
+    (see vector_index) from it. ``details_chars`` is saved with the index
+    so served documents are rebuilt with the text that was embedded.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        index_path=INDEX_PATH,
+        params=None,
+        details_chars=DETAILS_CHARS,
+    ):
+        self.embeddings = embeddings
+        self.index_path = index_path
+        self.params = params or index_params()
+        self.details_chars = details_chars
+        self.vectorstore = load_existing_index(embeddings, index_path)
+        self.hashes = (
+            indexed_hashes(self.vectorstore) if self.vectorstore is not None else {}
+        )
+        # A different index type or parameters means rebuilding, not re-embedding
+        saved = load_params(index_path)
+        self.changed = (
+            self.vectorstore is not None and saved.get("requested") != self.params
+        )
+
+        # Vectors from another embedding model cannot be mixed with new ones
+        model = embedding_model_name(embeddings)
+        indexed_model = saved.get("built", {}).get("embeddings", REMOTE_MODEL)
+        if self.vectorstore is not None and model and indexed_model != model:
+            print(
+                f"  Index was embedded with {indexed_model}, re-embedding with {model}"
+            )
+            self.vectorstore, self.hashes = None, {}
+
+        # Indexes built before hashes were tracked cannot be diffed
+        if self.hashes and not any(self.hashes.values()):
+            print("  Existing index has no content hashes, rebuilding from scratch")
+            self.vectorstore, self.hashes = None, {}
+
+    def changed_ids(self, records):
+        """Ids whose text is new or differs from the indexed one"""
+        return [
+            row_id
+            for row_id, (_, digest) in records.items()
+            if self.hashes.get(row_id) != digest
+        ]
+
+    def embed(self, records):
+        """Embed the changed records; returns ``[(id, text, vector, metadata)]``"""
+        ids = self.changed_ids(records)
+        texts = [records[i][0] for i in ids]
+        vectors = self.embeddings.embed_documents(texts) if texts else []
+        metadatas = [{"id": i, "content_hash": records[i][1]} for i in ids]
+        return list(zip(ids, texts, vectors, metadatas))
+
+    def add(self, batch):
+        """Replace the vectors of an embedded batch; returns how many were added"""
+        if not batch:
+            return 0
+        ids, texts, vectors, metadatas = (list(column) for column in zip(*batch))
+        self.remove([i for i in ids if i in self.hashes])
+
+        text_embeddings = list(zip(texts, vectors))
+        if self.vectorstore is None:
+            self.vectorstore = FAISS.from_embeddings(
+                text_embeddings, self.embeddings, metadatas=metadatas, ids=ids
+            )
+        else:
+            self.vectorstore.add_embeddings(
+                text_embeddings, metadatas=metadatas, ids=ids
+            )
+        self.hashes.update((m["id"], m["content_hash"]) for m in metadatas)
+        self.changed = True
+        return len(ids)
+
+    def remove(self, ids):
+        """Drop the vectors of the given ids"""
+        if not ids:
+            return
+        if len(ids) == len(self.hashes):
+            self.vectorstore = None  # nothing survives, start a new index
+        else:
+            self.vectorstore.delete(ids)
+        for row_id in ids:
+            self.hashes.pop(row_id, None)
+        self.changed = True
+
+    def reconcile(self, conn, details_chars=None, batch_size=1000):
+        """Drop vectors of sets no longer in lego_sets and embed missing ones.
+
+        Only ids are compared, and missing sets are read in batches, so this
+        stays cheap after a pipeline run that already indexed what changed.
+        """
+        details_chars = details_chars or self.details_chars
+        live = {row[0] for row in conn.execute("SELECT id FROM lego_sets").fetchall()}
+        self.remove([i for i in self.hashes if i not in live])
+
+        missing = sorted(live - set(self.hashes))
+        if missing:
+            print(f"  Indexing {len(missing)} sets missing from the index")
+        for start in range(0, len(missing), batch_size):
+            cursor = conn.execute(
+                """
+                SELECT id, details, name, theme, year, pieces
+                FROM lego_sets
+                WHERE id IN (SELECT unnest(?))
+            """,
+                [missing[start : start + batch_size]],
+            )
+            columns = [c[0] for c in cursor.description]
+            rows = (dict(zip(columns, row)) for row in cursor.fetchall())
+            self.add(self.embed(index_records(rows, details_chars)))
+
+    def save(self, conn=None):
+        """Write the index if anything changed; returns the vectorstore.
+
+        ``conn`` supplies the lego_sets filter columns and BM25 index saved
+        with it.
+        """
+        if self.changed and self.vectorstore is not None:
+            save_vectorstore(
+                self.vectorstore,
+                self.index_path,
+                self.params,
+                details_chars=self.details_chars,
+                conn=conn,
+            )
+            print(f"  FAISS index saved with {self.vectorstore.index.ntotal} vectors")
+            self.changed = False
+        elif conn is not None and self.vectorstore is not None:
+            refresh_catalog_files(conn, self.index_path)
+        return self.vectorstore
+
+
+def sync_faiss_index(
+    conn, embeddings, index_path=INDEX_PATH, details_chars=DETAILS_CHARS, params=None
+):
+    """Bring the saved FAISS index up to date with lego_data.
+
+    lego_data is first merged into lego_sets so each set is embedded once.
+    Only sets whose text hash is new or different are embedded; vectors for
+    sets that changed or no longer exist are removed. Returns the
+    vectorstore, or None when lego_data is empty. ``params`` selects the
+    index type (see vector_index.index_params).
+    """
+    refresh_canonical_sets(conn)
+    records = load_index_records(conn, details_chars)
+    if not records:
+        print("⚠️  No data found in database. Cannot create FAISS index.")
+        return None
+
+    writer = IndexWriter(embeddings, index_path, params, details_chars)
+    stale = [
+        doc_id
+        for doc_id, digest in writer.hashes.items()
+        if doc_id not in records or records[doc_id][1] != digest
+    ]
+    fresh = writer.changed_ids(records)
+
+    print(
+        f"  {len(records)} records: {len(fresh)} to embed, "
+        f"{len(stale)} to remove, {len(records) - len(fresh)} unchanged"
+    )
+
+    if not stale and not fresh and not writer.changed:
+        print("  FAISS index already up to date")
+        return writer.save(conn)
+
+    writer.remove(stale)
+    writer.add(writer.embed(records))
+    return writer.save(conn)
@@ -0,0 +1,259 @@
+"""
+🗂️ Index Shards
+Optional partitions of the serving index by theme, release decade or both
+(FAISS_SHARD_BY). Each shard is its own FAISS index over a subset of the
+rows, saved as shard-NNN.faiss with the global row numbers it holds; a
+router of shard centroids sends a query only to the shards it is close
+to, fanning out in parallel when several are about as close. Shards whose
+sets did not change are reused as-is when the index is saved again.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import faiss
+import numpy as np
+
+from vector_index import (
+    ServingIndex,
+    apply_search_params,
+    build_index,
+    filtered_search,
+    is_cosine,
+    range_search,
+    read_index,
+)
+
+SHARDS_FILE = "shards.json"
+CENTROIDS_FILE = "shard_centroids.npy"
+SHARD_PREFIX = "shard-"
+
+OTHER_SHARD = "other"
+# Smaller groups join their theme shard (theme_decade) or the "other" shard
+MIN_SHARD_ROWS = 500
+# Shards whose centroid is this close to the best one are searched too
+ROUTE_MARGIN = 0.05
+MAX_FANOUT = 4
+
+_executor = ThreadPoolExecutor(max_workers=MAX_FANOUT, thread_name_prefix="shards")
+
+
+def shard_keys(meta, themes, shard_by):
+    """Shard key of each row, from its filter columns (see search_filters)"""
+    theme_names = np.array(themes + [OTHER_SHARD], dtype=object)
+    theme = theme_names[np.where(meta["theme"] >= 0, meta["theme"], len(themes))]
+    years = np.nan_to_num(meta["year"], nan=-1).astype(int)
+    decade = np.array(
+        [f"{year // 10 * 10}s" if year >= 0 else OTHER_SHARD for year in years],
+        dtype=object,
+    )
+    if shard_by == "theme":
+        keys = theme
+    elif shard_by == "decade":
+        keys = decade
+    else:
+        keys = theme + " " + decade
+        keys = _merge_small(keys, theme)
+    return _merge_small(keys, np.full(len(keys), OTHER_SHARD, dtype=object))
+
+
+def _merge_small(keys, fallback):
+    """Replace keys held by fewer than MIN_SHARD_ROWS rows with ``fallback``"""
+    _, inverse, counts = np.unique(
+        keys.astype(str), return_inverse=True, return_counts=True
+    )
+    small = counts[inverse] < MIN_SHARD_ROWS
+    return np.where(small, fallback, keys)
+
+
+def _digest(params, ids, hashes):
+    """Fingerprint of a shard's contents and build params"""
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode())
+    for doc_id, content in zip(ids, hashes):
+        digest.update(f"{doc_id}:{content}\n".encode())
+    return digest.hexdigest()
+
+
+def load_manifest(index_path):
+    """Saved shard manifest, or None for unsharded indexes"""
+    try:
+        with open(os.path.join(index_path, SHARDS_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_shards(path, previous, vectors, ids, hashes, meta, themes, params):
+    """Write the shards of ``vectors`` into snapshot ``path``, reusing unchanged ones.
+
+    A shard whose sets, content hashes and params match one in the
+    ``previous`` snapshot keeps that shard's index file (hard-linked, so
+    it costs no disk or build time); only changed shards are rebuilt.
+    """
+    keys = shard_keys(meta, themes, params["shard_by"])
+    manifest = load_manifest(previous) or {}
+    reusable = {shard["digest"]: shard for shard in manifest.get("shards", [])}
+
+    shards, centroids = [], []
+    built = 0
+    for number, key in enumerate(sorted(set(keys))):
+        rows = np.flatnonzero(keys == key)
+        name = f"{SHARD_PREFIX}{number:03d}"
+        digest = _digest(params, [ids[r] for r in rows], [hashes[r] for r in rows])
+        np.save(os.path.join(path, f"{name}.rows.npy"), rows.astype(np.int64))
+
+        old = reusable.get(digest)
+        old_path = old and os.path.join(previous, f"{old['file']}.faiss")
+        if old_path and os.path.exists(old_path):
+            try:
+                os.link(old_path, os.path.join(path, f"{name}.faiss"))
+            except OSError:
+                shutil.copyfile(old_path, os.path.join(path, f"{name}.faiss"))
+            resolved = old["params"]
+        else:
+            index, resolved = build_index(vectors[rows], params)
+            faiss.write_index(index, os.path.join(path, f"{name}.faiss"))
+            built += 1
+
+        centroid = np.asarray(vectors[rows], dtype=np.float32).mean(axis=0)
+        centroids.append(centroid / max(np.linalg.norm(centroid), 1e-12))
+        shards.append(
+            {
+                "key": str(key),
+                "file": name,
+                "count": len(rows),
+                "digest": digest,
+                "params": resolved,
+            }
+        )
+
+    np.save(os.path.join(path, CENTROIDS_FILE), np.array(centroids, dtype=np.float32))
+    with open(os.path.join(path, SHARDS_FILE), "w", encoding="utf-8") as f:
+        json.dump({"by": params["shard_by"], "shards": shards}, f, indent=2)
+    print(
+        f"  {len(shards)} {params['shard_by']} shards: "
+        f"{built} built, {len(shards) - built} unchanged"
+    )
+
+
+class ShardRows:
+    """The saved vectors of one shard, indexed by row within the shard"""
+
+    def __init__(self, vectors, rows):
+        self.vectors = vectors
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, ids):
+        return self.vectors[self.rows[ids]]
+
+
+class ShardedIndex:
+    """The shards of one saved index and the centroid router in front of them"""
+
+    def __init__(self, keys, indexes, rows, vectors, centroids):
+        self.keys = keys
+        self.indexes = indexes
+        self.rows = rows
+        self.vectors = vectors  # ShardRows per shard, for exact fallbacks
+        self.centroids = centroids
+        self.metric_type = indexes[0].metric_type if indexes else faiss.METRIC_L2
+
+    @classmethod
+    def load(cls, index_path, vectors, mmap=True):
+        """Shards saved with the index, or None when it is not sharded"""
+        manifest = load_manifest(index_path)
+        if not manifest or vectors is None:
+            return None
+        mode = "r" if mmap else None
+        keys, indexes, rows, views = [], [], [], []
+        for shard in manifest["shards"]:
+            params = shard["params"]
+            index = read_index(
+                index_path, params["type"], mmap, f"{shard['file']}.faiss"
+            )
+            apply_search_params(index, params)
+            shard_rows = np.load(
+                os.path.join(index_path, f"{shard['file']}.rows.npy"), mmap_mode=mode
+            )
+            view = ShardRows(vectors, shard_rows)
+            if params.get("rerank") or is_cosine(params):
+                index = ServingIndex(
+                    index, view, params.get("rerank"), is_cosine(params)
+                )
+            keys.append(shard["key"])
+            indexes.append(index)
+            rows.append(shard_rows)
+            views.append(view)
+        centroids = np.load(os.path.join(index_path, CENTROIDS_FILE))
+        return cls(keys, indexes, rows, views, centroids)
+
+    def route(self, vector, mask=None):
+        """Shards to search for one query vector, closest first.
+
+        The closest shard by centroid, plus any within ROUTE_MARGIN of it
+        (up to MAX_FANOUT) when the query sits between shards. With a row
+        ``mask`` only shards holding matching rows are considered.
+        """
+        candidates = np.arange(len(self.keys))
+        if mask is not None:
+            candidates = np.array(
+                [i for i in candidates if mask[self.rows[i]].any()], dtype=int
+            )
+        if not len(candidates):
+            return []
+        direction = vector / max(np.linalg.norm(vector), 1e-12)
+        scores = self.centroids[candidates] @ direction
+        order = np.argsort(-scores)[:MAX_FANOUT]
+        return [
+            int(candidates[i])
+            for i in order
+            if scores[i] >= scores[order[0]] - ROUTE_MARGIN
+        ]
+
+    def _search_shard(self, shard, vector, k, mask, threshold):
+        index, rows = self.indexes[shard], self.rows[shard]
+        vectors = self.vectors[shard]
+        local_mask = None if mask is None else mask[rows]
+        if threshold is not None:
+            scores, labels = range_search(index, vectors, vector, threshold, local_mask)
+        elif local_mask is not None:
+            scores, labels = filtered_search(index, vectors, vector, k, local_mask)
+            scores, labels = scores[0], labels[0]
+        else:
+            scores, labels = index.search(vector, k)
+            scores, labels = scores[0], labels[0]
+        found = labels >= 0
+        return scores[found][:k], np.asarray(rows[labels[found][:k]], dtype=np.int64)
+
+    def search(self, vector, k, mask=None, threshold=None, shards=None):
+        """Top ``k`` (scores, global rows) from the routed shards, best first.
+
+        With ``threshold`` (cosine shards) only rows scoring above it
+        are returned, via each shard's range search.
+        """
+        vector = np.ascontiguousarray(vector, dtype=np.float32).reshape(1, -1)
+        if shards is None:
+            shards = self.route(vector[0], mask)
+        if len(shards) == 1:
+            parts = [self._search_shard(shards[0], vector, k, mask, threshold)]
+        else:
+            futures = [
+                _executor.submit(self._search_shard, shard, vector, k, mask, threshold)
+                for shard in shards
+            ]
+            parts = [future.result() for future in futures]
+        if not parts:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        scores = np.concatenate([part[0] for part in parts])
+        rows = np.concatenate([part[1] for part in parts])
+        order = np.argsort(
+            -scores if self.metric_type == faiss.METRIC_INNER_PRODUCT else scores
+        )
+        return scores[order][:k], rows[order][:k]
@@ -0,0 +1,177 @@
+"""
+📸 Index Snapshots
+Every index save is a new, never-modified snapshot directory under
+<index>/snapshots/, with a manifest.json listing its files. The CURRENT
+file names the live snapshot and is replaced atomically, so a reader
+sees either the old index or the new one, never a mix. LiveIndex polls
+CURRENT in the background and swaps a freshly loaded snapshot in between
+queries, so reindexing needs no restart. Indexes saved before snapshots
+existed (files directly in the index directory) keep loading as-is.
+"""
+
+import json
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime, timezone
+
+SNAPSHOTS_DIR = "snapshots"
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+# Files an unversioned index kept directly in the index directory
+LEGACY_FILES = ("index.faiss", "index.pkl", "docs.npy", "docs.parquet")
+
+# Snapshots kept besides the current one, for rollback and for processes
+# still serving them
+KEEP_SNAPSHOTS = 2
+POLL_SECONDS = 5.0
+
+
+def current_version(index_path):
+    """Version named by CURRENT, or None for an unversioned index"""
+    try:
+        with open(os.path.join(index_path, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def snapshot_path(index_path, version):
+    return os.path.join(index_path, SNAPSHOTS_DIR, version)
+
+
+def resolve_index_path(index_path):
+    """Directory holding the live index files.
+
+    The current snapshot, the directory itself for indexes saved before
+    snapshots, or ``index_path`` when it already is a snapshot directory.
+    """
+    version = current_version(index_path)
+    return index_path if version is None else snapshot_path(index_path, version)
+
+
+def new_snapshot(index_path):
+    """Create an empty snapshot directory; returns (version, path).
+
+    Versions are UTC timestamps, so they sort by age.
+    """
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    version = f"{timestamp}-{uuid.uuid4().hex[:6]}"
+    path = snapshot_path(index_path, version)
+    os.makedirs(path)
+    return version, path
+
+
+def link_files(source, target, names):
+    """Hard-link unchanged files of the previous snapshot into a new one"""
+    for name in names:
+        try:
+            os.link(os.path.join(source, name), os.path.join(target, name))
+        except OSError:
+            shutil.copyfile(os.path.join(source, name), os.path.join(target, name))
+
+
+def publish_snapshot(index_path, version, **details):
+    """Write the snapshot's manifest and make it current.
+
+    CURRENT is written to a temporary file and renamed over the old one,
+    which is atomic. The first publish over an unversioned index removes
+    its LEGACY_FILES; later ones leave ``index_path`` alone. Snapshots
+    older than the last KEEP_SNAPSHOTS are deleted: processes still
+    serving one keep their memory-mapped files and in-memory documents,
+    but cannot open anything else from it.
+    """
+    path = snapshot_path(index_path, version)
+    manifest = {
+        "version": version,
+        "parent": current_version(index_path),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "files": {
+            name: os.path.getsize(os.path.join(path, name))
+            for name in sorted(os.listdir(path))
+        },
+        **details,
+    }
+    with open(os.path.join(path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    pending = os.path.join(index_path, f"{CURRENT_FILE}.{version}")
+    with open(pending, "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pending, os.path.join(index_path, CURRENT_FILE))
+
+    if manifest["parent"] is None:
+        for name in LEGACY_FILES:
+            if os.path.isfile(os.path.join(index_path, name)):
+                os.remove(os.path.join(index_path, name))
+    prune_snapshots(index_path)
+    print(f"  Published index snapshot {version}")
+    return manifest
+
+
+def prune_snapshots(index_path, keep=KEEP_SNAPSHOTS):
+    """Delete all but the current snapshot and the ``keep`` newest others"""
+    root = os.path.join(index_path, SNAPSHOTS_DIR)
+    current = current_version(index_path)
+    older = sorted((v for v in os.listdir(root) if v != current), reverse=True)
+    for version in older[keep:]:
+        shutil.rmtree(os.path.join(root, version), ignore_errors=True)
+
+
+class LiveIndex:
+    """The loaded current snapshot, swapped for newer ones in the background.
+
+    ``load(path)`` opens the index files in a directory. A watcher thread
+    checks CURRENT every ``interval`` seconds and loads a new snapshot
+    fully before swapping it in with a single assignment; callers read
+    ``current`` once per query, so a query never mixes two snapshots.
+    """
+
+    def __init__(self, load, index_path, interval=POLL_SECONDS):
+        self.load = load
+        self.index_path = index_path
+        self.interval = interval
+        version = current_version(index_path)
+        self.state = (version, load(resolve_index_path(index_path)))
+        self.failed = None  # a snapshot that would not load is not retried
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._watch, name="index-watcher", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def version(self):
+        return self.state[0]
+
+    @property
+    def current(self):
+        return self.state[1]
+
+    def check(self):
+        """Swap in the current snapshot if it changed; returns whether it did"""
+        version = current_version(self.index_path)
+        if version is None or version in (self.version, self.failed):
+            return False
+        try:
+            loaded = self.load(snapshot_path(self.index_path, version))
+        except Exception as e:
+            print(
+                f"⚠️  Could not load index snapshot {version}, "
+                f"keeping {self.version}: {e}"
+            )
+            self.failed = version
+            return False
+        self.state = (version, loaded)
+        print(f"🔄 Swapped in index snapshot {version}")
+        return True
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def stop(self):
+        self._stop.set()
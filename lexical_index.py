@@ -0,0 +1,149 @@
+"""
+🔤 Lexical (BM25) Index
+In-process BM25 over each indexed set's name, theme, set number and
+details, rows aligned with the FAISS index. Postings are compact CSR
+arrays (term offsets, row ids, term frequencies) saved next to the index
+as .npy files and memory-mapped like the vectors, so exact words and set
+numbers that embeddings blur ("UCS Falcon 75192") still find their set.
+"""
+
+import json
+import os
+import re
+from collections import Counter
+
+import numpy as np
+
+TERMS_FILE = "bm25_terms.json"
+OFFSETS_FILE = "bm25_offsets.npy"
+ROWS_FILE = "bm25_rows.npy"
+FREQS_FILE = "bm25_freqs.npy"
+LENGTHS_FILE = "bm25_lengths.npy"
+LEXICAL_FILES = [TERMS_FILE, OFFSETS_FILE, ROWS_FILE, FREQS_FILE, LENGTHS_FILE]
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Lowercase alphanumeric tokens; "75192-1" gives "75192" and "1" """
+    return TOKEN_RE.findall((text or "").lower())
+
+
+def read_lexical_texts(conn, ids):
+    """Searchable text of each lego_sets id, in the same order"""
+    cursor = conn.cursor().execute(
+        """
+        SELECT id, name, theme, set_number, details
+        FROM lego_sets
+        WHERE id IN (SELECT unnest(?))
+    """,
+        [list(ids)],
+    )
+    texts = {
+        row[0]: " ".join(str(value) for value in row[1:] if value)
+        for row in cursor.fetchall()
+    }
+    return [texts.get(row_id, "") for row_id in ids]
+
+
+class BM25Index:
+    """Okapi BM25 over CSR postings; rows are FAISS row numbers"""
+
+    def __init__(self, terms, offsets, rows, freqs, lengths, k1=1.2, b=0.75):
+        self.terms = terms  # term -> position in offsets
+        self.offsets = offsets
+        self.rows = rows
+        self.freqs = freqs
+        self.lengths = lengths
+        self.k1 = k1
+        self.b = b
+        self.average_length = float(lengths.mean()) if len(lengths) else 0.0
+
+    @classmethod
+    def build(cls, texts):
+        """Index a list of texts; row i is texts[i]"""
+        terms = {}
+        term_ids, rows, freqs = [], [], []
+        lengths = np.zeros(len(texts), dtype=np.int32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths[row] = len(tokens)
+            for token, count in Counter(tokens).items():
+                term_ids.append(terms.setdefault(token, len(terms)))
+                rows.append(row)
+                freqs.append(count)
+
+        term_ids = np.array(term_ids, dtype=np.int32)
+        order = np.argsort(term_ids, kind="stable")  # rows stay ascending per term
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(terms)), out=offsets[1:])
+        freqs = np.minimum(np.array(freqs), np.iinfo(np.uint16).max).astype(np.uint16)
+        return cls(
+            terms,
+            offsets,
+            np.array(rows, dtype=np.int32)[order],
+            freqs[order],
+            lengths,
+        )
+
+    def save(self, index_path):
+        with open(os.path.join(index_path, TERMS_FILE), "w", encoding="utf-8") as f:
+            json.dump(self.terms, f)
+        np.save(os.path.join(index_path, OFFSETS_FILE), self.offsets)
+        np.save(os.path.join(index_path, ROWS_FILE), self.rows)
+        np.save(os.path.join(index_path, FREQS_FILE), self.freqs)
+        np.save(os.path.join(index_path, LENGTHS_FILE), self.lengths)
+
+    @classmethod
+    def load(cls, index_path, mmap=True):
+        """The saved lexical index, or None for indexes built without one"""
+        if not all(
+            os.path.exists(os.path.join(index_path, name)) for name in LEXICAL_FILES
+        ):
+            return None
+        mode = "r" if mmap else None
+        with open(os.path.join(index_path, TERMS_FILE), encoding="utf-8") as f:
+            terms = json.load(f)
+        return cls(
+            terms,
+            np.load(os.path.join(index_path, OFFSETS_FILE), mmap_mode=mode),
+            np.load(os.path.join(index_path, ROWS_FILE), mmap_mode=mode),
+            np.load(os.path.join(index_path, FREQS_FILE), mmap_mode=mode),
+            np.load(os.path.join(index_path, LENGTHS_FILE), mmap_mode=mode),
+        )
+
+    def rows_with(self, token):
+        """Rows containing ``token``, ascending"""
+        term = self.terms.get(token)
+        if term is None:
+            return np.empty(0, dtype=np.int32)
+        return np.asarray(self.rows[self.offsets[term] : self.offsets[term + 1]])
+
+    def search(self, query, k, mask=None):
+        """Top ``k`` rows for ``query`` as (scores, rows), best first.
+
+        ``mask`` restricts results to the rows set in it; rows matching no
+        query term are never returned.
+        """
+        count = len(self.lengths)
+        scores = np.zeros(count, dtype=np.float32)
+        for token in set(tokenize(query)):
+            term = self.terms.get(token)
+            if term is None:
+                continue
+            start, end = self.offsets[term], self.offsets[term + 1]
+            rows = np.asarray(self.rows[start:end])
+            freqs = np.asarray(self.freqs[start:end], dtype=np.float32)
+            idf = np.log(1 + (count - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = self.k1 * (
+                1 - self.b + self.b * self.lengths[rows] / self.average_length
+            )
+            scores[rows] += idf * freqs * (self.k1 + 1) / (freqs + norm)
+
+        if mask is not None:
+            scores[~mask] = 0
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        return scores[matched], matched
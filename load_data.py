@@ -1,13 +1,23 @@
+import argparse
 import os
-import requests
+import queue
+import threading
 import hashlib
 import json
+from itertools import islice
 
 from dotenv import load_dotenv
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
 import duckdb
 
+from canonical import refresh_canonical_sets, upsert_canonical_sets
+from db_writer import upsert_lego_data
+from docstore import DETAILS_CHARS
+from embedding_backend import EMBEDDING_BACKENDS, get_embeddings
+from fetch_engine import get_engine
+from http_cache import HTTP_CACHE_DIR
+from index_builder import IndexWriter, index_records, sync_faiss_index
+from pipeline import Pipeline
+
 # Load environment variables with Gitpod fallback
 if os.getenv("IN_GITPOD") == "true":
     load_dotenv(".env.gitpod")
@@ -20,6 +30,13 @@ brickset_username = os.getenv("BRICKSET_USERNAME")
 brickset_password = os.getenv("BRICKSET_PASSWORD")
 brickowl_api_key = os.getenv("BRICKOWL_API_KEY")
 
+# API base URLs (overridable so loaders can run against a local stub server)
+REBRICKABLE_API_URL = os.getenv("REBRICKABLE_API_URL", "https://rebrickable.com/api/v3")
+BRICKSET_API_URL = os.getenv("BRICKSET_API_URL", "https://brickset.com/api/v3.asmx")
+
+# Brickset user hash from the last login, reused until Brickset rejects it
+BRICKSET_HASH_FILE = os.path.join(HTTP_CACHE_DIR, "brickset_user_hash.json")
+
 
 def generate_unique_id(source, item_id):
     """Generate a unique ID for each record"""
@@ -50,66 +67,249 @@ def initialize_database():
     return conn
 
 
-def fetch_rebrickable_enhanced(limit=200):
-    """Enhanced Rebrickable data fetching with multiple themes"""
-    print(f"Fetching {limit} records from Rebrickable API...")
+# Themes to ingest from Rebrickable, resolved to real theme IDs at runtime
+REBRICKABLE_THEMES = [
+    "Star Wars",
+    "City",
+    "Technic",
+    "Creator",
+    "Architecture",
+    "Marvel Super Heroes",
+    "DC Comics Super Heroes",
+    "Harry Potter",
+    "Disney",
+    "Minecraft",
+    "Ninjago",
+    "Friends",
+    "Speed Champions",
+    "Ideas",
+    "Creator Expert",
+]
+
+
+def resolve_rebrickable_theme_ids(theme_names=None, engine=None):
+    """Map theme names to Rebrickable theme IDs, dropping unknown names"""
+    theme_names = theme_names or REBRICKABLE_THEMES
+    themes = fetch_rebrickable_themes(engine=engine)
+
+    theme_ids = {}
+    for name in theme_names:
+        if name in themes:
+            theme_ids[name] = themes[name]
+        else:
+            print(f"    Unknown Rebrickable theme: {name}")
+
+    # Several names can resolve to one theme; fetch each theme only once
+    unique = {}
+    for name, theme_id in theme_ids.items():
+        unique.setdefault(theme_id, name)
+    return {name: theme_id for theme_id, name in unique.items()}
+
+
+def is_page_unchanged(conn, page, source="rebrickable"):
+    """Check whether every set on a page is already stored and unmodified"""
+    if not page:
+        return False
+
+    ids = {
+        generate_unique_id(source, set_data.get("set_num")): set_data
+        for set_data in page
+    }
+    placeholders = ", ".join("?" for _ in ids)
+    stored = dict(
+        conn.execute(
+            f"""
+            SELECT id, json_extract_string(details, '$.last_modified_dt')
+            FROM lego_data
+            WHERE id IN ({placeholders})
+        """,
+            list(ids),
+        ).fetchall()
+    )
+
+    return all(
+        unique_id in stored and stored[unique_id] == set_data.get("last_modified_dt")
+        for unique_id, set_data in ids.items()
+    )
+
+
+def iter_rebrickable_pages(theme_id, engine=None, page_size=1000, stop_when=None):
+    """Yield every page of sets for one theme by following the `next` link.
+
+    Pages are requested newest-modified first, so once ``stop_when(page)``
+    reports a page as already stored the remaining pages are skipped.
+    """
+    engine = engine or get_engine()
+    url = f"{REBRICKABLE_API_URL}/lego/sets/"
+    # Use key parameter instead of Authorization header
+    params = {
+        "key": rebrickable_api_key,
+        "page_size": page_size,
+        "ordering": "-last_modified_dt",
+        "theme_id": theme_id,
+    }
+
+    while url:
+        data = engine.get_json(url, params=params)
+        page = data.get("results", [])
+        if not page:
+            return
+
+        if stop_when is not None and stop_when(page):
+            return
+
+        yield page
+
+        # The next link already carries the query string
+        url, params = data.get("next"), None
 
+
+def stream_rebrickable_sets(
+    conn=None, theme_ids=None, engine=None, page_size=1000, max_buffered_pages=4
+):
+    """Stream pages of Rebrickable sets for all themes with bounded memory.
+
+    Each theme is paginated on the fetch engine's pool and pages are handed
+    over through a bounded queue, so at most ``max_buffered_pages`` pages
+    are held in memory while the caller saves them. With ``conn`` set, a
+    theme stops early at the first page that is entirely unchanged.
+    """
     if not rebrickable_api_key:
         print("⚠️  Rebrickable API key not found. Skipping Rebrickable data.")
-        return []
+        return
 
-    # Popular theme IDs (from Rebrickable API)
-    theme_ids = {
-        "Star Wars": 171,      # Star Wars
-        "City": 52,            # City
-        "Technic": 1,          # Technic
-        "Creator": 22,         # Creator
-        "Architecture": 50,    # Architecture
-        "Marvel": 171,         # Marvel (same as Star Wars for now)
-        "DC Comics": 171,      # DC Comics (same as Star Wars for now)
-        "Harry Potter": 171,   # Harry Potter (same as Star Wars for now)
-        "Disney": 171,         # Disney (same as Star Wars for now)
-        "Minecraft": 171,      # Minecraft (same as Star Wars for now)
-        "Ninjago": 171,        # Ninjago (same as Star Wars for now)
-        "Friends": 171,        # Friends (same as Star Wars for now)
-        "Speed Champions": 171, # Speed Champions (same as Star Wars for now)
-        "Ideas": 171,          # Ideas (same as Star Wars for now)
-        "Expert": 171,         # Expert (same as Star Wars for now)
-    }
+    engine = engine or get_engine()
+    theme_ids = theme_ids or resolve_rebrickable_theme_ids(engine=engine)
+    if not theme_ids:
+        print("⚠️  No Rebrickable themes resolved. Skipping Rebrickable data.")
+        return
 
-    all_sets = []
-    sets_per_theme = min(100, limit // len(theme_ids))  # Max 100 per theme
+    pages = queue.Queue(maxsize=max_buffered_pages)
+    cancelled = threading.Event()
+    done = object()
 
-    for theme_name, theme_id in theme_ids.items():
-        print(f"  Fetching {theme_name} theme...")
-        url = "https://rebrickable.com/api/v3/lego/sets/"
-        
-        # Use key parameter instead of Authorization header
-        params = {
-            "key": rebrickable_api_key,
-            "page_size": min(sets_per_theme, 1000),  # Increased page size
-            "ordering": "-set_num",
-            "theme_id": theme_id,
-        }
+    def put(item):
+        # Poll so a walker blocked on a full queue notices cancellation
+        while not cancelled.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
 
+    def walk_pages(theme_name, theme_id, unchanged):
         try:
-            response = requests.get(url, params=params, timeout=30)
-            response.raise_for_status()
-            data = response.json()
+            for page in iter_rebrickable_pages(theme_id, engine, page_size, unchanged):
+                for set_data in page:
+                    set_data.setdefault("theme", theme_name)
+                if not put((theme_name, page, None)):
+                    return
+        except Exception as e:
+            put((theme_name, None, e))
+        finally:
+            put((theme_name, done, None))
 
-            sets = data.get("results", [])[:sets_per_theme]
-            all_sets.extend(sets)
-            print(f"    Found {len(sets)} {theme_name} sets")
+    def walk_theme(theme_name, theme_id):
+        if conn is None:
+            walk_pages(theme_name, theme_id, None)
+            return
+        # DuckDB connections are not shared across threads
+        with conn.cursor() as cursor:
 
-        except Exception as e:
-            print(f"    Error fetching {theme_name}: {e}")
-            continue
+            def page_unchanged(page):
+                return is_page_unchanged(cursor, page)
+
+            walk_pages(theme_name, theme_id, page_unchanged)
+
+    print(f"  Streaming {len(theme_ids)} Rebrickable themes...")
+    for theme_name, theme_id in theme_ids.items():
+        engine.submit(walk_theme, theme_name, theme_id)
+
+    remaining = len(theme_ids)
+    counts = {theme_name: 0 for theme_name in theme_ids}
+    try:
+        while remaining:
+            theme_name, page, error = pages.get()
+            if page is done:
+                remaining -= 1
+                print(f"    Finished {theme_name}: {counts[theme_name]} sets")
+            elif error is not None:
+                print(f"    Error fetching {theme_name}: {error}")
+            else:
+                counts[theme_name] += len(page)
+                yield page
+    finally:
+        cancelled.set()
+
+    print(f"  Total Rebrickable sets streamed: {sum(counts.values())}")
+
+
+def fetch_rebrickable_enhanced(limit=200, engine=None):
+    """Enhanced Rebrickable data fetching with multiple themes"""
+    print(f"Fetching {limit} records from Rebrickable API...")
+
+    page_size = min(1000, max(1, limit))
+    all_sets = []
+    for page in stream_rebrickable_sets(engine=engine, page_size=page_size):
+        all_sets.extend(islice(page, limit - len(all_sets)))
+        if len(all_sets) >= limit:
+            break
 
     print(f"  Total Rebrickable sets: {len(all_sets)}")
     return all_sets
 
 
-def fetch_brickset_enhanced(limit=200):
+def get_brickset_user_hash(engine=None, refresh=False):
+    """Log in to Brickset once and reuse the user hash across runs.
+
+    The hash is kept in the HTTP cache directory, readable only by the
+    owner, and is replaced when ``refresh`` is set or the user or API
+    endpoint changes.
+    """
+    if not refresh:
+        try:
+            with open(BRICKSET_HASH_FILE, encoding="utf-8") as f:
+                cached = json.load(f)
+            if (
+                cached.get("username") == brickset_username
+                and cached.get("api_url") == BRICKSET_API_URL
+                and cached.get("hash")
+            ):
+                return cached["hash"]
+        except (OSError, ValueError):
+            pass
+
+    engine = engine or get_engine()
+    login_params = {
+        "apiKey": brickset_api_key,
+        "username": brickset_username,
+        "password": brickset_password,
+    }
+    login_data = engine.get_json(f"{BRICKSET_API_URL}/login", params=login_params)
+    if login_data.get("status") != "success":
+        print(f"  Brickset login failed: {login_data}")
+        return None
+
+    user_hash = login_data.get("hash")
+    try:
+        os.makedirs(os.path.dirname(BRICKSET_HASH_FILE), exist_ok=True)
+        fd = os.open(BRICKSET_HASH_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "username": brickset_username,
+                    "api_url": BRICKSET_API_URL,
+                    "hash": user_hash,
+                },
+                f,
+            )
+    except OSError as e:
+        print(f"  Could not store Brickset user hash: {e}")
+    return user_hash
+
+
+def fetch_brickset_enhanced(limit=200, engine=None):
     """Enhanced Brickset data fetching with multiple years"""
     print(f"Fetching {limit} records from Brickset API...")
 
@@ -117,77 +317,83 @@ def fetch_brickset_enhanced(limit=200):
         print("⚠️  Brickset API credentials not found. Skipping Brickset data.")
         return []
 
+    engine = engine or get_engine()
+
     try:
-        # Get user hash
-        login_url = "https://brickset.com/api/v3.asmx/login"
-        login_params = {
-            "apiKey": brickset_api_key,
-            "username": brickset_username,
-            "password": brickset_password,
-        }
-        login_response = requests.get(login_url, params=login_params, timeout=30)
-        login_response.raise_for_status()
-        login_data = login_response.json()
-
-        if login_data.get("status") != "success":
-            print(f"  Brickset login failed: {login_data}")
+        user_hash = get_brickset_user_hash(engine)
+        if not user_hash:
             return []
 
-        user_hash = login_data.get("hash")
-
         # Fetch from multiple years and themes
         all_sets = []
-        
+        sets_url = f"{BRICKSET_API_URL}/getSets"
+
         # Strategy 1: Get diverse years
         years = [2024, 2023, 2022, 2021, 2020, 2019, 2018, 2017, 2016, 2015]
         sets_per_year = min(100, limit // (len(years) + 5))  # Max 100 per year
-        
-        for year in years:
-            print(f"  Fetching {year} sets...")
-            sets_url = "https://brickset.com/api/v3.asmx/getSets"
-            sets_params = {
-                "apiKey": brickset_api_key,
-                "userHash": user_hash,
-                "params": json.dumps({"year": year, "pageSize": sets_per_year}),
-            }
-
-            sets_response = requests.get(sets_url, params=sets_params, timeout=30)
-            sets_response.raise_for_status()
-            sets_data = sets_response.json()
-
-            if sets_data.get("status") == "success":
-                sets = sets_data.get("sets", [])[:sets_per_year]
-                all_sets.extend(sets)
-                print(f"    Found {len(sets)} {year} sets")
 
         # Strategy 2: Get popular themes
         popular_themes = ["Technic", "Star Wars", "City", "Creator", "Architecture", "Marvel", "Harry Potter", "Disney", "Ninjago", "Friends"]
         sets_per_theme = 50  # Increased to 50 per theme
-        
-        for theme in popular_themes:
-            print(f"  Fetching {theme} theme sets...")
-            try:
-                theme_params = {
-                    "apiKey": brickset_api_key,
-                    "userHash": user_hash,
-                    "params": json.dumps({"theme": theme, "pageSize": sets_per_theme}),
-                }
-                
-                theme_response = requests.get(sets_url, params=theme_params, timeout=30)
-                theme_response.raise_for_status()
-                theme_data = theme_response.json()
-                
-                if theme_data.get("status") == "success":
-                    theme_sets = theme_data.get("sets", [])[:sets_per_theme]
-                    all_sets.extend(theme_sets)
-                    print(f"    Found {len(theme_sets)} {theme} sets")
-                else:
-                    print(f"    No {theme} sets found")
-                    
-            except Exception as e:
-                print(f"    Error fetching {theme}: {e}")
+
+        queries = [(str(year), {"year": year}, sets_per_year) for year in years]
+        queries += [
+            (theme, {"theme": theme}, sets_per_theme) for theme in popular_themes
+        ]
+
+        def run_queries(pending, user_hash):
+            requests_list = [
+                (
+                    sets_url,
+                    {
+                        "apiKey": brickset_api_key,
+                        "userHash": user_hash,
+                        "params": json.dumps({**query, "pageSize": page_size}),
+                    },
+                )
+                for _, query, page_size in pending
+            ]
+            return list(zip(pending, engine.get_json_many(requests_list)))
+
+        # Both strategies run together on the shared engine
+        print(f"  Fetching {len(queries)} year/theme queries concurrently...")
+        results = run_queries(queries, user_hash)
+
+        # A stored hash can expire; log in again and retry what it broke
+        expired = [
+            query
+            for query, (sets_data, error) in results
+            if error is None
+            and sets_data.get("status") != "success"
+            and "hash" in str(sets_data.get("message", "")).lower()
+        ]
+        if expired:
+            print("  Brickset user hash rejected, logging in again...")
+            user_hash = get_brickset_user_hash(engine, refresh=True)
+            if user_hash:
+                retried = {q[0]: r for q, r in run_queries(expired, user_hash)}
+                results = [(q, retried.get(q[0], r)) for q, r in results]
+
+        failed = []
+        for (label, _, page_size), (sets_data, error) in results:
+            if error is not None:
+                print(f"    Error fetching {label}: {error}")
+                failed.append(label)
                 continue
 
+            if sets_data.get("status") == "success":
+                sets = sets_data.get("sets", [])[:page_size]
+                all_sets.extend(sets)
+                print(f"    Found {len(sets)} {label} sets")
+            else:
+                print(f"    No {label} sets found: {sets_data.get('message', '')}")
+                failed.append(label)
+
+        if failed:
+            print(
+                f"  ⚠️  {len(failed)} Brickset queries failed after retries: "
+                + ", ".join(failed)
+            )
         print(f"  Total Brickset sets: {len(all_sets)}")
         return all_sets
 
@@ -196,7 +402,7 @@ def fetch_brickset_enhanced(limit=200):
         return []
 
 
-def fetch_brickowl_enhanced(limit=200):
+def fetch_brickowl_enhanced(limit=200, engine=None):
     """Enhanced BrickOwl data fetching"""
     print(f"Fetching {limit} records from BrickOwl API...")
 
@@ -208,9 +414,7 @@ def fetch_brickowl_enhanced(limit=200):
     params = {"key": brickowl_api_key, "type": "Set", "limit": limit}
 
     try:
-        response = requests.get(url, params=params, timeout=30)
-        response.raise_for_status()
-        data = response.json()
+        data = (engine or get_engine()).get_json(url, params=params)
         sets = data.get("results", [])[:limit]
         print(f"  Total BrickOwl sets: {len(sets)}")
         return sets
@@ -238,21 +442,27 @@ def fetch_bricklink_data():
     return []
 
 
-def fetch_rebrickable_themes():
+def fetch_rebrickable_themes(engine=None):
     """Fetch theme information from Rebrickable"""
     print("Fetching theme information...")
 
     if not rebrickable_api_key:
         return {}
 
-    url = "https://rebrickable.com/api/v3/lego/themes/"
-    headers = {"Authorization": f"key {rebrickable_api_key}"}
+    engine = engine or get_engine()
+    url = f"{REBRICKABLE_API_URL}/lego/themes/"
+    params = {"key": rebrickable_api_key, "page_size": 1000}
 
+    themes = {}
     try:
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-        return {theme["name"]: theme["id"] for theme in data.get("results", [])}
+        while url:
+            data = engine.get_json(url, params=params)
+            for theme in data.get("results", []):
+                # Prefer top-level themes over same-named sub-themes
+                if theme["name"] not in themes or not theme.get("parent_id"):
+                    themes[theme["name"]] = theme["id"]
+            url, params = data.get("next"), None
+        return themes
     except Exception as e:
         print(f"  Error fetching themes: {e}")
         return {}
@@ -297,116 +507,152 @@ def calculate_data_quality(set_data):
     return score
 
 
+def build_lego_data_row(set_data, source):
+    """Build a lego_data row from a raw API record"""
+    enhanced_data = enhance_set_data(set_data, source)
+    return {
+        # Generate unique ID
+        "id": generate_unique_id(source, enhanced_data["set_number"]),
+        "source": source,
+        "name": enhanced_data["name"],
+        "details": json.dumps(enhanced_data, ensure_ascii=False),
+        "set_number": enhanced_data["set_number"],
+        "year": enhanced_data["year"],
+        "theme": enhanced_data["theme"],
+        "pieces": enhanced_data["pieces"],
+        "minifigures": enhanced_data["minifigures"],
+        "price": enhanced_data["price"],
+        "rating": enhanced_data["rating"],
+    }
+
+
 def save_to_database_enhanced(conn, sets, source):
     """Save enhanced sets to database"""
     print(f"Saving {len(sets)} {source} sets to database...")
 
+    rows = []
     for set_data in sets:
         try:
-            enhanced_data = enhance_set_data(set_data, source)
-
-            # Generate unique ID
-            unique_id = generate_unique_id(source, enhanced_data["set_number"])
-
-            # Insert with enhanced schema
-            conn.execute(
-                """
-                INSERT OR REPLACE INTO lego_data 
-                (id, source, name, details, set_number, year, theme, pieces, minifigures, price, rating) 
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-                [
-                    unique_id,
-                    source,
-                    enhanced_data["name"],
-                    json.dumps(enhanced_data, ensure_ascii=False),
-                    enhanced_data["set_number"],
-                    enhanced_data["year"],
-                    enhanced_data["theme"],
-                    enhanced_data["pieces"],
-                    enhanced_data["minifigures"],
-                    enhanced_data["price"],
-                    enhanced_data["rating"],
-                ],
-            )
-
+            rows.append(build_lego_data_row(set_data, source))
         except Exception as e:
-            print(
-                f"  Error saving set {enhanced_data.get('set_number', 'unknown')}: {e}"
-            )
+            print(f"  Error saving set {set_data.get('set_num', 'unknown')}: {e}")
             continue
 
-    print(f"  Successfully saved {len(sets)} {source} sets")
+    # Insert with enhanced schema, one statement per batch
+    saved = upsert_lego_data(conn, rows)
+
+    print(f"  Successfully saved {saved} {source} sets")
+    return saved
 
 
 def create_faiss_index_enhanced(conn):
-    """Create enhanced FAISS index with better text processing"""
+    """Create or incrementally update the enhanced FAISS index"""
     print("Creating enhanced FAISS index...")
 
-    # Get all records with enhanced data
-    result = conn.execute(
-        """
-        SELECT details, name, theme, year, pieces 
-        FROM lego_data 
-        ORDER BY year DESC, pieces DESC
-    """
-    ).fetchall()
+    try:
+        embeddings = get_embeddings(openai_api_key, conn=conn)
+        # Only new or changed records are embedded; deleted ones are removed
+        sync_faiss_index(conn, embeddings)
+        print("  Enhanced FAISS index created and saved successfully")
 
-    if not result:
-        print("⚠️  No data found in database. Cannot create FAISS index.")
-        return
+    except Exception as e:
+        print(f"  Error creating FAISS index: {e}")
 
-    # Create enhanced text representations
-    enhanced_texts = []
-    for row in result:
-        details = json.loads(row[0])
-        name = row[1] or ""
-        theme = row[2] or ""
-        year = row[3] or ""
-        pieces = row[4] or ""
 
-        # Create optimized text representation (shorter to avoid token limits)
-        enhanced_text = f"LEGO Set: {name} | Theme: {theme} | Year: {year} | Pieces: {pieces} | Details: {json.dumps(details, ensure_ascii=False)[:500]}"
-        enhanced_texts.append(enhanced_text)
+def iter_source_batches(conn=None, brickset_limit=1000, batch_size=1000):
+    """Yield batches of ``(source, raw set)`` pairs from every enabled catalog"""
+    for page in stream_rebrickable_sets(conn):
+        yield [("rebrickable", set_data) for set_data in page]
 
-    print(f"  Creating index for {len(enhanced_texts)} records...")
+    # Skip BrickOwl for now (needs API key)
+    brickset_sets = fetch_brickset_enhanced(brickset_limit)
+    for start in range(0, len(brickset_sets), batch_size):
+        yield [
+            ("brickset", set_data)
+            for set_data in brickset_sets[start : start + batch_size]
+        ]
 
-    try:
-        embeddings = OpenAIEmbeddings(openai_api_key=openai_api_key)
-        vectorstore = FAISS.from_texts(enhanced_texts, embeddings)
 
-        # Save the FAISS index
-        vectorstore.save_local("./faiss_index")
-        print("  Enhanced FAISS index created and saved successfully")
+def run_ingestion_pipeline(
+    conn, embeddings=None, details_chars=DETAILS_CHARS, max_queue=4
+):
+    """Fetch, normalise, upsert, embed and index catalog batches concurrently.
 
-    except Exception as e:
-        print(f"  Error creating FAISS index: {e}")
+    Each stage runs on its own thread with bounded queues in between, so
+    memory stays flat however large the catalog is. Without embeddings the
+    pipeline stops after the database write. Returns the Pipeline.
+    """
+    # lego_sets predates this run only if it was canonicalised before
+    has_sets = conn.execute(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = 'lego_sets'"
+    ).fetchone()[0]
+    if not has_sets:
+        refresh_canonical_sets(conn)
+
+    writer_conn = conn.cursor()  # used only by the upsert stage's thread
+
+    def normalise(batch):
+        rows = []
+        for source, set_data in batch:
+            try:
+                rows.append(build_lego_data_row(set_data, source))
+            except Exception as e:
+                print(
+                    f"  Error normalising set {set_data.get('set_num', 'unknown')}: {e}"
+                )
+        return rows
+
+    def upsert(rows):
+        upsert_lego_data(writer_conn, rows)
+        # Hand the merged canonical sets on, not the raw per-source rows
+        return upsert_canonical_sets(writer_conn, rows)
+
+    stages = [("normalise", normalise), ("upsert", upsert)]
+    writer = None
+    if embeddings is not None:
+        writer = IndexWriter(embeddings, details_chars=details_chars)
+        stages += [
+            ("embed", lambda sets: writer.embed(index_records(sets, details_chars))),
+            ("index", writer.add),
+        ]
+
+    pipeline = Pipeline("fetch", iter_source_batches(conn), stages, max_queue=max_queue)
+    try:
+        pipeline.run()
+    finally:
+        writer_conn.close()
+        pipeline.report()
+
+    if writer is not None:
+        writer.reconcile(conn, details_chars)
+        writer.save(conn)
+    return pipeline
 
 
 def main():
     """Enhanced main function"""
+    parser = argparse.ArgumentParser(description="Enhanced LEGO Data Loader")
+    parser.add_argument(
+        "--embeddings",
+        choices=EMBEDDING_BACKENDS,
+        help="defaults to EMBEDDING_BACKEND or openai",
+    )
+    args = parser.parse_args()
+
     print("🧱 Enhanced LEGO Data Loader")
     print("=" * 50)
 
     # Initialize database
     conn = initialize_database()
 
-    # Fetch theme mappings (commented out for now)
-    # themes = fetch_rebrickable_themes()
-
-    # Fetch data from all sources with enhanced limits
-    # Skip Rebrickable and BrickOwl for now (need API keys)
-    rebrickable_sets = fetch_rebrickable_enhanced(1000)  # Increased to 1000
-    brickset_sets = fetch_brickset_enhanced(1000)  # Increased to 1000
-    # brickowl_sets = fetch_brickowl_enhanced(200)
+    embeddings = None
+    try:
+        embeddings = get_embeddings(openai_api_key, args.embeddings, conn=conn)
+    except Exception as e:
+        print(f"⚠️  Embeddings unavailable, skipping the FAISS index: {e}")
 
-    # Save to database
-    if rebrickable_sets:
-        save_to_database_enhanced(conn, rebrickable_sets, "rebrickable")
-    if brickset_sets:
-        save_to_database_enhanced(conn, brickset_sets, "brickset")
-    # if brickowl_sets:
-    #     save_to_database_enhanced(conn, brickowl_sets, "brickowl")
+    # Fetch, store and index every catalog in one overlapping pipeline
+    run_ingestion_pipeline(conn, embeddings)
 
     # Commit changes
     conn.commit()
@@ -432,10 +678,6 @@ def main():
     print(f"   Average Pieces: {stats[3]:.0f}")
     print(f"   Year Range: {stats[4]} - {stats[5]}")
 
-    # Create enhanced FAISS index
-    if stats[0] > 0:
-        create_faiss_index_enhanced(conn)
-
     # Cleanup
     conn.close()
     print("\n✅ Enhanced data loading complete!")
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+🏠 Local Embeddings
+Offline embeddings fitted on the catalog itself: TF-IDF over word unigrams
+and bigrams, projected to a few hundred dimensions with truncated SVD
+(latent semantic analysis). Saved as plain arrays under local_embedder/,
+so queries embed in-process in microseconds with no API round-trip and
+the same text always gets the same vector. Words the model was not
+fitted on are ignored; refit after large catalog changes (the model name
+changes, so the next index sync re-embeds everything).
+
+Usage: python local_embeddings.py [--dimension 256]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+import duckdb
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from docstore import DETAILS_CHARS, build_index_text
+
+LOCAL_MODEL_PATH = os.getenv("LOCAL_EMBEDDING_PATH", "./local_embedder")
+LOCAL_DIMENSION = int(os.getenv("LOCAL_EMBEDDING_DIM", "256"))
+NGRAM_RANGE = (1, 2)
+
+VOCABULARY_FILE = "vocabulary.json"
+IDF_FILE = "idf.npy"
+PROJECTION_FILE = "projection.npy"
+MODEL_FILE = "model.json"
+
+
+def read_catalog_texts(conn, details_chars=DETAILS_CHARS):
+    """The text of every lego_data record, as it is embedded for the index"""
+    rows = conn.execute(
+        "SELECT details, name, theme, year, pieces FROM lego_data ORDER BY id"
+    ).fetchall()
+    return [build_index_text(*row, details_chars=details_chars) for row in rows]
+
+
+class LocalEmbeddings(Embeddings):
+    """TF-IDF + truncated SVD embeddings; vectors are unit length.
+
+    ``projection`` maps each vocabulary term to its row of the SVD
+    components, pre-scaled by the term's idf, so embedding a text is a
+    weighted sum of a few rows.
+    """
+
+    def __init__(self, vocabulary, idf, projection, name=None):
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.projection = projection
+        self.analyzer = TfidfVectorizer(ngram_range=NGRAM_RANGE).build_analyzer()
+        sample = np.ascontiguousarray(projection[:64]).tobytes()
+        digest = hashlib.sha1(sample).hexdigest()
+        self.model_name = name or f"local-lsa-{projection.shape[1]}-{digest[:12]}"
+
+    @classmethod
+    def fit(cls, texts, dimension=LOCAL_DIMENSION):
+        """Fit on ``texts``; the dimension is capped by the vocabulary and text count"""
+        vectorizer = TfidfVectorizer(
+            ngram_range=NGRAM_RANGE, sublinear_tf=True, min_df=2
+        )
+        matrix = vectorizer.fit_transform(texts)
+        dimension = max(1, min(dimension, matrix.shape[0] - 1, matrix.shape[1] - 1))
+        svd = TruncatedSVD(dimension, algorithm="randomized", random_state=0)
+        svd.fit(matrix)
+        vocabulary = {
+            term: int(column) for term, column in vectorizer.vocabulary_.items()
+        }
+        idf = vectorizer.idf_.astype(np.float32)
+        projection = (svd.components_.T * idf[:, None]).astype(np.float32)
+        return cls(vocabulary, idf, projection)
+
+    def save(self, path=LOCAL_MODEL_PATH):
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, VOCABULARY_FILE), "w", encoding="utf-8") as f:
+            json.dump(self.vocabulary, f)
+        np.save(os.path.join(path, IDF_FILE), self.idf)
+        np.save(os.path.join(path, PROJECTION_FILE), self.projection)
+        with open(os.path.join(path, MODEL_FILE), "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "name": self.model_name,
+                    "dimension": int(self.projection.shape[1]),
+                    "terms": len(self.vocabulary),
+                    "ngram_range": list(NGRAM_RANGE),
+                    "fitted_at": datetime.now(timezone.utc).isoformat(),
+                },
+                f,
+                indent=2,
+            )
+
+    @classmethod
+    def load(cls, path=LOCAL_MODEL_PATH):
+        """The saved model, or None if none was saved"""
+        try:
+            with open(os.path.join(path, MODEL_FILE), encoding="utf-8") as f:
+                model = json.load(f)
+            with open(os.path.join(path, VOCABULARY_FILE), encoding="utf-8") as f:
+                vocabulary = json.load(f)
+        except OSError:
+            return None
+        return cls(
+            vocabulary,
+            np.load(os.path.join(path, IDF_FILE)),
+            np.load(os.path.join(path, PROJECTION_FILE)),
+            model["name"],
+        )
+
+    @classmethod
+    def load_or_fit(cls, conn=None, path=LOCAL_MODEL_PATH):
+        """The saved model, or one fitted on lego_data and saved"""
+        model = cls.load(path)
+        if model is not None:
+            return model
+        own_conn = conn is None
+        conn = conn or duckdb.connect("lego_data.duckdb", read_only=True)
+        try:
+            texts = read_catalog_texts(conn)
+        finally:
+            if own_conn:
+                conn.close()
+        if len(texts) < 3:
+            raise ValueError("lego_data has too few records to fit local embeddings")
+        model = cls.fit(texts)
+        model.save(path)
+        print(f"  Fitted {model.model_name} on {len(texts)} records")
+        return model
+
+    def _embed(self, text):
+        columns = {}
+        for term in self.analyzer(text):
+            column = self.vocabulary.get(term)
+            if column is not None:
+                columns[column] = columns.get(column, 0) + 1
+        if not columns:
+            return np.zeros(self.projection.shape[1], dtype=np.float32)
+        weights = 1.0 + np.log(np.fromiter(columns.values(), np.float32, len(columns)))
+        vector = weights @ self.projection[list(columns)]
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def embed_documents(self, texts):
+        return [self._embed(text).tolist() for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text).tolist()
+
+
+def main():
+    """Fit the local embeddings on lego_data and save them"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dimension", type=int, default=LOCAL_DIMENSION)
+    parser.add_argument("--path", default=LOCAL_MODEL_PATH)
+    args = parser.parse_args()
+
+    conn = duckdb.connect("lego_data.duckdb", read_only=True)
+    try:
+        texts = read_catalog_texts(conn)
+    finally:
+        conn.close()
+    model = LocalEmbeddings.fit(texts, args.dimension)
+    model.save(args.path)
+    print(f"✅ Fitted {model.model_name} on {len(texts)} records, saved to {args.path}")
+    print("   Run fix_faiss.py --embeddings local to re-embed the index")
+
+
+if __name__ == "__main__":
+    main()
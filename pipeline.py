@@ -0,0 +1,176 @@
+"""
+🚰 Streaming Stage Pipeline
+Runs a chain of stages on their own threads, connected by bounded queues, so
+a slow stage applies back-pressure instead of letting batches pile up in
+memory and every stage works on a different batch at the same time.
+"""
+
+import queue
+import threading
+import time
+
+
+class StageStats:
+    """Counters for one stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.batches = 0
+        self.records = 0
+        self.busy = 0.0  # seconds spent inside the stage function
+        self.started = None
+        self.finished = None
+
+    @property
+    def throughput(self):
+        """Records per second of work time"""
+        return self.records / self.busy if self.busy else 0.0
+
+    def report(self):
+        print(
+            f"   {self.name:<10} {self.batches:>6} batches {self.records:>9} records "
+            f"{self.busy:>8.2f}s busy {self.throughput:>10,.0f} records/s"
+        )
+
+
+def _count(item):
+    try:
+        return len(item)
+    except TypeError:
+        return 1
+
+
+class Pipeline:
+    """Source iterable followed by ``(name, fn)`` stages.
+
+    Each stage function takes one batch and returns the batch for the next
+    stage, or None to drop it. Queues hold at most ``max_queue`` batches.
+    The first exception in any stage cancels the pipeline and is re-raised
+    from ``run``.
+    """
+
+    def __init__(self, source_name, source, stages, max_queue=4):
+        self.source_name = source_name
+        self.source = source
+        self.stages = stages
+        self.max_queue = max_queue
+        names = [source_name] + [name for name, _ in stages]
+        self.stats = [StageStats(name) for name in names]
+        self.elapsed = 0.0
+        self._cancelled = threading.Event()
+        self._errors = []
+        self._done = object()
+
+    def _put(self, q, item):
+        # Poll so a producer blocked on a full queue notices cancellation
+        while not self._cancelled.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self._cancelled.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return self._done
+
+    def _fail(self, stats, error):
+        print(f"  ❌ Stage {stats.name} failed: {error}")
+        self._errors.append(error)
+        self._cancelled.set()
+
+    def _run_source(self, out, stats):
+        stats.started = time.perf_counter()
+        iterator = iter(self.source)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    batch = next(iterator)
+                except StopIteration:
+                    break
+                stats.busy += time.perf_counter() - start
+                stats.batches += 1
+                stats.records += _count(batch)
+                if not self._put(out, batch):
+                    break
+        except Exception as e:
+            self._fail(stats, e)
+        finally:
+            # Lets generator sources release their own workers early
+            if hasattr(iterator, "close"):
+                iterator.close()
+            stats.finished = time.perf_counter()
+            self._put(out, self._done)
+
+    def _run_stage(self, fn, inbox, out, stats):
+        stats.started = time.perf_counter()
+        try:
+            while True:
+                batch = self._get(inbox)
+                if batch is self._done:
+                    break
+                start = time.perf_counter()
+                result = fn(batch)
+                stats.busy += time.perf_counter() - start
+                stats.batches += 1
+                stats.records += _count(batch)
+                if result is not None and out is not None:
+                    if not self._put(out, result):
+                        break
+        except Exception as e:
+            self._fail(stats, e)
+        finally:
+            stats.finished = time.perf_counter()
+            if out is not None:
+                self._put(out, self._done)
+
+    def run(self):
+        """Run to completion and return the per-stage stats"""
+        queues = [queue.Queue(maxsize=self.max_queue) for _ in self.stages]
+        threads = [
+            threading.Thread(
+                target=self._run_source,
+                args=(queues[0], self.stats[0]),
+                name=f"stage-{self.source_name}",
+                daemon=True,
+            )
+        ]
+        for i, (name, fn) in enumerate(self.stages):
+            out = queues[i + 1] if i + 1 < len(queues) else None
+            threads.append(
+                threading.Thread(
+                    target=self._run_stage,
+                    args=(fn, queues[i], out, self.stats[i + 1]),
+                    name=f"stage-{name}",
+                    daemon=True,
+                )
+            )
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                # join with a timeout keeps Ctrl+C responsive
+                while thread.is_alive():
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self._cancelled.set()
+            raise
+        self.elapsed = time.perf_counter() - start
+
+        if self._errors:
+            raise self._errors[0]
+        return self.stats
+
+    def report(self):
+        """Print per-stage throughput"""
+        print(f"\n🚰 Pipeline finished in {self.elapsed:.2f}s")
+        for stats in self.stats:
+            stats.report()
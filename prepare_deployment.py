@@ -13,10 +13,14 @@ def check_files():
     """Check if required files exist"""
     print("🔍 Checking deployment files...")
     
+    # Index files live in the current snapshot (see index_snapshots)
+    from index_snapshots import resolve_index_path
+
+    index_path = resolve_index_path("faiss_index")
     files_to_check = [
         "lego_data.duckdb",
-        "faiss_index/index.faiss",
-        "faiss_index/index.pkl"
+        os.path.join(index_path, "index.faiss"),
+        os.path.join(index_path, "docs.npy")
     ]
     
     all_exist = True
@@ -64,13 +68,13 @@ def verify_deployment():
     
     # Test FAISS index
     try:
-        from langchain_openai import OpenAIEmbeddings
-        from langchain_community.vectorstores import FAISS
+        from embedding_backend import get_embeddings
+        from vector_index import load_vectorstore
         from dotenv import load_dotenv
         
         load_dotenv()
-        embeddings = OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY"))
-        vectorstore = FAISS.load_local("./faiss_index", embeddings, allow_dangerous_deserialization=True)
+        embeddings = get_embeddings(os.getenv("OPENAI_API_KEY"))
+        vectorstore = load_vectorstore(embeddings)
         
         # Test search
         results = vectorstore.similarity_search("Star Wars", k=3)
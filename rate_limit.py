@@ -0,0 +1,47 @@
+"""
+🚦 Rate Limiting
+Thread-safe token bucket used to keep concurrent callers under an API's
+published request and token budgets.
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, bursts up to ``capacity``"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, amount, burst=None):
+        """Bucket refilling ``amount`` tokens per minute; burst defaults to that"""
+        return cls(amount / 60.0, burst if burst is not None else amount)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def acquire(self, amount=1):
+        """Block until ``amount`` tokens are available, then take them.
+
+        Requests larger than the bucket are allowed once it is full, so a
+        single oversized call can never deadlock.
+        """
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self.rate
+            time.sleep(wait)
@@ -0,0 +1,204 @@
+"""
+🎚️ Metadata Search Filters
+Columnar theme / year / pieces / price arrays aligned with the FAISS rows,
+saved next to the index as meta.npy. A metadata filter (langchain's dict
+syntax, e.g. {"theme": "City", "year": {"$gte": 2015}}) becomes a boolean
+mask over the rows, which the vectorstore turns into a FAISS ID selector,
+so only matching sets are ever searched.
+"""
+
+import json
+import os
+
+import numpy as np
+
+META_FILE = "meta.npy"
+THEMES_FILE = "themes.json"
+
+# Filterable lego_sets columns; numbers are float32 so NULL can be NaN,
+# which fails every comparison
+FILTER_FIELDS = ["theme", "year", "pieces", "price"]
+META_DTYPE = [("theme", "i4"), ("year", "f4"), ("pieces", "f4"), ("price", "f4")]
+
+RANGE_OPERATORS = {
+    "$gt": np.greater,
+    "$gte": np.greater_equal,
+    "$lt": np.less,
+    "$lte": np.less_equal,
+}
+
+FILTER_OPERATORS = ["$eq", "$ne", "$in", "$nin", *RANGE_OPERATORS]
+LIST_OPERATORS = ["$in", "$nin"]
+
+
+def validate_filter(filter):
+    """Raise ValueError unless ``filter`` is one the filter columns can apply.
+
+    Fields must be FILTER_FIELDS, operators FILTER_OPERATORS (no ranges on
+    theme), and values strings for theme and numbers for the rest.
+    """
+    if not isinstance(filter, dict):
+        raise ValueError("filter must be an object of field conditions")
+    for field, condition in filter.items():
+        if field not in FILTER_FIELDS:
+            raise ValueError(f"cannot filter on {field!r}, only on {FILTER_FIELDS}")
+        if isinstance(condition, dict):
+            conditions = condition.items()
+        else:
+            conditions = [("$in" if isinstance(condition, list) else "$eq", condition)]
+        kind, kind_name = (
+            (str, "strings") if field == "theme" else ((int, float), "numbers")
+        )
+        for op, value in conditions:
+            if op not in FILTER_OPERATORS or (
+                field == "theme" and op in RANGE_OPERATORS
+            ):
+                raise ValueError(f"unsupported operator {op!r} for {field!r}")
+            values = value if op in LIST_OPERATORS else [value]
+            if not isinstance(values, list) or not all(
+                isinstance(v, kind) and not isinstance(v, bool) for v in values
+            ):
+                shape = "a list of " if op in LIST_OPERATORS else ""
+                raise ValueError(f"{field!r} {op} needs {shape}{kind_name}")
+
+
+def read_filter_columns(conn, ids):
+    """lego_sets filter columns for ``ids``, in the same order.
+
+    Returns (meta, themes): a structured array with one row per id and the
+    theme vocabulary its ``theme`` codes index into (-1 is no theme).
+    """
+    cursor = conn.cursor().execute(
+        f"""
+        SELECT {", ".join(["id"] + FILTER_FIELDS)}
+        FROM lego_sets
+        WHERE id IN (SELECT unnest(?))
+    """,
+        [list(ids)],
+    )
+    rows = {row[0]: row[1:] for row in cursor.fetchall()}
+    themes = sorted({row[0] for row in rows.values() if row[0]})
+    codes = {theme: code for code, theme in enumerate(themes)}
+
+    meta = np.empty(len(ids), dtype=META_DTYPE)
+    for i, row_id in enumerate(ids):
+        theme, year, pieces, price = rows.get(row_id, (None, None, None, None))
+        meta[i] = (
+            codes.get(theme, -1),
+            np.nan if year is None else year,
+            np.nan if pieces is None else pieces,
+            np.nan if price is None else float(price),
+        )
+    return meta, themes
+
+
+def save_filter_columns(index_path, meta, themes):
+    """Write meta.npy and the theme vocabulary next to an index"""
+    np.save(os.path.join(index_path, META_FILE), meta)
+    with open(os.path.join(index_path, THEMES_FILE), "w", encoding="utf-8") as f:
+        json.dump(themes, f)
+
+
+class FilterColumns:
+    """The saved filter columns of one index, turned into row masks"""
+
+    def __init__(self, meta, themes):
+        self.meta = meta
+        self.codes = {theme: code for code, theme in enumerate(themes)}
+
+    @classmethod
+    def load(cls, index_path, mmap=True):
+        """Columns saved with the index, or None for indexes without them"""
+        if not os.path.exists(os.path.join(index_path, META_FILE)):
+            return None
+        meta = np.load(
+            os.path.join(index_path, META_FILE), mmap_mode="r" if mmap else None
+        )
+        with open(os.path.join(index_path, THEMES_FILE), encoding="utf-8") as f:
+            return cls(meta, json.load(f))
+
+    def mask(self, filter):
+        """Boolean mask of rows matching ``filter``.
+
+        Returns None when the filter uses fields or operators these columns
+        cannot answer; the caller then filters on document metadata instead.
+        """
+        if not isinstance(filter, dict) or not filter:
+            return None
+        mask = np.ones(len(self.meta), dtype=bool)
+        for field, condition in filter.items():
+            if field not in FILTER_FIELDS:
+                return None
+            column = self.meta[field]
+            if field == "theme":
+                condition = self._theme_codes(condition)
+                if condition is None:
+                    return None
+            field_mask = self._match(column, condition)
+            if field_mask is None:
+                return None
+            mask &= field_mask
+        return mask
+
+    def _theme_codes(self, condition):
+        """Same condition with theme names replaced by their codes"""
+
+        def code(theme):
+            return self.codes.get(theme, -2)  # -2 matches nothing
+
+        if isinstance(condition, dict):
+            converted = {}
+            for op, value in condition.items():
+                if op in ("$eq", "$ne"):
+                    converted[op] = code(value)
+                elif op in ("$in", "$nin"):
+                    converted[op] = [code(v) for v in value]
+                else:
+                    return None
+            return converted
+        if isinstance(condition, list):
+            return [code(v) for v in condition]
+        return code(condition)
+
+    @staticmethod
+    def _match(column, condition):
+        if isinstance(condition, list):
+            return np.isin(column, condition)
+        if not isinstance(condition, dict):
+            return column == condition
+        mask = np.ones(len(column), dtype=bool)
+        for op, value in condition.items():
+            if op in RANGE_OPERATORS:
+                mask &= RANGE_OPERATORS[op](column, value)
+            elif op == "$eq":
+                mask &= column == value
+            elif op == "$ne":
+                mask &= column != value
+            elif op == "$in":
+                mask &= np.isin(column, value)
+            elif op == "$nin":
+                mask &= ~np.isin(column, value)
+            else:
+                return None
+        return mask
+
+
+def range_condition(selected, bounds=None):
+    """{"$gte", "$lte"} for a (low, high) range.
+
+    With slider ``bounds``, ends left at the slider limits stay open.
+    """
+    if not selected:
+        return None
+    low, high = selected
+    condition = {}
+    if bounds is None or low > bounds[0]:
+        condition["$gte"] = low
+    if bounds is None or high < bounds[1]:
+        condition["$lte"] = high
+    return condition or None
+
+
+def build_filter(**conditions):
+    """Metadata filter from field conditions, dropping the unset ones"""
+    return {field: value for field, value in conditions.items() if value is not None}
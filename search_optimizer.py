@@ -2,14 +2,17 @@ import os
 import json
 import duckdb
 from dotenv import load_dotenv
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
 from langchain.retrievers import ContextualCompressionRetriever
 from langchain.retrievers.document_compressors import LLMChainExtractor
 
 from langchain_openai import ChatOpenAI
 import streamlit as st
 
+from embedding_backend import EMBEDDING_BACKENDS, get_embeddings
+from hybrid_search import HybridRetriever
+from search_filters import build_filter, range_condition
+from vector_index import load_vectorstore
+
 # Load environment variables
 # Load environment variables with Gitpod fallback
 if os.getenv("IN_GITPOD") == "true":
@@ -20,10 +23,12 @@ openai_api_key = os.getenv("OPENAI_API_KEY")
 
 
 class SearchOptimizer:
-    def __init__(self):
+    def __init__(self, embedding_backend=None):
         self.conn = duckdb.connect("lego_data.duckdb")
-        self.embeddings = OpenAIEmbeddings(openai_api_key=openai_api_key)
-        self.vectorstore = FAISS.load_local("./faiss_index", self.embeddings)
+        self.embeddings = get_embeddings(
+            openai_api_key, embedding_backend, conn=self.conn
+        )
+        self.vectorstore = load_vectorstore(self.embeddings, conn=self.conn)
 
     def test_search_parameters(
         self, query, k_values=[3, 5, 10], similarity_thresholds=[0.7, 0.8, 0.9]
@@ -33,13 +38,15 @@ class SearchOptimizer:
 
         for k in k_values:
             for threshold in similarity_thresholds:
-                docs = self.vectorstore.similarity_search_with_score(query, k=k)
-                # Filter by similarity threshold
-                filtered_docs = [doc for doc, score in docs if score > threshold]
+                # Scores are cosine similarities; only sets above the
+                # threshold come back
+                docs = self.vectorstore.similarity_search_with_score(
+                    query, k=k, score_threshold=threshold
+                )
 
                 results[f"k={k}, threshold={threshold}"] = {
-                    "docs": filtered_docs,
-                    "count": len(filtered_docs),
+                    "docs": [doc for doc, _ in docs],
+                    "count": len(docs),
                     "avg_score": (
                         sum(score for _, score in docs) / len(docs) if docs else 0
                     ),
@@ -47,8 +54,12 @@ class SearchOptimizer:
 
         return results
 
-    def create_enhanced_retriever(self, search_type="hybrid"):
-        """Create enhanced retriever with different strategies"""
+    def create_enhanced_retriever(self, search_type="hybrid", **filters):
+        """Create enhanced retriever with different strategies.
+
+        ``filters`` (theme, year_range, pieces_range, price_range) apply to
+        the "filtered" strategy.
+        """
 
         if search_type == "hybrid":
             # Combine semantic and keyword search
@@ -58,18 +69,17 @@ class SearchOptimizer:
             return self._create_contextual_retriever()
         elif search_type == "filtered":
             # Use filtered search
-            return self._create_filtered_retriever()
+            return self._create_filtered_retriever(**filters)
         else:
             return self.vectorstore.as_retriever()
 
     def _create_hybrid_retriever(self):
-        """Create hybrid semantic + keyword retriever"""
-        # This would combine FAISS with traditional keyword search
-        # For now, return enhanced FAISS retriever
-        return self.vectorstore.as_retriever(
-            search_type="similarity_score_threshold",
-            search_kwargs={"k": 10, "score_threshold": 0.8},
-        )
+        """Create hybrid semantic + keyword retriever.
+
+        Vector and BM25 results are merged by reciprocal rank fusion (see
+        hybrid_search); indexes saved without a BM25 index search vectors only.
+        """
+        return HybridRetriever(vectorstore=self.vectorstore, k=10)
 
     def _create_contextual_retriever(self):
         """Create contextual compression retriever"""
@@ -81,10 +91,23 @@ class SearchOptimizer:
             base_compressor=compressor, base_retriever=base_retriever
         )
 
-    def _create_filtered_retriever(self):
-        """Create filtered retriever"""
-        # This would allow filtering by theme, year, pieces, etc.
-        return self.vectorstore.as_retriever(search_kwargs={"k": 10, "filter": {}})
+    def _create_filtered_retriever(
+        self, theme=None, year_range=None, pieces_range=None, price_range=None
+    ):
+        """Create a retriever restricted to sets matching the metadata filters.
+
+        Ranges are inclusive (low, high) tuples. The filter is applied
+        before the vector search, so k matching sets come back.
+        """
+        search_filter = build_filter(
+            theme=theme,
+            year=range_condition(year_range),
+            pieces=range_condition(pieces_range),
+            price=range_condition(price_range),
+        )
+        return self.vectorstore.as_retriever(
+            search_kwargs={"k": 10, "filter": search_filter or None}
+        )
 
     def optimize_for_query_type(self, query):
         """Optimize search based on query type"""
@@ -118,9 +141,13 @@ class SearchOptimizer:
             return self._optimize_general_search(query)
 
     def _optimize_theme_search(self, query):
-        """Optimize for theme-specific searches"""
+        """Optimize for theme-specific searches.
+
+        On a sharded index (FAISS_SHARD_BY) only the shards the query
+        routes to are searched; otherwise the whole index is.
+        """
         return self.vectorstore.as_retriever(
-            search_kwargs={"k": 15, "score_threshold": 0.7}
+            search_kwargs={"k": 15, "score_threshold": 0.7, "routed": True}
         )
 
     def _optimize_size_search(self, query):
@@ -193,7 +220,17 @@ def main():
     """Main function for search optimization"""
     st.title("🔍 Search Optimization Tool")
 
-    optimizer = SearchOptimizer()
+    default_backend = os.getenv("EMBEDDING_BACKEND", "openai")
+    backend = st.sidebar.selectbox(
+        "Embeddings",
+        EMBEDDING_BACKENDS,
+        index=EMBEDDING_BACKENDS.index(default_backend),
+    )
+    try:
+        optimizer = SearchOptimizer(embedding_backend=backend)
+    except ValueError as e:
+        st.error(f"❌ {e}")
+        st.stop()
 
     # Test queries
     test_queries = [
@@ -0,0 +1,515 @@
+#!/usr/bin/env python3
+"""
+🛰️ Search Service
+Headless HTTP API for search, question answering and set lookup over the
+served index snapshot, its copy of lego_sets, the answer cache and LLM.
+Handlers are async (aiohttp); embedding, FAISS, DuckDB and LLM calls run
+in a thread pool, so one worker serves many requests at once. With
+--workers N, N processes share the port (SO_REUSEPORT) and memory-map the
+same index files. Workers never hold lego_data.duckdb open, so loaders
+can reindex while the service runs. The Streamlit app is a client of
+this service.
+
+Endpoints:
+  GET  /health               index snapshot, answer cache stats
+  POST /search               {"query", "k", "filter", "threshold"}
+  POST /qa                   same plus "regenerate" and "stream"; streamed
+                             answers are NDJSON: sources first, then tokens
+  GET  /sets/{id}            one set by lego_sets id
+  GET  /sets?set_number=...  sets by LEGO set number
+
+Usage: python search_service.py [--port 8000] [--workers 2]
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from aiohttp import web
+from dotenv import load_dotenv
+
+from answer_cache import AnswerCache, answer_scope
+from answer_stream import AnswerStream
+from docstore import DuckDBDocstore
+from embedding_backend import embedding_model_name, get_embeddings
+from hybrid_search import hybrid_search, hybrid_search_batch
+from index_snapshots import LiveIndex
+from search_filters import validate_filter
+from vector_index import INDEX_PATH, load_vectorstore
+
+# Same environment as the app, with the Gitpod fallback
+if os.getenv("IN_GITPOD") == "true":
+    load_dotenv(".env.gitpod")
+else:
+    load_dotenv(".env")
+
+SERVICE_THREADS = int(os.getenv("SEARCH_SERVICE_THREADS", "8"))
+
+# Retrieved sets the LLM answers from
+QA_CONTEXT_K = 4
+# Largest number of results one request may ask for
+MAX_K = 100
+LLM_MODEL = "gpt-4"
+
+
+def elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 3)
+
+
+def get_answer_cache():
+    """The shared answer cache, or None if it is unavailable"""
+    try:
+        return AnswerCache()
+    except Exception as e:
+        print(f"⚠️  Answer cache unavailable, answering without cache: {e}")
+        return None
+
+
+def document_json(doc, score=None, similarity=None):
+    """A retrieved Document as JSON-ready data"""
+    return {
+        "id": doc.metadata.get("id", doc.id),
+        "content": doc.page_content,
+        "metadata": doc.metadata,
+        "score": None if score is None else float(score),
+        "similarity": None if similarity is None else float(similarity),
+    }
+
+
+def _json_default(value):
+    # lego_sets prices are DECIMAL
+    return float(value) if isinstance(value, Decimal) else str(value)
+
+
+json_dumps = functools.partial(json.dumps, default=_json_default)
+
+
+class SearchService:
+    """Retrieval and question answering over the current index snapshot.
+
+    One retrieval per query feeds both the answer and the sources; answers
+    come from the answer cache when the same or a near-identical question
+    was answered on the same snapshot and filters.
+    """
+
+    def __init__(self, embeddings=None, llm=None, index_path=INDEX_PATH):
+        self.embeddings = embeddings or get_embeddings()
+        # Each snapshot reads documents from its own docs.parquet
+        self.live_index = LiveIndex(
+            lambda path: load_vectorstore(self.embeddings, path), index_path
+        )
+        self.answer_cache = get_answer_cache()
+        self.llm = llm
+        self._qa_chain = None
+
+    @property
+    def docstore(self):
+        """The current snapshot's docstore.
+
+        Indexes saved before snapshots carried one read lego_data.duckdb,
+        opened read-only per call.
+        """
+        docstore = self.live_index.current.docstore
+        return docstore if isinstance(docstore, DuckDBDocstore) else DuckDBDocstore()
+
+    @property
+    def qa_chain(self):
+        """Stuff QA chain, created on first use so search works without an LLM key"""
+        if self._qa_chain is None:
+            from langchain.chains.question_answering import load_qa_chain
+            from langchain_openai import ChatOpenAI
+
+            llm = self.llm or ChatOpenAI(model_name=LLM_MODEL)
+            self._qa_chain = load_qa_chain(llm, chain_type="stuff")
+        return self._qa_chain
+
+    def retrieve(self, query, k=5, filter=None, embedding=None):
+        """One retrieval for ``query`` on the current snapshot, as a dict.
+
+        Holds the snapshot version and vectorstore it ran on, the query
+        embedding, the (Document, fused score, similarity) results (at
+        least QA_CONTEXT_K of them) and stage timings.
+        """
+        version, vectorstore = self.live_index.state
+        timings = {}
+        if embedding is None:
+            start = time.perf_counter()
+            embedding = vectorstore.embedding_function.embed_query(query)
+            timings["embed_ms"] = elapsed_ms(start)
+        start = time.perf_counter()
+        results = hybrid_search(
+            vectorstore,
+            query,
+            k=max(k, QA_CONTEXT_K),
+            filter=filter or None,
+            embedding=embedding,
+        )
+        timings["search_ms"] = elapsed_ms(start)
+        return {
+            "query": query,
+            "k": k,
+            "filter": filter or None,
+            "version": version,
+            "vectorstore": vectorstore,
+            "embedding": embedding,
+            "results": results,
+            "timings": timings,
+        }
+
+    def retrieve_batch(self, queries, k=5, filter=None):
+        """retrieve for many queries sharing ``k`` and ``filter``.
+
+        The queries are embedded in one call and searched with one index
+        search; each retrieval's timings are the batch's divided evenly
+        among its queries.
+        """
+        version, vectorstore = self.live_index.state
+        start = time.perf_counter()
+        embeddings = vectorstore.embedding_function.embed_documents(queries)
+        embed_ms = elapsed_ms(start)
+        start = time.perf_counter()
+        batch = hybrid_search_batch(
+            vectorstore,
+            queries,
+            embeddings,
+            k=max(k, QA_CONTEXT_K),
+            filter=filter or None,
+        )
+        search_ms = elapsed_ms(start)
+        timings = {
+            "embed_ms": round(embed_ms / len(queries), 3),
+            "search_ms": round(search_ms / len(queries), 3),
+        }
+        return [
+            {
+                "query": query,
+                "k": k,
+                "filter": filter or None,
+                "version": version,
+                "vectorstore": vectorstore,
+                "embedding": embedding,
+                "results": results,
+                "timings": dict(timings),
+            }
+            for query, embedding, results in zip(queries, embeddings, batch)
+        ]
+
+    def sources(self, retrieval, threshold=None):
+        """The top k retrieved sets as JSON, only those over ``threshold`` if given.
+
+        A threshold reruns the retrieval's search on its snapshot with the
+        threshold applied before fusion (see hybrid_search), reusing its
+        embedding. The answer context is never thresholded.
+        """
+        results = retrieval["results"]
+        if threshold is not None:
+            start = time.perf_counter()
+            results = hybrid_search(
+                retrieval["vectorstore"],
+                retrieval["query"],
+                k=retrieval["k"],
+                filter=retrieval["filter"],
+                embedding=retrieval["embedding"],
+                score_threshold=threshold,
+            )
+            retrieval["timings"]["threshold_search_ms"] = elapsed_ms(start)
+        return [
+            document_json(doc, score, similarity)
+            for doc, score, similarity in results[: retrieval["k"]]
+        ]
+
+    def _scope(self, retrieval):
+        embeddings = retrieval["vectorstore"].embedding_function
+        return answer_scope(
+            retrieval["version"],
+            retrieval["filter"],
+            llm=LLM_MODEL,
+            embeddings=embedding_model_name(embeddings),
+            context_k=QA_CONTEXT_K,
+        )
+
+    def cached_answer(self, retrieval):
+        """Cached answer for a retrieval's question (see AnswerCache.get), or None"""
+        if self.answer_cache is None:
+            return None
+        start = time.perf_counter()
+        cached = self.answer_cache.get(
+            retrieval["query"], self._scope(retrieval), retrieval["embedding"]
+        )
+        retrieval["timings"]["cache_ms"] = elapsed_ms(start)
+        return cached
+
+    def stream_answer(self, retrieval):
+        """Start generating the answer from the best retrieved sets"""
+        context = [doc for doc, _, _ in retrieval["results"][:QA_CONTEXT_K]]
+        return AnswerStream(self.qa_chain, context, retrieval["query"])
+
+    def remember_answer(self, retrieval, answer):
+        if self.answer_cache is not None and answer:
+            self.answer_cache.put(
+                retrieval["query"],
+                self._scope(retrieval),
+                answer,
+                retrieval["embedding"],
+                retrieval["version"],
+            )
+
+    def answer_retrieval(self, retrieval, threshold=None, regenerate=False):
+        """Answer a retrieval's question with its cache match, sources and timings"""
+        cached = None if regenerate else self.cached_answer(retrieval)
+        if cached is not None:
+            answer = cached["answer"]
+        else:
+            start = time.perf_counter()
+            stream = self.stream_answer(retrieval)
+            answer = "".join(stream)
+            retrieval["timings"]["llm_ms"] = elapsed_ms(start)
+            self.remember_answer(retrieval, answer)
+        return {
+            "answer": answer,
+            "cached": cached,
+            "index_version": retrieval["version"],
+            "sources": self.sources(retrieval, threshold),
+            "timings": retrieval["timings"],
+        }
+
+    def answer(self, query, k=5, filter=None, threshold=None, regenerate=False):
+        """Answer ``query``; see answer_retrieval"""
+        return self.answer_retrieval(
+            self.retrieve(query, k, filter), threshold, regenerate
+        )
+
+    def get_set(self, set_id):
+        """One set by lego_sets id as JSON, or None"""
+        doc = self.docstore.mget([set_id]).get(set_id)
+        return None if doc is None else document_json(doc)
+
+    def find_sets(self, set_number):
+        """Sets with a LEGO set number, as JSON"""
+        return [document_json(doc) for doc in self.docstore.find(set_number)]
+
+    def health(self):
+        entries, hits = (
+            self.answer_cache.stats() if self.answer_cache is not None else (0, 0)
+        )
+        return {
+            "status": "ok",
+            "pid": os.getpid(),
+            "index_version": self.live_index.version,
+            "answer_cache": {"entries": entries, "hits": hits},
+        }
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call in the worker's thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+
+def json_response(data, status=200):
+    return web.json_response(data, status=status, dumps=json_dumps)
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+async def read_query(request):
+    """Search parameters from a JSON request body; invalid ones are a 400"""
+    try:
+        body = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text="Request body must be JSON")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text="Request body must be a JSON object")
+    query = str(body.get("query") or "").strip()
+    if not query:
+        raise web.HTTPBadRequest(text="'query' is required")
+    k = body.get("k", 5)
+    if not isinstance(k, int) or isinstance(k, bool) or not 1 <= k <= MAX_K:
+        raise web.HTTPBadRequest(text=f"'k' must be an integer from 1 to {MAX_K}")
+    threshold = body.get("threshold")
+    if threshold is not None and not (
+        is_number(threshold) and math.isfinite(threshold)
+    ):
+        raise web.HTTPBadRequest(text="'threshold' must be a number")
+    filter = body.get("filter") or None
+    if filter is not None:
+        try:
+            validate_filter(filter)
+        except ValueError as e:
+            raise web.HTTPBadRequest(text=f"Invalid 'filter': {e}")
+    return {
+        "query": query,
+        "k": k,
+        "filter": filter,
+        "threshold": None if threshold is None else float(threshold),
+        "regenerate": bool(body.get("regenerate", False)),
+        "stream": bool(body.get("stream", False)),
+    }
+
+
+async def health(request):
+    return json_response(await run_blocking(request.app["service"].health))
+
+
+async def search(request):
+    service = request.app["service"]
+    params = await read_query(request)
+    retrieval = await run_blocking(
+        service.retrieve, params["query"], params["k"], params["filter"]
+    )
+    return json_response(
+        {
+            "index_version": retrieval["version"],
+            "results": service.sources(retrieval, params["threshold"]),
+            "timings": retrieval["timings"],
+        }
+    )
+
+
+async def qa(request):
+    service = request.app["service"]
+    params = await read_query(request)
+    if not params["stream"]:
+        result = await run_blocking(
+            service.answer,
+            params["query"],
+            params["k"],
+            params["filter"],
+            params["threshold"],
+            params["regenerate"],
+        )
+        return json_response(result)
+
+    retrieval = await run_blocking(
+        service.retrieve, params["query"], params["k"], params["filter"]
+    )
+    cached = None
+    if not params["regenerate"]:
+        cached = await run_blocking(service.cached_answer, retrieval)
+
+    response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+    await response.prepare(request)
+
+    async def send(event):
+        await response.write((json_dumps(event) + "\n").encode("utf-8"))
+
+    # Sources go out as soon as retrieval is done, before any LLM output
+    await send(
+        {
+            "type": "sources",
+            "index_version": retrieval["version"],
+            "sources": service.sources(retrieval, params["threshold"]),
+            "cached": cached,
+            "timings": dict(retrieval["timings"]),
+        }
+    )
+    try:
+        if cached is None:
+            start = time.perf_counter()
+            stream = service.stream_answer(retrieval)
+            chunks = iter(stream)
+            while (text := await run_blocking(next, chunks, None)) is not None:
+                retrieval["timings"].setdefault("first_token_ms", elapsed_ms(start))
+                await send({"type": "token", "text": text})
+            retrieval["timings"]["llm_ms"] = elapsed_ms(start)
+            await run_blocking(service.remember_answer, retrieval, stream.text)
+        await send({"type": "done", "timings": retrieval["timings"]})
+    except Exception as e:
+        await send({"type": "error", "error": str(e)})
+    await response.write_eof()
+    return response
+
+
+async def get_set(request):
+    result = await run_blocking(
+        request.app["service"].get_set, request.match_info["set_id"]
+    )
+    if result is None:
+        raise web.HTTPNotFound(text=f"Set {request.match_info['set_id']} not found")
+    return json_response(result)
+
+
+async def find_sets(request):
+    set_number = request.query.get("set_number")
+    if not set_number:
+        raise web.HTTPBadRequest(text="'set_number' is required")
+    sets = await run_blocking(request.app["service"].find_sets, set_number)
+    return json_response({"sets": sets})
+
+
+def create_app(service=None, threads=SERVICE_THREADS):
+    """The aiohttp application; the service is created on startup unless given"""
+    app = web.Application()
+
+    async def start(app):
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=threads, thread_name_prefix="service")
+        )
+        app["service"] = service or await run_blocking(SearchService)
+
+    async def stop(app):
+        app["service"].live_index.stop()
+
+    app.on_startup.append(start)
+    app.on_cleanup.append(stop)
+    app.add_routes(
+        [
+            web.get("/health", health),
+            web.post("/search", search),
+            web.post("/qa", qa),
+            web.get("/sets/{set_id}", get_set),
+            web.get("/sets", find_sets),
+        ]
+    )
+    return app
+
+
+def serve(host, port, threads):
+    """Run one worker process"""
+    print(f"🛰️ Search service worker {os.getpid()} on http://{host}:{port}")
+    web.run_app(
+        create_app(threads=threads), host=host, port=port, reuse_port=True, print=None
+    )
+
+
+def main():
+    """Start the search service"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers", type=int, default=1, help="processes sharing the port"
+    )
+    parser.add_argument(
+        "--threads", type=int, default=SERVICE_THREADS, help="per worker"
+    )
+    args = parser.parse_args()
+
+    if args.workers == 1:
+        serve(args.host, args.port, args.threads)
+        return
+    workers = [
+        multiprocessing.Process(target=serve, args=(args.host, args.port, args.threads))
+        for _ in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+
+
+if __name__ == "__main__":
+    main()
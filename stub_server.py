@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+🧪 Local Stub API Server
+Serves Rebrickable- and Brickset-shaped responses with a configurable delay
+so the loaders can be exercised and benchmarked without network access.
+A share of requests can be answered with 429 + Retry-After to exercise the
+client's rate limiting and retries.
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+STUB_THEMES = {
+    "Technic": 1,
+    "Creator": 22,
+    "City": 52,
+    "Star Wars": 158,
+    "Harry Potter": 246,
+    "Architecture": 252,
+    "Ninjago": 435,
+    "Friends": 494,
+    "Ideas": 576,
+    "Minecraft": 577,
+    "Speed Champions": 601,
+    "Disney": 608,
+    "DC Comics Super Heroes": 695,
+    "Marvel Super Heroes": 696,
+    "Creator Expert": 673,
+}
+
+
+def make_rebrickable_set(theme_id, index):
+    """Build a fake Rebrickable set record"""
+    set_num = f"{theme_id:03d}{index:04d}-1"
+    return {
+        "set_num": set_num,
+        "name": f"Stub Set {set_num}",
+        "year": 2000 + index % 25,
+        "theme_id": theme_id,
+        "num_parts": 50 + (index * 37) % 4000,
+        "last_modified_dt": "2024-01-01T00:00:00Z",
+    }
+
+
+def make_brickset_set(key, index):
+    """Build a fake Brickset set record"""
+    return {
+        "setID": index,
+        "number": f"{sum(map(ord, str(key))) % 900 + 100}{index:02d}",
+        "numberVariant": 1,
+        "name": f"Stub {key} Set {index}",
+        "year": 2015 + index % 10,
+        "theme": str(key),
+        "pieces": 100 + index * 13,
+    }
+
+
+STUB_USER_HASH = "stub-user-hash"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Route stub API requests by path prefix"""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            with self.server.stats_lock:
+                self.server.not_modified_count += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 200:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_throttled(self):
+        body = json.dumps({"detail": "Request was throttled."}).encode()
+        self.send_response(429)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if self.server.retry_after is not None:
+            self.send_header("Retry-After", str(self.server.retry_after))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        with server.stats_lock:
+            server.request_count += 1
+            throttled = server.rng.random() < server.error_rate
+            if throttled:
+                server.throttled_count += 1
+        time.sleep(server.delay)
+        if throttled:
+            self._send_throttled()
+            return
+
+        parts = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+
+        if parts.path.startswith("/rebrickable/lego/sets"):
+            self._send_json(self._rebrickable_sets(parts.path, query))
+        elif parts.path.startswith("/rebrickable/lego/themes"):
+            themes = [
+                {"id": theme_id, "name": name, "parent_id": None}
+                for name, theme_id in STUB_THEMES.items()
+            ]
+            self._send_json({"count": len(themes), "next": None, "results": themes})
+        elif parts.path == "/brickset/login":
+            with server.stats_lock:
+                server.login_count += 1
+            self._send_json({"status": "success", "hash": STUB_USER_HASH})
+        elif parts.path == "/brickset/getSets":
+            if query.get("userHash") != STUB_USER_HASH:
+                self._send_json({"status": "error", "message": "Invalid user hash."})
+                return
+            params = json.loads(query.get("params", "{}"))
+            key = params.get("year") or params.get("theme") or "all"
+            page_size = int(params.get("pageSize", 20))
+            sets = [make_brickset_set(key, i) for i in range(page_size)]
+            self._send_json({"status": "success", "matches": len(sets), "sets": sets})
+        else:
+            self._send_json({"detail": "Not found."}, status=404)
+
+    def _rebrickable_sets(self, path, query):
+        """Paginated Rebrickable /lego/sets/ response"""
+        theme_id = int(query.get("theme_id", 0))
+        page = int(query.get("page", 1))
+        page_size = int(query.get("page_size", 100))
+        total = self.server.sets_per_theme
+
+        start = (page - 1) * page_size
+        end = min(start + page_size, total)
+        results = [make_rebrickable_set(theme_id, i) for i in range(start, end)]
+
+        next_url = None
+        if end < total:
+            next_query = dict(query, page=page + 1)
+            next_qs = "&".join(f"{k}={v}" for k, v in next_query.items())
+            next_url = f"http://{self.headers['Host']}{path}?{next_qs}"
+
+        return {"count": total, "next": next_url, "previous": None, "results": results}
+
+
+class StubServer:
+    """Run the stub API on a background thread (usable as a context manager)"""
+
+    def __init__(
+        self,
+        delay=0.1,
+        sets_per_theme=100,
+        port=0,
+        error_rate=0.0,
+        retry_after=1,
+        seed=0,
+    ):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.delay = delay
+        self.httpd.sets_per_theme = sets_per_theme
+        self.httpd.error_rate = error_rate
+        self.httpd.retry_after = retry_after
+        self.httpd.rng = random.Random(seed)
+        self.httpd.request_count = 0
+        self.httpd.not_modified_count = 0
+        self.httpd.throttled_count = 0
+        self.httpd.login_count = 0
+        self.httpd.stats_lock = threading.Lock()
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def request_count(self):
+        return self.httpd.request_count
+
+    @property
+    def not_modified_count(self):
+        return self.httpd.not_modified_count
+
+    @property
+    def throttled_count(self):
+        return self.httpd.throttled_count
+
+    @property
+    def login_count(self):
+        return self.httpd.login_count
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == "__main__":
+    with StubServer(delay=0.1) as stub:
+        print(f"🧪 Stub API listening on {stub.base_url} (Ctrl+C to stop)")
+        print(f"   REBRICKABLE_API_URL={stub.base_url}/rebrickable")
+        print(f"   BRICKSET_API_URL={stub.base_url}/brickset")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
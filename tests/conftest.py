@@ -0,0 +1,55 @@
+import duckdb
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from benchmark_upsert import SCHEMA
+from db_writer import upsert_lego_data
+from index_builder import sync_faiss_index
+from vector_index import load_vectorstore
+
+
+def lego_row(i, **overrides):
+    """A lego_data row for set ``1000 + i``"""
+    row = {
+        "id": f"rebrickable_{1000 + i}-1",
+        "source": "rebrickable",
+        "name": f"Set {i}",
+        "details": '{"set_num": "%d-1"}' % (1000 + i),
+        "set_number": f"{1000 + i}-1",
+        "year": 2000 + i,
+        "theme": "City" if i % 2 else "Star Wars",
+        "pieces": 100 + i,
+        "minifigures": None,
+        "price": 9.99 + i,
+        "rating": None,
+    }
+    row.update(overrides)
+    return row
+
+
+@pytest.fixture
+def conn():
+    conn = duckdb.connect()
+    conn.execute(SCHEMA)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def catalog(conn):
+    """lego_data with 20 sets, alternating City and Star Wars"""
+    upsert_lego_data(conn, [lego_row(i) for i in range(20)])
+    return conn
+
+
+@pytest.fixture
+def embeddings():
+    return DeterministicFakeEmbedding(size=16)
+
+
+@pytest.fixture
+def vectorstore(catalog, embeddings, tmp_path):
+    """The served index over ``catalog``"""
+    index_path = str(tmp_path / "faiss_index")
+    sync_faiss_index(catalog, embeddings, index_path=index_path)
+    return load_vectorstore(embeddings, index_path)
@@ -0,0 +1,124 @@
+import json
+
+from canonical import (
+    canonical_id,
+    canonical_set_key,
+    refresh_canonical_sets,
+    upsert_canonical_sets,
+)
+from db_writer import upsert_lego_data
+
+
+def record(source, set_number, **fields):
+    row = {
+        "id": f"{source}_{set_number}",
+        "source": source,
+        "name": "Millennium Falcon",
+        "details": "{}",
+        "set_number": set_number,
+        "year": 2017,
+        "theme": "Star Wars",
+        "pieces": 7541,
+        "minifigures": 8,
+        "price": None,
+        "rating": None,
+    }
+    row.update(fields)
+    return row
+
+
+FALCON = [
+    record("rebrickable", "75192-1", price=799.99),
+    record(
+        "brickset", "75192", price=849.99, rating=4.8, details='{"numberVariant": 1}'
+    ),
+    record("brickset", "75192-2", name="Millennium Falcon (reissue)"),
+]
+
+
+def lego_sets(conn):
+    rows = conn.execute(
+        """
+        SELECT id, canonical_key, name, price, rating, source_ids
+        FROM lego_sets ORDER BY id
+    """
+    ).fetchall()
+    return {
+        key: (set_id, name, price, rating, sorted(source_ids))
+        for set_id, key, name, price, rating, source_ids in rows
+    }
+
+
+def test_canonical_set_key():
+    assert canonical_set_key("75192-1") == canonical_set_key("75192") == "75192"
+    assert canonical_set_key("75192", variant=2) == "75192-2"
+    assert canonical_set_key("arch_001", "Taj  Mahal!", 2021) == "name:taj mahal|2021"
+
+
+def test_source_numbers_merge_and_variants_stay_separate(conn):
+    upsert_lego_data(conn, FALCON)
+    refresh_canonical_sets(conn)
+    sets = lego_sets(conn)
+
+    assert sorted(sets) == ["75192", "75192-2"]
+    set_id, name, _, _, source_ids = sets["75192"]
+    assert set_id == canonical_id("75192")
+    assert name == "Millennium Falcon"
+    assert source_ids == ["brickset_75192", "rebrickable_75192-1"]
+    assert sets["75192-2"][4] == ["brickset_75192-2"]
+
+
+def test_price_and_rating_come_from_brickset(conn):
+    upsert_lego_data(conn, FALCON)
+    refresh_canonical_sets(conn)
+    _, _, price, rating, _ = lego_sets(conn)["75192"]
+    assert float(price) == 849.99
+    assert float(rating) == 4.8
+
+    details = conn.execute(
+        "SELECT details FROM lego_sets WHERE canonical_key = '75192'"
+    ).fetchone()[0]
+    assert json.loads(details)["sources"] == ["rebrickable", "brickset"]
+
+
+def test_renamed_record_leaves_its_old_set(conn):
+    rows = [
+        record("rebrickable", "arch_001", name="Taj Mahal", year=2021),
+        record("brickset", "arch_002", name="Taj Mahal", year=2021),
+    ]
+    upsert_lego_data(conn, rows)
+    upsert_canonical_sets(conn, rows)
+    assert list(lego_sets(conn)) == ["name:taj mahal|2021"]
+
+    renamed = [dict(rows[1], name="Taj Mahal Palace")]
+    upsert_lego_data(conn, renamed)
+    upsert_canonical_sets(conn, renamed)
+    sets = lego_sets(conn)
+    assert sets["name:taj mahal|2021"][4] == ["rebrickable_arch_001"]
+    assert sets["name:taj mahal palace|2021"][4] == ["brickset_arch_002"]
+
+    gone = [dict(rows[0], name="Taj Mahal Palace")]
+    upsert_lego_data(conn, gone)
+    upsert_canonical_sets(conn, gone)
+    assert list(lego_sets(conn)) == ["name:taj mahal palace|2021"]
+
+
+def test_upsert_matches_refresh(conn):
+    batches = [
+        FALCON[:1],
+        [record("brickset", "10497", name="Galaxy Explorer", year=2022, price=99.99)],
+        FALCON[1:],
+        [dict(FALCON[0], name="Millennium Falcon UCS", pieces=7541)],
+    ]
+    for rows in batches:
+        upsert_lego_data(conn, rows)
+        upsert_canonical_sets(conn, rows)
+    query = """
+        SELECT * EXCLUDE (source_ids), list_sort(source_ids)
+        FROM lego_sets ORDER BY id
+    """
+    upserted = conn.execute(query).fetchall()
+
+    refresh_canonical_sets(conn)
+    assert conn.execute(query).fetchall() == upserted
+    assert len(upserted) == 3
@@ -0,0 +1,92 @@
+import email.utils
+import threading
+import time
+
+import pytest
+import requests
+
+from http_retry import (
+    MAX_RETRY_AFTER,
+    backoff_delay,
+    mount_throttled,
+    parse_retry_after,
+)
+from stub_server import StubServer
+
+
+@pytest.fixture
+def stub():
+    with StubServer(delay=0, retry_after=0.2) as stub:
+        yield stub
+
+
+def throttled_session(**adapter_kwargs):
+    session = requests.Session()
+    adapter = mount_throttled(session, **{"rate_limits": [], **adapter_kwargs})
+    return session, adapter
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after("86400") == MAX_RETRY_AFTER
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+    later = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert 25 <= parse_retry_after(later) <= 30
+    earlier = email.utils.formatdate(time.time() - 30, usegmt=True)
+    assert parse_retry_after(earlier) == 0.0
+
+
+def test_backoff_delay_is_capped():
+    assert all(
+        0 <= backoff_delay(attempt, base=0.5, cap=4) <= 4 for attempt in range(10)
+    )
+
+
+def test_retries_honour_retry_after(stub):
+    stub.httpd.error_rate = 1.0
+    http, adapter = throttled_session(retries=2)
+
+    start = time.perf_counter()
+    response = http.get(f"{stub.base_url}/rebrickable/lego/themes/")
+    assert response.status_code == 429
+    assert time.perf_counter() - start >= 0.4
+    assert stub.request_count == 3
+    assert adapter.throttled == adapter.retried == 2
+
+
+def test_throttled_requests_eventually_succeed(stub):
+    stub.httpd.error_rate = 0.3
+    stub.httpd.retry_after = 0.01
+    http, adapter = throttled_session(retries=10)
+
+    for _ in range(10):
+        assert http.get(f"{stub.base_url}/rebrickable/lego/themes/").status_code == 200
+    assert adapter.throttled == stub.throttled_count > 0
+    assert stub.request_count == 10 + stub.throttled_count
+
+
+def test_429_holds_every_request_to_the_host(stub):
+    stub.httpd.error_rate = 1.0
+    http, _ = throttled_session(retries=1)
+    url = f"{stub.base_url}/rebrickable/lego/themes/"
+
+    first = threading.Thread(target=http.get, args=(url,))
+    first.start()
+    while stub.throttled_count == 0:
+        time.sleep(0.005)
+    stub.httpd.error_rate = 0.0
+
+    start = time.perf_counter()
+    assert http.get(url).status_code == 200
+    assert time.perf_counter() - start >= 0.1
+    first.join()
+
+
+def test_rate_limit_spaces_requests(stub):
+    http, _ = throttled_session(rate_limits=[(r"127\.0\.0\.1", 20.0, 1)])
+
+    start = time.perf_counter()
+    for _ in range(5):
+        http.get(f"{stub.base_url}/rebrickable/lego/themes/")
+    assert time.perf_counter() - start >= 0.15
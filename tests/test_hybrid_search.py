@@ -0,0 +1,69 @@
+import numpy as np
+
+from hybrid_search import RRF_K, hybrid_search, reciprocal_rank_fusion
+
+
+def test_rrf_ranks_rows_found_by_one_leg():
+    scores, rows = reciprocal_rank_fusion([[1, 2, 3], [3, 4]])
+    # 3 is in both legs; 2 and 4 tie at rank 2 of one leg, first leg first
+    assert rows.tolist() == [3, 1, 2, 4]
+    both = 1 / (RRF_K + 3) + 1 / (RRF_K + 1)
+    assert np.allclose(
+        scores, [both, 1 / (RRF_K + 1), 1 / (RRF_K + 2), 1 / (RRF_K + 2)]
+    )
+
+    _, rows = reciprocal_rank_fusion([[], [7, 8]])
+    assert rows.tolist() == [7, 8]
+    scores, rows = reciprocal_rank_fusion([[], []])
+    assert len(scores) == len(rows) == 0
+
+
+def test_fusion_keeps_rows_found_by_one_leg(vectorstore):
+    query = "Set 17"
+    embedding = vectorstore.embedding_function.embed_query(query)
+    vector_scores, vector_rows, _ = vectorstore.search_rows(embedding, 4, fetch_k=4)
+    _, lexical_rows = vectorstore.lexical.search(query, 4)
+    lexical_only = [row for row in lexical_rows if row not in vector_rows]
+    assert lexical_only
+
+    _, fused_rows = reciprocal_rank_fusion([vector_rows, lexical_rows])
+    results = hybrid_search(vectorstore, query, k=4, fetch_k=4, embedding=embedding)
+    ids = [doc.metadata["id"] for doc, _, _ in results]
+    assert ids == [vectorstore.index_to_docstore_id[row] for row in fused_rows[:4]]
+
+    # A row only BM25 found still reports its similarity to the query
+    row = lexical_rows[0]
+    assert row in lexical_only
+    _, _, similarity = results[ids.index(vectorstore.index_to_docstore_id[row])]
+    assert np.isclose(similarity, vectorstore.score_rows(embedding, [row])[0])
+
+
+def test_set_number_is_pinned_first(vectorstore):
+    results = hybrid_search(vectorstore, "the 1013 set please", k=3)
+    assert results[0][0].metadata["set_number"] == "1013-1"
+
+
+def test_empty_query_is_a_vector_search(vectorstore):
+    embedding = vectorstore.embedding_function.embed_query("")
+    _, rows, _ = vectorstore.search_rows(embedding, 4)
+    results = hybrid_search(vectorstore, "", k=4, embedding=embedding)
+    ids = [doc.metadata["id"] for doc, _, _ in results]
+    assert ids == [vectorstore.index_to_docstore_id[row] for row in rows]
+
+
+def test_threshold_applies_before_fusion(vectorstore):
+    query = "Star Wars Set 4"
+    embedding = vectorstore.embedding_function.embed_query(query)
+    similarities = np.sort(vectorstore.score_rows(embedding, np.arange(20)))[::-1]
+    threshold = float(similarities[7] + similarities[8]) / 2
+
+    results = hybrid_search(
+        vectorstore, query, k=5, embedding=embedding, score_threshold=threshold
+    )
+    assert len(results) == 5
+    assert all(similarity > threshold for _, _, similarity in results)
+
+    results = hybrid_search(
+        vectorstore, query, k=20, embedding=embedding, score_threshold=threshold
+    )
+    assert len(results) == 8
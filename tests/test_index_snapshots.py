@@ -0,0 +1,55 @@
+import os
+
+from index_builder import sync_faiss_index
+from index_snapshots import (
+    CURRENT_FILE,
+    KEEP_SNAPSHOTS,
+    SNAPSHOTS_DIR,
+    current_version,
+    snapshot_path,
+)
+from vector_index import load_vectorstore
+
+
+def reprice(conn, embeddings, index_path, price):
+    """Publish a catalog-only snapshot by changing one price"""
+    conn.execute("UPDATE lego_data SET price = ? WHERE set_number = '1003-1'", [price])
+    sync_faiss_index(conn, embeddings, index_path=index_path)
+    return current_version(index_path)
+
+
+def test_loaded_store_survives_pruning(catalog, embeddings, tmp_path):
+    index_path = str(tmp_path / "faiss_index")
+    sync_faiss_index(catalog, embeddings, index_path=index_path)
+    loaded_version = current_version(index_path)
+    store = load_vectorstore(embeddings, index_path)
+
+    for price in range(KEEP_SNAPSHOTS + 1):
+        reprice(catalog, embeddings, index_path, price)
+    assert not os.path.exists(snapshot_path(index_path, loaded_version))
+
+    results = store.similarity_search_with_score("Set 3", k=3)
+    assert len(results) == 3
+    assert store.docstore.find("1003-1")[0].metadata["name"] == "Set 3"
+
+
+def test_first_publish_removes_only_legacy_files(catalog, embeddings, tmp_path):
+    index_path = tmp_path / "faiss_index"
+    index_path.mkdir()
+    for name in [
+        "index.faiss",
+        "index.pkl",
+        "docs.npy",
+        "README",
+        f"{CURRENT_FILE}.other",
+    ]:
+        (index_path / name).write_text("old")
+
+    sync_faiss_index(catalog, embeddings, index_path=str(index_path))
+    assert sorted(os.listdir(index_path)) == sorted(
+        [CURRENT_FILE, SNAPSHOTS_DIR, "README", f"{CURRENT_FILE}.other"]
+    )
+
+    (index_path / "index.pkl").write_text("restored by git checkout")
+    reprice(catalog, embeddings, str(index_path), 1)
+    assert (index_path / "index.pkl").exists()
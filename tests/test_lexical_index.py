@@ -0,0 +1,63 @@
+from collections import Counter
+
+import numpy as np
+
+from lexical_index import BM25Index, tokenize
+
+TEXTS = [
+    "Millennium Falcon 75192 Star Wars",
+    "X-Wing Starfighter 75355 Star Wars",
+    "Fire Station 60320 City",
+    "Police Station 60316 City police",
+    "",
+]
+
+
+def test_tokenize():
+    assert tokenize("UCS Falcon 75192-1!") == ["ucs", "falcon", "75192", "1"]
+    assert tokenize(None) == []
+
+
+def test_postings_are_csr():
+    index = BM25Index.build(TEXTS)
+    assert index.offsets[0] == 0 and index.offsets[-1] == len(index.rows)
+    assert (np.diff(index.offsets) > 0).all()
+    for token, term in index.terms.items():
+        start, end = index.offsets[term], index.offsets[term + 1]
+        rows = index.rows[start:end]
+        assert (np.diff(rows) > 0).all()
+        expected = [Counter(tokenize(text))[token] for text in TEXTS]
+        assert [expected[row] for row in rows] == index.freqs[start:end].tolist()
+        assert sum(count > 0 for count in expected) == len(rows)
+    assert index.lengths.tolist() == [len(tokenize(text)) for text in TEXTS]
+
+
+def test_save_and_load(tmp_path):
+    index = BM25Index.build(TEXTS)
+    index.save(tmp_path)
+    loaded = BM25Index.load(tmp_path)
+    for query in ["star wars", "police station", "75192"]:
+        expected, actual = index.search(query, 3), loaded.search(query, 3)
+        assert actual[1].tolist() == expected[1].tolist()
+        assert np.allclose(actual[0], expected[0])
+    assert BM25Index.load(tmp_path / "missing") is None
+
+
+def test_search():
+    index = BM25Index.build(TEXTS)
+    scores, rows = index.search("police station", 10)
+    assert rows.tolist() == [3, 2]
+    assert scores[0] > scores[1] > 0
+    assert index.search("falcon", 10)[1].tolist() == [0]
+    assert index.rows_with("75192").tolist() == [0]
+
+    mask = np.array([True, True, True, False, True])
+    assert index.search("police station", 10, mask)[1].tolist() == [2]
+
+
+def test_empty_and_unknown_queries():
+    index = BM25Index.build(TEXTS)
+    for query in ["", "   ", "?!", "technic"]:
+        scores, rows = index.search(query, 5)
+        assert len(scores) == len(rows) == 0
+    assert len(index.rows_with("technic")) == 0
@@ -0,0 +1,86 @@
+import itertools
+import threading
+import time
+
+import pytest
+
+from pipeline import Pipeline
+
+
+def test_batches_flow_through_every_stage_in_order():
+    seen = []
+    stages = [
+        ("double", lambda batch: [x * 2 for x in batch]),
+        ("odd", lambda batch: batch if batch[0] % 4 else None),
+        ("sink", seen.append),
+    ]
+    stats = Pipeline("source", ([i] for i in range(10)), stages).run()
+
+    assert seen == [[2], [6], [10], [14], [18]]
+    assert [s.batches for s in stats] == [10, 10, 10, 5]
+
+
+def test_stage_error_is_raised_from_run():
+    def fail(batch):
+        if batch == [3]:
+            raise ValueError("bad batch")
+        return batch
+
+    seen = []
+    pipeline = Pipeline(
+        "source", ([i] for i in range(10)), [("fail", fail), ("sink", seen.append)]
+    )
+    with pytest.raises(ValueError, match="bad batch"):
+        pipeline.run()
+    assert [3] not in seen and [9] not in seen
+
+
+def test_source_error_is_raised_from_run():
+    def source():
+        yield [1]
+        raise ConnectionError("API down")
+
+    with pytest.raises(ConnectionError):
+        Pipeline("source", source(), [("sink", lambda batch: None)]).run()
+
+
+def test_failure_cancels_an_endless_source():
+    closed = threading.Event()
+    produced = itertools.count()
+
+    def source():
+        try:
+            while True:
+                yield [next(produced)]
+        finally:
+            closed.set()
+
+    def fail(batch):
+        time.sleep(0.01)
+        raise RuntimeError("stop")
+
+    start = time.perf_counter()
+    with pytest.raises(RuntimeError):
+        Pipeline("source", source(), [("fail", fail)], max_queue=2).run()
+    assert time.perf_counter() - start < 5
+    assert closed.is_set()
+    # Back-pressure: the source never ran far ahead of the failed stage
+    assert next(produced) <= 5
+
+
+def test_slow_stage_bounds_the_queue():
+    produced = []
+    consumed = []
+
+    def source():
+        for i in range(20):
+            produced.append(i)
+            yield [i]
+
+    def slow(batch):
+        time.sleep(0.005)
+        consumed.append(batch[0])
+        assert len(produced) - len(consumed) <= 4
+
+    Pipeline("source", source(), [("slow", slow)], max_queue=2).run()
+    assert consumed == list(range(20))
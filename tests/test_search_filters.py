@@ -0,0 +1,118 @@
+import faiss
+import numpy as np
+import pytest
+
+from index_shards import ShardedIndex, ShardRows
+from search_filters import META_DTYPE, FilterColumns, validate_filter
+from vector_index import exact_search, filtered_search
+
+
+@pytest.fixture
+def columns():
+    meta = np.array(
+        [
+            (0, 2015, 500, 49.99),
+            (1, 2020, 1200, np.nan),
+            (0, 2023, 7541, 849.99),
+            (-1, np.nan, 80, 9.99),
+        ],
+        dtype=META_DTYPE,
+    )
+    return FilterColumns(meta, ["City", "Star Wars"])
+
+
+@pytest.fixture
+def clustered():
+    """800 vectors in 8 separate clusters and an IVF index with a list per cluster"""
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(8, 16)) * 10
+    vectors = (centers[np.arange(800) % 8] + rng.normal(size=(800, 16))).astype(
+        np.float32
+    )
+    index = faiss.IndexIVFFlat(faiss.IndexFlatL2(16), 16, 8)
+    index.train(vectors)
+    index.add(vectors)
+    index.nprobe = 1
+    return vectors, index
+
+
+def test_masks(columns):
+    assert columns.mask({"theme": "City"}).tolist() == [True, False, True, False]
+    assert columns.mask({"theme": "Technic"}).tolist() == [False] * 4
+    assert columns.mask({"year": {"$gte": 2016}, "pieces": {"$lt": 5000}}).tolist() == [
+        False,
+        True,
+        False,
+        False,
+    ]
+    assert columns.mask({"price": {"$lte": 50}}).tolist() == [True, False, False, True]
+    assert columns.mask({"theme": {"$nin": ["City"]}}).tolist() == [
+        False,
+        True,
+        False,
+        True,
+    ]
+    assert columns.mask({"name": "Falcon"}) is None
+
+
+@pytest.mark.parametrize(
+    "filter",
+    [
+        ["City"],
+        {"name": "Falcon"},
+        {"theme": {"$gte": "City"}},
+        {"year": "2015"},
+        {"year": {"$in": 2015}},
+        {"pieces": {"$regex": "1"}},
+        {"price": True},
+    ],
+)
+def test_invalid_filters(filter):
+    with pytest.raises(ValueError):
+        validate_filter(filter)
+
+
+def test_filter_excluding_the_probed_cluster(clustered):
+    vectors, index = clustered
+    _, lists = index.quantizer.search(vectors, 1)
+    query = vectors[:1]
+    mask = lists[:, 0] != lists[0, 0]
+
+    _, labels = filtered_search(index, vectors, query, 5, mask)
+    _, expected = exact_search(vectors, query, 5, np.flatnonzero(mask))
+    assert labels.tolist() == expected.tolist()
+
+
+def test_filter_matching_nothing(clustered):
+    vectors, index = clustered
+    mask = np.zeros(len(vectors), dtype=bool)
+    for candidates in (vectors, None):
+        _, labels = filtered_search(index, candidates, vectors[:2], 5, mask)
+        assert (labels == -1).all()
+
+
+def test_filter_excluding_a_whole_shard(clustered):
+    vectors, _ = clustered
+    shard_rows = [
+        np.flatnonzero(np.arange(800) % 8 < 4),
+        np.flatnonzero(np.arange(800) % 8 >= 4),
+    ]
+    indexes, views = [], []
+    for rows in shard_rows:
+        index = faiss.IndexFlatL2(16)
+        index.add(vectors[rows])
+        indexes.append(index)
+        views.append(ShardRows(vectors, rows))
+    centroids = np.array([vectors[rows].mean(axis=0) for rows in shard_rows])
+    centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+    sharded = ShardedIndex(["low", "high"], indexes, shard_rows, views, centroids)
+
+    query = vectors[0]  # in the first shard
+    mask = np.arange(800) % 8 >= 4
+    assert sharded.route(query, mask) == [1]
+    _, rows = sharded.search(query, 5, mask)
+    _, expected = exact_search(vectors, query[None], 5, np.flatnonzero(mask))
+    assert rows.tolist() == expected[0].tolist()
+
+    _, rows = sharded.search(query, 5, np.zeros(800, dtype=bool))
+    assert len(rows) == 0
@@ -0,0 +1,877 @@
+"""
+🧭 Vector Index Factory
+Builds the FAISS index the app searches: exact Flat, IVF-Flat, HNSW or IVF-PQ,
+chosen by FAISS_INDEX_TYPE or explicit params, with vectors stored as
+float32 or compressed (float16, 8-bit scalar quantisation or PQ codes).
+The exact vectors are saved next to it as vectors.npy, so incremental
+updates and rebuilds never need to re-embed and compressed indexes can
+re-rank their candidates exactly; the build parameters are saved as
+index_params.json so every loader opens the index with the search
+settings it was built for. With the default cosine metric the vectors are
+L2-normalised and searched by inner product, so scores are cosine
+similarities and a similarity threshold is a native FAISS range search.
+Serving loads memory-map the files read-only, so app processes start
+instantly and share one copy in the page cache, and fetch result
+documents from the snapshot's copy of lego_sets (see docstore). Every
+save is a new snapshot published atomically (see index_snapshots).
+"""
+
+import filecmp
+import json
+import math
+import os
+import pickle
+import shutil
+from datetime import datetime, timezone
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.documents import Document
+
+from docstore import (
+    DETAILS_CHARS,
+    DOCS_FILE,
+    DuckDBDocstore,
+    RowIds,
+    load_docs,
+    save_docs,
+    save_docstore,
+)
+from embedding_backend import REMOTE_MODEL, embedding_model_name
+from index_snapshots import (
+    MANIFEST_FILE,
+    link_files,
+    new_snapshot,
+    publish_snapshot,
+    resolve_index_path,
+)
+from lexical_index import BM25Index, read_lexical_texts
+from search_filters import FilterColumns, read_filter_columns, save_filter_columns
+
+INDEX_PATH = "./faiss_index"
+PARAMS_FILE = "index_params.json"
+VECTORS_FILE = "vectors.npy"
+# Pickled docstore written by FAISS.save_local before docs.npy existed
+LEGACY_DOCSTORE_FILE = "index.pkl"
+
+INDEX_TYPES = ["flat", "ivf_flat", "hnsw", "ivf_pq"]
+# Vector codes held in memory; ivf_pq always stores PQ codes
+STORAGE_MODES = ["float32", "fp16", "sq8", "pq"]
+# cosine: unit vectors searched by inner product; l2: raw Euclidean distance
+METRICS = ["cosine", "l2"]
+# Optional partitioning of the serving index (see index_shards)
+SHARD_BY = [None, "theme", "decade", "theme_decade"]
+
+DEFAULT_INDEX_PARAMS = {
+    "type": "flat",
+    "metric": "cosine",
+    "nlist": None,  # IVF lists; None picks 4 * sqrt(n)
+    "nprobe": 16,  # IVF lists visited per query
+    "hnsw_m": 32,  # HNSW graph degree
+    "ef_construction": 80,
+    "ef_search": 64,
+    # PQ sub-quantisers; None picks d / 16 for ivf_pq, d / 4 for storage=pq
+    "pq_m": None,
+    "pq_bits": 8,
+    "storage": "float32",
+    # Candidates per result re-ranked exactly; None is 4 for lossy codes
+    "rerank": None,
+    "shard_by": None,  # extra per-theme/decade shards with query routing
+}
+
+DEFAULT_RERANK = 4
+# How far past a threshold lossy codes are range-searched before exact
+# re-scoring, so rows their approximation underrates are not lost
+RANGE_MARGIN = 0.1
+
+# Below this many vectors an exact scan is already instant
+MIN_ANN_VECTORS = 1000
+# k-means wants ~39 training points per centroid
+TRAIN_POINTS_PER_CENTROID = 39
+
+
+def index_params(**overrides):
+    """Index parameters from defaults, FAISS_* env variables and overrides"""
+    params = dict(DEFAULT_INDEX_PARAMS)
+    params["type"] = os.getenv("FAISS_INDEX_TYPE", params["type"])
+    params["storage"] = os.getenv("FAISS_STORAGE", params["storage"])
+    params["metric"] = os.getenv("FAISS_METRIC", params["metric"])
+    params["shard_by"] = os.getenv("FAISS_SHARD_BY") or params["shard_by"]
+    for key, env in [
+        ("nlist", "FAISS_NLIST"),
+        ("nprobe", "FAISS_NPROBE"),
+        ("hnsw_m", "FAISS_HNSW_M"),
+        ("ef_search", "FAISS_EF_SEARCH"),
+        ("pq_m", "FAISS_PQ_M"),
+        ("rerank", "FAISS_RERANK"),
+    ]:
+        if os.getenv(env):
+            params[key] = int(os.getenv(env))
+    params.update({key: value for key, value in overrides.items() if value is not None})
+    if params["type"] not in INDEX_TYPES:
+        raise ValueError(
+            f"Unknown index type {params['type']!r}, expected one of {INDEX_TYPES}"
+        )
+    if params["storage"] not in STORAGE_MODES:
+        raise ValueError(
+            f"Unknown storage {params['storage']!r}, expected one of {STORAGE_MODES}"
+        )
+    if params["metric"] not in METRICS:
+        raise ValueError(
+            f"Unknown metric {params['metric']!r}, expected one of {METRICS}"
+        )
+    if params["shard_by"] not in SHARD_BY:
+        raise ValueError(
+            f"Unknown shard_by {params['shard_by']!r}, expected one of {SHARD_BY}"
+        )
+    return params
+
+
+def _pq_m(dimension, requested):
+    """Largest sub-quantiser count <= requested that divides the dimension"""
+    m = requested
+    while dimension % m:
+        m -= 1
+    return m
+
+
+def is_lossy(params):
+    """Whether the index stores approximated vectors that need re-ranking"""
+    return params["type"] == "ivf_pq" or params.get("storage", "float32") != "float32"
+
+
+def factory_string(params, count, dimension):
+    """FAISS index_factory description for the params and data size.
+
+    Returns (description, resolved params); small catalogs fall back to
+    simpler types that can actually be trained on them.
+    """
+    resolved = dict(params)
+    index_type = params["type"]
+
+    if index_type != "flat" and count < MIN_ANN_VECTORS:
+        print(f"  {count} vectors: using an exact Flat index instead of {index_type}")
+        index_type = "flat"
+    if (
+        index_type == "ivf_pq"
+        and count < TRAIN_POINTS_PER_CENTROID * 2 ** params["pq_bits"]
+    ):
+        print(f"  {count} vectors are too few to train PQ codes, using ivf_flat")
+        index_type = "ivf_flat"
+
+    resolved["type"] = index_type
+    if index_type.startswith("ivf"):
+        nlist = params["nlist"] or int(4 * math.sqrt(count))
+        resolved["nlist"] = max(1, min(nlist, count // TRAIN_POINTS_PER_CENTROID))
+
+    storage = "pq" if index_type == "ivf_pq" else params.get("storage", "float32")
+    if storage == "pq" and count < TRAIN_POINTS_PER_CENTROID * 2 ** params["pq_bits"]:
+        print(f"  {count} vectors are too few to train PQ codes, storing sq8")
+        storage = "sq8"
+    resolved["storage"] = storage
+    if storage == "pq":
+        default_m = dimension // 16 if index_type == "ivf_pq" else dimension // 4
+        resolved["pq_m"] = _pq_m(dimension, params["pq_m"] or max(1, default_m))
+
+    codes = {
+        "float32": "Flat",
+        "fp16": "SQfp16",
+        "sq8": "SQ8",
+        "pq": f"PQ{resolved.get('pq_m')}x{params['pq_bits']}",
+    }[storage]
+    if index_type == "flat":
+        description = codes
+    elif index_type == "hnsw":
+        # HNSW takes PQ codes as HNSW<M>_PQ<m> (8-bit only)
+        if storage == "pq":
+            description = f"HNSW{params['hnsw_m']}_PQ{resolved['pq_m']}"
+        else:
+            description = f"HNSW{params['hnsw_m']},{codes}"
+    else:
+        description = f"IVF{resolved['nlist']},{codes}"
+
+    resolved["factory"] = description
+    if is_lossy(resolved):
+        resolved["rerank"] = params.get("rerank") or DEFAULT_RERANK
+    return description, resolved
+
+
+def is_cosine(params):
+    """Whether the params (requested or built) search unit vectors by inner product.
+
+    Indexes built before the metric was recorded are L2.
+    """
+    return params.get("metric", "l2") == "cosine"
+
+
+def prepare_vectors(vectors, params):
+    """Contiguous float32 copy of the vectors, L2-normalised for the cosine metric"""
+    vectors = np.array(vectors, dtype=np.float32, order="C")
+    if is_cosine(params):
+        faiss.normalize_L2(vectors)
+    return vectors
+
+
+def build_index(vectors, params=None):
+    """Build and fill an index over the vectors; returns (index, resolved params)"""
+    params = params or index_params()
+    vectors = prepare_vectors(vectors, params)
+    count, dimension = vectors.shape
+
+    description, resolved = factory_string(params, count, dimension)
+    metric = faiss.METRIC_INNER_PRODUCT if is_cosine(params) else faiss.METRIC_L2
+    index = faiss.index_factory(dimension, description, metric)
+    if resolved["type"] == "hnsw":
+        hnsw = faiss.downcast_index(index)
+        hnsw.hnsw.efConstruction = params["ef_construction"]
+        codes = faiss.downcast_index(hnsw.storage)
+    else:
+        codes = faiss.downcast_index(index)
+    if isinstance(codes, faiss.IndexPQ):
+        # Polysemous codes only help Hamming-filtered search and make
+        # training take minutes instead of seconds
+        codes.do_polysemous_training = False
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    apply_search_params(index, resolved)
+    return index, resolved
+
+
+def apply_search_params(index, params):
+    """Set query-time knobs (nprobe, efSearch) on a loaded index"""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(params.get("nprobe") or 1, ivf.nlist)
+    hnsw = getattr(faiss.downcast_index(index), "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = params.get("ef_search") or hnsw.efSearch
+
+
+class ServingIndex:
+    """Read-only index wrapper that scores results the way the index was built.
+
+    For compressed codes the index proposes ``rerank * k`` candidates whose
+    exact scores come from the saved float32 vectors, memory-mapped so
+    only the candidate rows are ever read. For ``cosine`` indexes scores
+    are cosine similarities, even from index types that FAISS always builds
+    as L2 (HNSW over PQ codes). Everything else is delegated to the
+    wrapped FAISS index.
+    """
+
+    def __init__(self, index, vectors, rerank=DEFAULT_RERANK, cosine=False):
+        self.index = index
+        self.vectors = vectors
+        self.rerank = rerank
+        self.cosine = cosine
+        # On unit vectors ||a - b||^2 = 2 - 2 cos(a, b)
+        self.l2_codes = cosine and index.metric_type == faiss.METRIC_L2
+        self.metric_type = faiss.METRIC_INNER_PRODUCT if cosine else index.metric_type
+
+    def __getattr__(self, name):
+        return getattr(self.index, name)
+
+    def _scores(self, distances):
+        """Index distances in the served metric"""
+        return 1 - distances / 2 if self.l2_codes else distances
+
+    def _exact(self, query, ids):
+        """Exact scores of rows ``ids`` (sorted) against one query"""
+        block = np.asarray(self.vectors[ids], dtype=np.float32)
+        if self.metric_type == faiss.METRIC_INNER_PRODUCT:
+            return block @ query
+        return ((block - query) ** 2).sum(axis=1)
+
+    def search(self, queries, k, params=None):
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        if not self.rerank:
+            distances, labels = self.index.search(queries, k, params=params)
+            return self._scores(distances), labels
+        _, candidates = self.index.search(queries, k * self.rerank, params=params)
+
+        ascending = self.metric_type != faiss.METRIC_INNER_PRODUCT
+        distances = np.full(
+            (len(queries), k), np.inf if ascending else -np.inf, dtype=np.float32
+        )
+        labels = np.full((len(queries), k), -1, dtype=np.int64)
+        for row, (query, ids) in enumerate(zip(queries, candidates)):
+            ids = ids[ids >= 0]
+            if not len(ids):
+                continue
+            # Sorted row order keeps reads on the memory map sequential
+            ids = np.sort(ids)
+            exact = self._exact(query, ids)
+            best = np.argsort(exact if ascending else -exact)[:k]
+            distances[row, : len(best)] = exact[best]
+            labels[row, : len(best)] = ids[best]
+        return distances, labels
+
+    def range_search(self, queries, radius, params=None):
+        """faiss range_search in the served metric; returns (lims, scores, labels)"""
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        inner_product = self.metric_type == faiss.METRIC_INNER_PRODUCT
+        search_radius = radius
+        if self.rerank:
+            search_radius += -RANGE_MARGIN if inner_product else RANGE_MARGIN
+        if self.l2_codes:
+            search_radius = 2 - 2 * search_radius
+        lims, distances, labels = self.index.range_search(
+            queries, search_radius, params=params
+        )
+        distances = self._scores(distances)
+        if not self.rerank:
+            return lims, distances, labels
+
+        kept_lims, kept_scores, kept_labels = [0], [], []
+        for i, query in enumerate(queries):
+            ids = np.sort(labels[lims[i] : lims[i + 1]])
+            exact = self._exact(query, ids)
+            keep = exact > radius if inner_product else exact < radius
+            kept_scores.append(exact[keep])
+            kept_labels.append(ids[keep])
+            kept_lims.append(kept_lims[-1] + int(keep.sum()))
+        return (
+            np.array(kept_lims),
+            np.concatenate(kept_scores).astype(np.float32),
+            np.concatenate(kept_labels).astype(np.int64),
+        )
+
+    def reconstruct(self, i):
+        return np.asarray(self.vectors[i], dtype=np.float32)
+
+
+def selector_params(index, mask):
+    """faiss SearchParameters restricting ``index`` to the rows set in ``mask``.
+
+    Returns (params, bitmap, visits). The bitmap backs the selector, so
+    keep a reference to it for as long as the params are used; ``visits``
+    estimates how many vectors the filtered search compares against.
+    """
+    bitmap = np.packbits(mask, bitorder="little")
+    selector = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap))
+    # Only this share of visited rows can be results, so visit that much more
+    boost = 1 / max(mask.mean(), 1 / len(mask))
+    index = getattr(index, "index", index)  # unwrap ServingIndex
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        nprobe = min(int(ivf.nprobe * boost), ivf.nlist)
+        visits = nprobe * ivf.ntotal / ivf.nlist
+        return faiss.SearchParametersIVF(sel=selector, nprobe=nprobe), bitmap, visits
+    hnsw = getattr(faiss.downcast_index(index), "hnsw", None)
+    if hnsw is not None:
+        ef_search = min(int(hnsw.efSearch * boost), index.ntotal)
+        visits = ef_search * hnsw.nb_neighbors(0)
+        return (
+            faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search),
+            bitmap,
+            visits,
+        )
+    # Flat scans test every row against the bitmap, which costs roughly a
+    # thirtieth of computing its distance
+    return faiss.SearchParameters(sel=selector), bitmap, index.ntotal / 30
+
+
+def exact_search(vectors, queries, k, rows, chunk=8192, metric=faiss.METRIC_L2):
+    """Exact search restricted to ``rows`` of the saved vectors"""
+    ascending = metric != faiss.METRIC_INNER_PRODUCT
+    distances = np.full(
+        (len(queries), k), np.inf if ascending else -np.inf, dtype=np.float32
+    )
+    labels = np.full((len(queries), k), -1, dtype=np.int64)
+    for start in range(0, len(rows), chunk):
+        ids = rows[start : start + chunk]
+        block = np.ascontiguousarray(vectors[ids], dtype=np.float32)
+        block_distances, block_labels = faiss.knn(
+            queries, block, min(k, len(ids)), metric
+        )
+        merged_distances = np.hstack([distances, block_distances])
+        merged_labels = np.hstack([labels, ids[block_labels]])
+        order = merged_distances if ascending else -merged_distances
+        best = np.argsort(order, axis=1)[:, :k]
+        distances = np.take_along_axis(merged_distances, best, axis=1)
+        labels = np.take_along_axis(merged_labels, best, axis=1)
+    return distances, labels
+
+
+def filtered_search(index, vectors, queries, k, mask):
+    """Top ``k`` among the rows set in ``mask`` only; returns (distances, labels).
+
+    The index is searched with an ID selector, unless scanning just the
+    matching rows of vectors.npy compares against fewer vectors: graph
+    and IVF searches must visit ever more of the index as the filter
+    gets more selective. Index types without selector support (plain PQ)
+    always scan exactly, as do queries whose visited lists or graph region
+    held fewer than ``k`` matching rows (a filter can exclude every row of
+    the lists nearest a query).
+    """
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    rows = np.flatnonzero(mask)
+    params, bitmap, visits = selector_params(index, mask)
+    if vectors is not None and len(rows) < visits:
+        return exact_search(vectors, queries, k, rows, metric=index.metric_type)
+    try:
+        distances, labels = index.search(queries, k, params=params)
+    except RuntimeError:
+        if vectors is None:
+            raise
+        return exact_search(vectors, queries, k, rows, metric=index.metric_type)
+    short = labels[:, min(k, len(rows)) - 1] == -1 if len(rows) else None
+    if vectors is not None and short is not None and short.any():
+        distances[short], labels[short] = exact_search(
+            vectors, queries[short], k, rows, metric=index.metric_type
+        )
+    return distances, labels
+
+
+def exact_range_search(vectors, query, threshold, rows=None, chunk=65536):
+    """Rows of the saved unit vectors with cosine similarity > ``threshold``"""
+    rows = np.arange(len(vectors)) if rows is None else rows
+    scores, labels = [], []
+    for start in range(0, len(rows), chunk):
+        ids = rows[start : start + chunk]
+        block_scores = np.asarray(vectors[ids], dtype=np.float32) @ query
+        keep = block_scores > threshold
+        scores.append(block_scores[keep])
+        labels.append(ids[keep])
+    return np.concatenate(scores), np.concatenate(labels).astype(np.int64)
+
+
+def range_search(index, vectors, query, threshold, mask=None):
+    """Every row with cosine similarity > ``threshold`` to one unit query vector.
+
+    Returns (scores, rows), best first, from a single FAISS range search,
+    restricted to the rows set in ``mask`` like filtered_search. ANN
+    indexes only find qualifying rows in the lists or graph region they
+    visit, as with their k-NN searches.
+    """
+    queries = np.ascontiguousarray(query, dtype=np.float32).reshape(1, -1)
+    params = bitmap = None
+    rows = None
+    if mask is not None:
+        rows = np.flatnonzero(mask)
+        params, bitmap, visits = selector_params(index, mask)
+    if vectors is not None and rows is not None and len(rows) < visits:
+        scores, labels = exact_range_search(vectors, queries[0], threshold, rows)
+    else:
+        try:
+            _, scores, labels = index.range_search(queries, threshold, params=params)
+        except RuntimeError:
+            if vectors is None:
+                raise
+            scores, labels = exact_range_search(vectors, queries[0], threshold, rows)
+    order = np.argsort(-scores, kind="stable")
+    return scores[order], labels[order]
+
+
+class CatalogVectorStore(FAISS):
+    """FAISS vectorstore that fetches each result page with one docstore query.
+
+    The stock implementation looks documents up one id at a time; with a
+    DuckDBDocstore that would be k round trips per search. Filters on
+    theme, year, pieces and price are applied before the vector search
+    using the saved filter ``columns``; other filters fall back to
+    over-fetching ``fetch_k`` and checking document metadata. ``lexical``
+    is the BM25 index over the same rows, used by hybrid_search. With
+    ``cosine`` scores are cosine similarities and a ``score_threshold`` is
+    answered by one range search instead of fetching k and dropping some.
+    ``shards`` (see index_shards) serve searches made with ``routed=True``.
+    """
+
+    def __init__(
+        self,
+        *args,
+        vectors=None,
+        columns=None,
+        lexical=None,
+        cosine=False,
+        shards=None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.vectors = vectors
+        self.columns = columns
+        self.lexical = lexical
+        self.cosine = cosine
+        self.shards = shards
+
+    def row_mask(self, filter):
+        """Row mask for ``filter``, or None when the columns cannot answer it"""
+        if filter is None or self.columns is None:
+            return None
+        return self.columns.mask(filter)
+
+    def search_rows(
+        self,
+        embedding,
+        k=4,
+        filter=None,
+        fetch_k=20,
+        mask=None,
+        score_threshold=None,
+        routed=False,
+    ):
+        """Nearest rows to ``embedding`` as (scores, rows, remaining filter).
+
+        The remaining filter is the part of ``filter`` the row mask could
+        not apply; documents_for_rows checks it on document metadata. On
+        cosine indexes ``score_threshold`` returns only rows above it.
+        ``routed`` searches just the shards the query is routed to.
+        """
+        vector = np.array([embedding], dtype=np.float32)
+        if self._normalize_L2 or self.cosine:
+            faiss.normalize_L2(vector)
+        if mask is None:
+            mask = self.row_mask(filter)
+        if routed and self.shards is not None:
+            if mask is not None:
+                filter = None
+            threshold = score_threshold if self.cosine else None
+            limit = k if filter is None else fetch_k
+            scores, rows = self.shards.search(vector, limit, mask, threshold)
+            return scores, rows, filter
+        if score_threshold is not None and self.cosine:
+            scores, rows = range_search(
+                self.index, self.vectors, vector, score_threshold, mask
+            )
+            if mask is not None:
+                filter = None
+            limit = k if filter is None else fetch_k
+            return scores[:limit], rows[:limit], filter
+        if mask is not None:
+            scores, rows = filtered_search(self.index, self.vectors, vector, k, mask)
+            filter = None
+        else:
+            scores, rows = self.index.search(vector, k if filter is None else fetch_k)
+        found = rows[0] != -1
+        return scores[0][found], rows[0][found], filter
+
+    def search_rows_batch(self, embeddings, k=4, filter=None, fetch_k=20, mask=None):
+        """search_rows for many query embeddings in one index search.
+
+        Returns ([(scores, rows)] per query, remaining filter); every query
+        shares ``filter``.
+        """
+        vectors = np.array(embeddings, dtype=np.float32).reshape(len(embeddings), -1)
+        if self._normalize_L2 or self.cosine:
+            faiss.normalize_L2(vectors)
+        if mask is None:
+            mask = self.row_mask(filter)
+        if mask is not None:
+            scores, rows = filtered_search(self.index, self.vectors, vectors, k, mask)
+            filter = None
+        else:
+            scores, rows = self.index.search(vectors, k if filter is None else fetch_k)
+        found = rows != -1
+        return [(s[f], r[f]) for s, r, f in zip(scores, rows, found)], filter
+
+    def score_rows(self, embedding, rows):
+        """Exact scores of index ``rows`` for ``embedding``, as search_rows scores.
+
+        None when the store has no saved vectors.
+        """
+        if self.vectors is None:
+            return None
+        vector = np.array(embedding, dtype=np.float32)
+        if self._normalize_L2 or self.cosine:
+            vector /= max(float(np.linalg.norm(vector)), 1e-12)
+        stored = np.asarray(
+            self.vectors[np.asarray(rows, dtype=np.int64)], dtype=np.float32
+        )
+        if self.cosine:
+            return stored @ vector
+        return ((stored - vector) ** 2).sum(axis=1)
+
+    def clears_threshold(self, scores, threshold):
+        """Mask of ``scores`` that clear ``threshold``.
+
+        Cosine similarities must be above it, as in range_search; L2
+        distances must not exceed it.
+        """
+        scores = np.asarray(scores, dtype=np.float32)
+        return scores > threshold if self.cosine else scores <= threshold
+
+    def documents_for_rows(self, rows, scores, filter=None):
+        """(Document, score) pairs for index rows, fetched in one docstore query"""
+        hits = [
+            (self.index_to_docstore_id[int(row)], score)
+            for row, score in zip(rows, scores)
+        ]
+        docs = self.docstore.mget([doc_id for doc_id, _ in hits])
+        # Sets deleted since the index was built are simply skipped
+        results = [(docs[doc_id], score) for doc_id, score in hits if doc_id in docs]
+        if filter is not None:
+            filter_func = self._create_filter_func(filter)
+            results = [
+                (doc, score) for doc, score in results if filter_func(doc.metadata)
+            ]
+        return results
+
+    def similarity_search_with_score_by_vector(
+        self, embedding, k=4, filter=None, fetch_k=20, **kwargs
+    ):
+        score_threshold = kwargs.get("score_threshold")
+        scores, rows, filter = self.search_rows(
+            embedding,
+            k,
+            filter,
+            fetch_k,
+            score_threshold=score_threshold,
+            routed=kwargs.get("routed", False),
+        )
+        results = self.documents_for_rows(rows, scores, filter)
+        if score_threshold is not None and not self.cosine:
+            if self.distance_strategy in (
+                DistanceStrategy.MAX_INNER_PRODUCT,
+                DistanceStrategy.JACCARD,
+            ):
+                results = [
+                    (doc, score) for doc, score in results if score >= score_threshold
+                ]
+            else:
+                results = [
+                    (doc, score) for doc, score in results if score <= score_threshold
+                ]
+        return results[:k]
+
+
+def load_params(index_path=INDEX_PATH):
+    """Saved build record, or {} for indexes written before it existed"""
+    try:
+        path = os.path.join(resolve_index_path(index_path), PARAMS_FILE)
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_vectorstore(
+    vectorstore,
+    index_path=INDEX_PATH,
+    params=None,
+    details_chars=DETAILS_CHARS,
+    conn=None,
+):
+    """Save a vectorstore whose index is exact, serving it as the configured type.
+
+    The exact vectors (unit length for the cosine metric) go to
+    vectors.npy, the index built from them per
+    ``params`` goes to index.faiss, each row's lego_sets id and content
+    hash to docs.npy, and the params to index_params.json. With ``conn``
+    the rows' lego_sets filter columns (see search_filters), BM25 index
+    (see lexical_index) and documents (see docstore) are saved too, plus
+    per-theme/decade shards when ``params`` has a shard_by (see
+    index_shards). Each save is a new
+    snapshot made current atomically once complete (see index_snapshots),
+    so running processes keep reading the one they loaded.
+    """
+    params = params or index_params()
+    exact = vectorstore.index
+    vectors = prepare_vectors(exact.reconstruct_n(0, exact.ntotal), params)
+    serving, resolved = build_index(vectors, params)
+
+    ids = [vectorstore.index_to_docstore_id[row] for row in range(exact.ntotal)]
+    hashes = [
+        getattr(vectorstore.docstore.search(doc_id), "metadata", {}).get(
+            "content_hash", ""
+        )
+        for doc_id in ids
+    ]
+
+    previous = resolve_index_path(index_path)
+    version, path = new_snapshot(index_path)
+    np.save(os.path.join(path, VECTORS_FILE), vectors)
+    faiss.write_index(serving, os.path.join(path, "index.faiss"))
+    save_docs(path, ids, hashes)
+    if conn is not None:
+        meta, themes = _save_catalog_files(conn, path, ids)
+        if params.get("shard_by"):
+            from index_shards import save_shards  # index_shards builds on this module
+
+            save_shards(path, previous, vectors, ids, hashes, meta, themes, params)
+
+    record = {
+        "requested": params,
+        "built": {
+            **resolved,
+            "ntotal": int(serving.ntotal),
+            "dimension": int(serving.d),
+            "details_chars": details_chars,
+            "embeddings": embedding_model_name(vectorstore.embedding_function),
+            "built_at": datetime.now(timezone.utc).isoformat(),
+        },
+    }
+    with open(os.path.join(path, PARAMS_FILE), "w", encoding="utf-8") as f:
+        json.dump(record, f, indent=2)
+
+    print(f"  Built {resolved['factory']} index over {serving.ntotal} vectors")
+    publish_snapshot(
+        index_path, version, ntotal=int(serving.ntotal), factory=resolved["factory"]
+    )
+
+
+def _save_catalog_files(conn, index_path, ids):
+    """Write the files built from lego_sets rather than from the vectors.
+
+    Returns the filter columns as (meta, themes).
+    """
+    meta, themes = read_filter_columns(conn, ids)
+    save_filter_columns(index_path, meta, themes)
+    BM25Index.build(read_lexical_texts(conn, ids)).save(index_path)
+    save_docstore(conn, index_path, ids)
+    return meta, themes
+
+
+def refresh_catalog_files(conn, index_path=INDEX_PATH):
+    """Refresh the filter columns, BM25 index and documents of a saved index.
+
+    Prices, and details past the embedded prefix, can change without
+    changing any embedded text, so this runs even when no vector needs
+    rebuilding. If anything changed, a new snapshot shares every other
+    file with the current one (hard links) and is published.
+    """
+    previous = resolve_index_path(index_path)
+    if not os.path.exists(os.path.join(previous, DOCS_FILE)):
+        return
+    ids = [str(doc_id) for doc_id in load_docs(previous, mmap=False)["id"]]
+    version, path = new_snapshot(index_path)
+    _save_catalog_files(conn, path, ids)
+
+    written = os.listdir(path)
+    if all(
+        os.path.exists(os.path.join(previous, name))
+        and filecmp.cmp(
+            os.path.join(path, name), os.path.join(previous, name), shallow=False
+        )
+        for name in written
+    ):
+        shutil.rmtree(path)
+        return
+    kept = [
+        name
+        for name in os.listdir(previous)
+        if name not in written + [MANIFEST_FILE]
+        and os.path.isfile(os.path.join(previous, name))
+    ]
+    link_files(previous, path, kept)
+    publish_snapshot(index_path, version, refreshed=written)
+
+
+def mmap_flags(index_type):
+    """faiss.read_index flags that map the index file read-only instead of copying it"""
+    if index_type and index_type.startswith("ivf"):
+        # Inverted lists are mapped; IVF rejects the flat-codes flag
+        return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    return getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | faiss.IO_FLAG_READ_ONLY
+
+
+def read_index(index_path=INDEX_PATH, index_type=None, mmap=True, name="index.faiss"):
+    """Read index.faiss (or shard ``name``), memory-mapped when faiss supports it.
+
+    A mapped index costs no load time and its pages live in the OS page
+    cache, so every app process on the host shares one copy.
+    """
+    path = os.path.join(index_path, name)
+    if mmap:
+        try:
+            return faiss.read_index(path, mmap_flags(index_type))
+        except RuntimeError as e:
+            print(f"  Cannot memory-map {path}, reading it into memory: {e}")
+    return faiss.read_index(path)
+
+
+def _read_legacy_docstore(index_path):
+    """(docstore, index_to_docstore_id) from an index.pkl written by save_local"""
+    with open(os.path.join(index_path, LEGACY_DOCSTORE_FILE), "rb") as f:
+        return pickle.load(f)
+
+
+def load_vectorstore(
+    embeddings, index_path=INDEX_PATH, exact=False, mmap=True, conn=None
+):
+    """Load the saved vectorstore, whichever index type was built.
+
+    The serving index, vectors.npy and docs.npy are memory-mapped
+    read-only (unless ``mmap`` is False), so loading is instant and pages
+    are read lazily on first search. Documents come from the snapshot's
+    docs.parquet; indexes saved without one read lego_sets through
+    ``conn``, or open lego_data.duckdb briefly per search. With ``exact``
+    the index is replaced by a writable Flat one over vectors.npy and the
+    docstore holds just ids and content hashes, which is what incremental
+    updates (add/delete) need. Serving loads raise ValueError when
+    ``embeddings`` is not the model the index was built with.
+    """
+    index_path = resolve_index_path(index_path)
+    vectors_path = os.path.join(index_path, VECTORS_FILE)
+    has_docs = os.path.exists(os.path.join(index_path, DOCS_FILE))
+    if not exact:
+        built = load_params(index_path).get("built", {})
+        # Queries from another model would only fail later, on a dimension mismatch
+        model = embedding_model_name(embeddings)
+        indexed_model = built.get("embeddings", REMOTE_MODEL)
+        if model and indexed_model and indexed_model != model:
+            raise ValueError(
+                f"{index_path} was embedded with {indexed_model}, not {model}; "
+                "query it with the same backend or rebuild it with fix_faiss.py"
+            )
+        index = read_index(index_path, built.get("type"), mmap)
+        apply_search_params(index, built)
+        vectors = None
+        if os.path.exists(vectors_path):
+            vectors = np.load(vectors_path, mmap_mode="r" if mmap else None)
+        cosine = is_cosine(built)
+        if (built.get("rerank") or cosine) and vectors is not None:
+            index = ServingIndex(index, vectors, built.get("rerank"), cosine)
+        if not has_docs:
+            return FAISS(embeddings, index, *_read_legacy_docstore(index_path))
+        from index_shards import ShardedIndex  # index_shards builds on this module
+
+        details_chars = built.get("details_chars", DETAILS_CHARS)
+        docstore = DuckDBDocstore.open_snapshot(index_path, details_chars)
+        if docstore is None:
+            docstore = DuckDBDocstore(conn, details_chars)
+        return CatalogVectorStore(
+            embeddings,
+            index,
+            docstore,
+            RowIds(load_docs(index_path, mmap)),
+            vectors=vectors,
+            columns=FilterColumns.load(index_path, mmap),
+            lexical=BM25Index.load(index_path, mmap),
+            cosine=cosine,
+            shards=ShardedIndex.load(index_path, vectors, mmap),
+            distance_strategy=(
+                DistanceStrategy.MAX_INNER_PRODUCT
+                if cosine
+                else DistanceStrategy.EUCLIDEAN_DISTANCE
+            ),
+        )
+
+    if os.path.exists(vectors_path):
+        vectors = np.load(vectors_path)
+        index = faiss.IndexFlatL2(vectors.shape[1])
+        index.add(vectors)
+    else:
+        index = read_index(index_path, mmap=False)
+        if not isinstance(index, faiss.IndexFlat):
+            raise ValueError(
+                f"{index_path} has no {VECTORS_FILE} to update an ANN index from"
+            )
+    if not has_docs:
+        return FAISS(embeddings, index, *_read_legacy_docstore(index_path))
+
+    docs = load_docs(index_path, mmap=False)
+    ids = [str(doc_id) for doc_id in docs["id"]]
+    docstore = InMemoryDocstore(
+        {
+            doc_id: Document(
+                id=doc_id,
+                page_content="",
+                metadata={"id": doc_id, "content_hash": str(digest)},
+            )
+            for doc_id, digest in zip(ids, docs["content_hash"])
+        }
+    )
+    return FAISS(embeddings, index, docstore, dict(enumerate(ids)))